@@ -1,5 +1,4 @@
 import streamlit as st
-import random
 import os
 import platform
 import requests
@@ -22,6 +21,11 @@ apply_custom_styles()
 is_windows = platform.system() == "Windows"
 is_unix = platform.system() in ["Linux", "Darwin"]
 
+# Durée maximale, en secondes, pendant laquelle le traitement d'un document est suivi
+FILE_JOB_TIMEOUT = int(os.getenv("FILE_JOB_TIMEOUT", 1800))
+# Intervalle, en secondes, entre deux interrogations de l'avancement
+FILE_JOB_POLL_INTERVAL = float(os.getenv("FILE_JOB_POLL_INTERVAL", 2))
+
 
 def initialize_session_state():
     default_values = {
@@ -299,25 +303,84 @@ def render_settings():
                 key="send_doc",
                 use_container_width=True,
             ):
-                messages = [
-                    "Envoi du document...",
-                    "Traitement en cours...",
-                    "Veuillez patienter...",
-                    "Presque terminé...",
-                ]
-                with st.spinner("Envoi du document..."):
-                    for _ in range(4):
-                        time.sleep(4)
-                        st.spinner(random.choice(messages))
-                    result = requests.post(
-                        f"http://{venv['rag_host']}:{venv['rag_port']}/file",
-                        files={"file": file},
-                        headers={
-                            "Authorization": f"Bearer {get_token()}",
-                        },
-                    )
+                send_document(file)
+
+
+def api_error(response):
+    """
+    Retourne le message d'erreur renvoyé par l'API.
+
+    Args:
+        response (requests.Response): La réponse en erreur.
+
+    Returns:
+        str: Le détail de l'erreur, ou le texte de la réponse à défaut.
+    """
+    try:
+        return response.json()["detail"]
+    except (ValueError, KeyError, TypeError):
+        return response.text or f"HTTP {response.status_code}"
+
+
+def send_document(file):
+    """
+    Envoie un document au RAG et suit son traitement, qui tourne en arrière-plan,
+    jusqu'à sa fin ou jusqu'à FILE_JOB_TIMEOUT.
 
-                st.success("Terminé !")
+    Args:
+        file (UploadedFile): Le document à envoyer.
+    """
+    rag_url = f"http://{venv['rag_host']}:{venv['rag_port']}"
+    job = None
+    progress = st.empty()
+    try:
+        with st.spinner("Envoi du document..."):
+            result = requests.post(
+                f"{rag_url}/file",
+                files={"file": file},
+                headers={
+                    "Authorization": f"Bearer {get_token()}",
+                },
+            )
+            result.raise_for_status()
+            job_id = result.json()["job_id"]
+
+        # Le traitement tourne en arrière-plan, son avancement est interrogé
+        deadline = time.monotonic() + FILE_JOB_TIMEOUT
+        with st.spinner("Traitement en cours..."):
+            while True:
+                response = requests.get(
+                    f"{rag_url}/file/{job_id}",
+                    headers={
+                        "Authorization": f"Bearer {get_token()}",
+                    },
+                )
+                response.raise_for_status()
+                job = response.json()
+                if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+                    break
+                running = [s["name"] for s in job["stages"] if s["status"] == "running"]
+                progress.caption(
+                    f"Étape : {running[-1]}" if running else "En attente..."
+                )
+                time.sleep(FILE_JOB_POLL_INTERVAL)
+    except requests.exceptions.HTTPError as err:
+        st.error(f"Erreur de l'API : {api_error(err.response)}")
+        return
+    except requests.exceptions.RequestException as err:
+        st.error(f"Erreur de connexion à l'API : {err}")
+        return
+    finally:
+        progress.empty()
+
+    if job["status"] == "done":
+        st.success("Terminé !")
+    elif job["status"] == "failed":
+        st.error(f"Échec du traitement : {job['error']}")
+    else:
+        st.warning(
+            "Le traitement est toujours en cours, le document sera disponible à sa fin."
+        )
 
 
 def render_login():
@@ -3,7 +3,7 @@ import streamlit as st
 from datetime import datetime, date
 
 from modules.docker_check import is_running_in_docker
-from modules.processing_request import process_input
+from modules.processing_request import stream_input
 from modules.response_generator import response_generator
 
 
@@ -51,6 +51,7 @@ def initialize_session_state():
         "chat_id": "",
         "duration": None,
         "search_history": [],
+        "pending_response": None,
     }
     for key, value in default_values.items():
         if key not in st.session_state:
@@ -58,16 +59,24 @@ def initialize_session_state():
 
 
 def process_user_input(user_input, chat_id, model):
-    result = process_input(
-        user_input, st.session_state["chat_history"], chat_id, model, token=get_token()
+    # The response is streamed while the page is rendered, see display_pending_response
+    st.session_state["chat_history"].append({"role": "user", "content": user_input})
+    st.session_state.update(
+        pending_response={"user_input": user_input, "chat_id": chat_id, "model": model}
     )
-    chatbot_response, updated_chat_history = result[:2]
-    duration = result[2] if len(result) == 3 else None
 
-    st.session_state.update(chat_history=updated_chat_history, duration=duration)
-    st.session_state["chat"].append({"user": user_input, "assistant": chatbot_response})
 
-    return duration
+def save_message(chat_id, duration):
+    requests.post(
+        f"http://{venv['db_host']}:{venv['db_port']}/message",
+        json={
+            "chat_id": chat_id,
+            "chat_history": st.session_state["chat_history"],
+            "duration": duration,
+            "model": st.session_state["model"],
+            "model_label": model_mapping.get(st.session_state["model"]),
+        },
+    )
 
 
 def update_input_new_chat():
@@ -95,7 +104,7 @@ def update_input_new_chat():
             print(f"Request error occurred: {err}")
             return
 
-        duration = process_user_input(user_input, chat_id, st.session_state["model"])
+        process_user_input(user_input, chat_id, st.session_state["model"])
 
         requests.put(
             f"http://{venv['db_host']}:{venv['db_port']}/search",
@@ -106,19 +115,6 @@ def update_input_new_chat():
             },
         )
 
-        requests.post(
-            f"http://{venv['db_host']}:{venv['db_port']}/message",
-            json={
-                "chat_id": chat_id,
-                "chat_history": st.session_state["chat_history"],
-                "duration": duration,
-                "model": st.session_state["model"],
-                "model_label": model_mapping.get(st.session_state["model"]),
-            },
-        )
-
-        st.session_state.update(duration=duration)
-
 
 def update_input_existent_chat():
     user_input = st.session_state["history_temp_input"]
@@ -130,7 +126,7 @@ def update_input_existent_chat():
             message.pop("chat_id", None)
             message.pop("generation_time", None)
 
-        duration = process_user_input(
+        process_user_input(
             user_input, st.session_state["chat_id"], st.session_state["model"]
         )
 
@@ -139,19 +135,6 @@ def update_input_existent_chat():
             json={"chat_id": st.session_state["chat_id"]},
         )
 
-        requests.post(
-            f"http://{venv['db_host']}:{venv['db_port']}/message",
-            json={
-                "chat_id": st.session_state["chat_id"],
-                "chat_history": st.session_state["chat_history"],
-                "duration": duration,
-                "model": st.session_state["model"],
-                "model_label": model_mapping.get(st.session_state["model"]),
-            },
-        )
-
-        st.session_state.update(duration=duration)
-
 
 def display_chat_input(key, on_submit, placeholder):
     st.chat_input(
@@ -218,6 +201,46 @@ def display_chat_history(chat_history, duration):
     )
 
 
+def display_pending_response():
+    pending = st.session_state.get("pending_response")
+    if not pending:
+        return
+    st.session_state.update(pending_response=None)
+
+    metrics = {}
+    with st.chat_message("Assistant"):
+        # Display the response as it is generated by the model
+        chatbot_response = st.write_stream(
+            response_generator(
+                stream_input(
+                    pending["user_input"],
+                    st.session_state["chat_history"],
+                    pending["chat_id"],
+                    pending["model"],
+                    get_token(),
+                    metrics,
+                )
+            )
+        )
+        if "error" not in metrics:
+            st.markdown(
+                f"<small style='color: gray;'>Réponse générée en {metrics.get('duration', 0):.2f} secondes "
+                f"(premiers mots en {metrics.get('time_to_first_token', 0):.2f} secondes) "
+                f"avec {model_mapping.get(pending['model'])}</small>",
+                unsafe_allow_html=True,
+            )
+
+    st.session_state["chat"].append(
+        {"user": pending["user_input"], "assistant": chatbot_response}
+    )
+    if "error" in metrics:
+        return
+
+    duration = metrics.get("duration")
+    st.session_state.update(duration=duration)
+    save_message(pending["chat_id"], duration)
+
+
 def new_chat():
     initialize_session_state()
     if not st.session_state["chat"]:
@@ -245,3 +268,4 @@ def existent_chat():
         "Continuez la conversation ici...",
     )
     display_chat_history(st.session_state["chat_history"], st.session_state["duration"])
+    display_pending_response()
@@ -74,3 +74,68 @@ def process_input(user_input, chat_history, chat_id, model, token):
         )
     except requests.exceptions.RequestException as err:
         return f"An error occurred: {err}", chat_history
+
+
+def stream_input(user_input, chat_history, chat_id, model, token, metrics):
+    """
+    Stream the chatbot response to the user input, already added to the chat history, and
+    add the complete response to the chat history.
+
+    Args:
+        user_input (str): The user input.
+        chat_history (list): The chat history, ending with the user input.
+        chat_id (str): The chat ID.
+        model (str): The model.
+        token (str): The API token.
+        metrics (dict): Filled with the duration, the time to first token or the error.
+
+    Yields:
+        str: The pieces of the chatbot response, as they are generated.
+    """
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    url = f"http://{venv['rag_host']}:{venv['rag_port']}/chat/stream"
+
+    if model in ["llama3.1:8b", "gemma2:9b", "phi3.5:3.8b"]:
+        service_type = "ollama"
+    else:
+        service_type = "minai"
+    payload = {
+        "service_type": service_type,
+        "question": user_input,
+        "history": chat_history,
+        "chat_id": chat_id,
+        "model": model,
+    }
+
+    response_text = ""
+    try:
+        with requests.post(url, json=payload, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                metrics["error"] = "An error occurred while generating the response."
+                yield metrics["error"]
+                return
+
+            # Server-sent events: an "event" line, a "data" line, then an empty line
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: ") :]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: ") :])
+                    if event == "token":
+                        response_text += data["text"]
+                        yield data["text"]
+                    elif event == "done":
+                        metrics.update(data)
+                    elif event == "error":
+                        metrics["error"] = f"An error occurred: {data['detail']}"
+                        yield "\n" + metrics["error"]
+                        return
+    except requests.exceptions.RequestException as err:
+        metrics["error"] = f"An error occurred: {err}"
+        yield metrics["error"]
+        return
+
+    # Add chatbot response to chat history
+    chat_history.append({"role": "assistant", "content": response_text})
@@ -1,36 +1,67 @@
 import re
-import time
+import itertools
+
+table_pattern = re.compile(r"^\|.*\|$")  # Pattern to detect Markdown table lines
+title_pattern = re.compile(r"^(#+)\s")  # Pattern to detect Markdown titles
+
+
+def _format_line(line):
+    # Check if the line is a title and add an extra '#'
+    if title_pattern.match(line):
+        return "#" + line
+    return line
 
 
 def response_generator(response):
-    response = "Assistant : \n " + response
-    lines = response.splitlines(True)  # Preserve line breaks
-    table_pattern = re.compile(r"^\|.*\|$")  # Pattern to detect Markdown table lines
-    title_pattern = re.compile(r"^(#+)\s")  # Pattern to detect Markdown titles
-
-    buffer = []
-
-    for line in lines:
-        # Check if the line starts with '|' and ends with '|'
-        if table_pattern.match(line.strip()):
-            # If a table line is detected, add to buffer
-            buffer.append(line)
-        else:
+    """
+    Emits a response as it is received, holding back Markdown tables until they are
+    complete so that they are never rendered half-written.
+
+    Args:
+        response (str | Iterable[str]): The response, or the pieces of a streamed response.
+
+    Yields:
+        str: The text to display.
+    """
+    if isinstance(response, str):
+        response = [response]
+
+    buffer = []  # Lines of the table being received
+    line = ""  # Line being received
+    emitted = 0  # Characters of the line already emitted
+
+    for piece in itertools.chain(["Assistant : \n "], response):
+        line += piece
+        while "\n" in line:
+            end = line.index("\n") + 1
+            complete, line = line[:end], line[end:]
+            # Check if the line starts with '|' and ends with '|'
+            if not emitted and table_pattern.match(complete.strip()):
+                # If a table line is detected, add to buffer
+                buffer.append(complete)
+            else:
+                if buffer:
+                    # If the end of the table is reached, emit the complete table followed by a line break
+                    yield "".join(buffer) + "\n"
+                    buffer = []
+                yield _format_line(complete)[emitted:]
+            emitted = 0
+
+        # Emit normal text at once, a line starting with '|' or '#' is held until complete
+        head = line.lstrip()
+        if head and head[0] not in "|#":
             if buffer:
-                # If the end of the table is reached, emit the complete table followed by a line break
                 yield "".join(buffer) + "\n"
                 buffer = []
+            yield line[emitted:]
+            emitted = len(line)
 
-            # Check if the line is a title and add an extra '#'
-            if title_pattern.match(line):
-                line = "#" + line
-
-            # Emit words line by line for normal text
-            words = line.split()
-            for i, word in enumerate(words):
-                yield word + (" " if i < len(words) - 1 else "\n")
-                time.sleep(0.05)
+    if line and not emitted and table_pattern.match(line.strip()):
+        buffer.append(line)
+        line = ""
 
     # Emit any remaining content in the buffer (last table)
     if buffer:
         yield "".join(buffer)
+    if line[emitted:]:
+        yield _format_line(line)[emitted:]
@@ -1,4 +1,9 @@
-from fastapi import FastAPI, HTTPException
+import io
+import json
+import anyio
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 from users_manager import (
@@ -16,13 +21,83 @@ from users_manager import (
 )
 from sources_manager import (
     get_profiles,
+    get_profiles_page,
+    stream_profiles,
+    PAGE_SIZE,
+    STREAM_BATCH_SIZE,
     truncate_table,
     insert_profile,
+    insert_profiles_bulk,
+    create_shadow_table,
     replace_profiles,
 )
 
 app = FastAPI()
 
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    Fichier en lecture seule sur les morceaux d'un corps de requête.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer:
+            self.buffer = next(self.chunks, None)
+            if self.buffer is None:
+                self.buffer = b""
+                return 0
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def read_ndjson(chunks):
+    """
+    Lire les profils d'un corps JSON lines, une ligne par profil.
+
+    Args:
+        chunks (Iterator[bytes]): Les morceaux du corps de la requête.
+
+    Yields:
+        dict: Les profils.
+    """
+    rest = b""
+    for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if rest.strip():
+        yield json.loads(rest)
+
+
+def read_arrow(chunks):
+    """
+    Lire les profils d'un flux Arrow IPC, lot par lot.
+
+    Args:
+        chunks (Iterator[bytes]): Les morceaux du corps de la requête.
+
+    Yields:
+        dict: Les profils.
+    """
+    import pyarrow.ipc
+
+    reader = pyarrow.ipc.open_stream(io.BufferedReader(ChunkReader(chunks)))
+    for batch in reader:
+        yield from batch.to_pylist()
+
 
 @app.post(
     "/", summary="Racine de l'API", response_description="API en cours d'exécution"
@@ -54,12 +129,51 @@ async def insert_profile_api(profile: dict):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post(
+    "/profiles/bulk",
+    summary="Ajouter des profils en masse dans la base de données",
+    response_description="Profils ajoutés avec succès",
+)
+async def insert_profiles_bulk_api(request: Request, type: str):
+    # Le corps (JSON lines ou flux Arrow) est lu au fil de l'insertion, qui s'exécute
+    # dans un thread pour ne pas bloquer la boucle d'évènements
+    stream = request.stream()
+
+    def chunks():
+        while True:
+            try:
+                yield anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                return
+
+    if request.headers.get("content-type", "").startswith(ARROW_STREAM):
+        profiles = read_arrow(chunks())
+    else:
+        profiles = read_ndjson(chunks())
+    try:
+        return await run_in_threadpool(insert_profiles_bulk, profiles, type)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post(
+    "/profiles/shadow",
+    summary="Créer la table fantôme où charger les nouveaux profils",
+    response_description="Table fantôme créée avec succès",
+)
+def create_shadow_table_api(source: str = None):
+    try:
+        return create_shadow_table(source)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.put(
     "/profiles",
-    summary="Remplacer les profils dans la base de données",
+    summary="Remplacer les profils par ceux de la table fantôme",
     response_description="Profils remplacés avec succès",
 )
-async def replace_profiles_api():
+def replace_profiles_api():
     try:
         return replace_profiles()
     except Exception as e:
@@ -78,6 +192,45 @@ async def get_profiles_api(params: dict):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get(
+    "/profiles/page",
+    summary="Récupérer une page de profils",
+    response_description="Page de profils et curseur de la page suivante",
+)
+def get_profiles_page_api(
+    type: str = "perm", fields: str = None, after: int = None, limit: int = PAGE_SIZE
+):
+    try:
+        return get_profiles_page(type, fields, after, limit)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get(
+    "/profiles/stream",
+    summary="Récupérer tous les profils en flux JSON lines",
+    response_description="Un profil par ligne",
+)
+def stream_profiles_api(type: str = "perm", fields: str = None):
+    try:
+        profiles = stream_profiles(type, fields)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines():
+        # Les lignes sont envoyées par lots du curseur pour limiter le nombre d'écritures
+        batch = []
+        for profile in profiles:
+            batch.append(json.dumps(profile, ensure_ascii=False) + "\n")
+            if len(batch) == STREAM_BATCH_SIZE:
+                yield "".join(batch)
+                batch = []
+        if batch:
+            yield "".join(batch)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.delete(
     "/profiles",
     summary="Supprimer les profils",
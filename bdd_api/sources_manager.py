@@ -1,5 +1,16 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
+from itertools import islice
+from sqlalchemy import (
+    create_engine,
+    select,
+    text,
+    Column,
+    Integer,
+    MetaData,
+    String,
+    ForeignKey,
+)
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from docker_check import is_running_in_docker
@@ -18,6 +29,29 @@ if not db_user or not db_password:
         "Les variables d'environnement DB_USER et DB_PASSWORD doivent être définies"
     )
 
+# Nombre de profils insérés par executemany lors d'un ajout en masse
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
+# Nombre de profils par page, par défaut et au maximum
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 500))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 5000))
+# Nombre de profils lus à la fois par le curseur côté serveur lors d'un export en flux
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+
+# Attente maximale du verrou de l'échange des tables, les lectures attendent derrière lui
+SWAP_LOCK_TIMEOUT = os.getenv("SWAP_LOCK_TIMEOUT", "5s")
+SWAP_ATTEMPTS = int(os.getenv("SWAP_ATTEMPTS", 3))
+
+# Colonnes des profils qui peuvent être demandées
+PROFILE_FIELDS = (
+    "id",
+    "membres",
+    "missions",
+    "competences",
+    "certifications",
+    "combined",
+)
+
 # Créer une connexion à la base de données
 engine = create_engine(
     f"postgresql://{venv['db_user']}:{venv['db_pwd']}@{venv['db_host']}:{venv['db_port']}/{venv['db_name']}"
@@ -50,6 +84,23 @@ class TempProfile(Base):
 # Créer les tables dans la base de données
 Base.metadata.create_all(engine)
 
+# Table fantôme où les nouveaux profils sont construits avant de remplacer profiles.
+# Elle n'est pas créée au démarrage, mais par create_shadow_table avant chaque chargement.
+shadow_table = Profile.__table__.to_metadata(MetaData(), name="profiles_shadow")
+
+# Échange de la table fantôme avec profiles : seuls les catalogues sont modifiés, la durée
+# ne dépend pas du nombre de profils. La séquence et les index reprennent leur nom pour
+# que le prochain chargement puisse recréer la table fantôme.
+SWAP_STATEMENTS = (
+    "LOCK TABLE profiles, profiles_shadow IN ACCESS EXCLUSIVE MODE",
+    "ALTER TABLE profiles RENAME TO profiles_old",
+    "ALTER TABLE profiles_shadow RENAME TO profiles",
+    "DROP TABLE profiles_old",
+    "ALTER SEQUENCE profiles_shadow_id_seq RENAME TO profiles_id_seq",
+    "ALTER INDEX profiles_shadow_pkey RENAME TO profiles_pkey",
+    "ALTER INDEX ix_profiles_shadow_id RENAME TO ix_profiles_id",
+)
+
 # Créer une session pour interagir avec la base de données
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -75,6 +126,111 @@ def get_profiles(params: dict):
         raise f"Erreur lors de la récupération des profils: {str(e)}"
 
 
+def profile_table(type: str):
+    """
+    Get the table of a type of profiles.
+
+    Args:
+        type (str): The type of profiles ("temp", "perm" or "shadow").
+
+    Returns:
+        Table: The table of the profiles.
+    """
+    if type == "temp":
+        return TempProfile.__table__
+    if type == "shadow":
+        return shadow_table
+    return Profile.__table__
+
+
+def profile_columns(type: str, fields: str = None) -> list:
+    """
+    Get the columns of the profiles table selected by a projection.
+
+    Args:
+        type (str): The type of profiles ("temp" or "perm").
+        fields (str): The comma-separated column names, all the columns if None.
+
+    Returns:
+        list: The columns of the table.
+    """
+    table = profile_table(type)
+    names = [name.strip() for name in fields.split(",")] if fields else PROFILE_FIELDS
+    unknown = [name for name in names if name not in PROFILE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(PROFILE_FIELDS)}"
+        )
+    return [table.c[name] for name in names]
+
+
+def get_profiles_page(
+    type: str, fields: str = None, after: int = None, limit: int = PAGE_SIZE
+):
+    """
+    Get a page of profiles, ordered by ID. The cursor of the next page is the ID of the
+    last profile, so that a page costs the same whatever its position.
+
+    Args:
+        type (str): The type of profiles ("temp" or "perm").
+        fields (str): The comma-separated column names, all the columns if None.
+        after (int): The cursor returned with the previous page, None for the first page.
+        limit (int): The number of profiles of the page, at most MAX_PAGE_SIZE.
+
+    Returns:
+        dict: A dictionary containing the profiles and the cursor of the next page, None on the last page.
+    """
+    try:
+        columns = profile_columns(type, fields)
+        table = columns[0].table
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = select(table.c.id, *columns).order_by(table.c.id).limit(limit)
+        if after is not None:
+            query = query.where(table.c.id > after)
+
+        with engine.connect() as connection:
+            rows = connection.execute(query).all()
+
+        names = [column.name for column in columns]
+        profiles = [dict(zip(names, row[1:])) for row in rows]
+        return {
+            "profiles": profiles,
+            "next": rows[-1][0] if len(rows) == limit else None,
+        }
+    except ValueError:
+        raise
+    except Exception as e:
+        raise Exception(f"Erreur lors de la récupération des profils: {str(e)}")
+
+
+def stream_profiles(type: str, fields: str = None):
+    """
+    Get the profiles one by one through a server-side cursor, which reads them by batches
+    of STREAM_BATCH_SIZE, so that the memory used does not depend on the number of profiles.
+
+    Args:
+        type (str): The type of profiles ("temp" or "perm").
+        fields (str): The comma-separated column names, all the columns if None.
+
+    Returns:
+        Iterator[dict]: The profiles, ordered by ID.
+    """
+    # Vérifier la projection avant que le premier profil ne soit demandé
+    columns = profile_columns(type, fields)
+    names = [column.name for column in columns]
+    query = select(*columns).order_by(columns[0].table.c.id)
+
+    def profiles():
+        with engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=STREAM_BATCH_SIZE
+            ).execute(query)
+            for row in result:
+                yield dict(zip(names, row))
+
+    return profiles()
+
+
 def delete_profile(profile: dict):
     """
     Delete a profile from the database.
@@ -139,24 +295,8 @@ def insert_profile(payload: dict):
     """
     try:
         session = SessionLocal()
-        profile = (
-            TempProfile(
-                membres=payload["membre"],
-                missions=payload["mission"],
-                competences=payload["competence"],
-                certifications=payload["certification"],
-                combined=payload["combined"],
-                type=payload["type"],
-            )
-            if payload["type"] == "temp"
-            else Profile(
-                membres=payload["membre"],
-                missions=payload["mission"],
-                competences=payload["competence"],
-                certifications=payload["certification"],
-                combined=payload["combined"],
-            )
-        )
+        model = TempProfile if payload["type"] == "temp" else Profile
+        profile = model(**profile_values(payload, payload["type"]))
 
         session.add(profile)
         session.commit()
@@ -166,30 +306,121 @@ def insert_profile(payload: dict):
         raise Exception(f"Erreur lors de l'ajout du profil: {str(e)}")
 
 
-def replace_profiles():
+def profile_values(payload: dict, type: str) -> dict:
     """
-    Delete the profiles table and rename the temp_profiles table to profiles.
-    Then drop the temp_profiles table.
+    Convert a profile sent to the API into the values of a table row.
+
+    Args:
+        payload (dict): A dictionary containing profile information, with the keys of insert_profile.
+        type (str): The type of profile to insert.
 
     Returns:
-        dict: A dictionary with a success message.
+        dict: The values of the row, by column name.
+    """
+    values = {
+        "membres": payload["membre"],
+        "missions": payload["mission"],
+        "competences": payload["competence"],
+        "certifications": payload["certification"],
+        "combined": payload["combined"],
+    }
+    if type == "temp":
+        values["type"] = type
+    return values
+
+
+def insert_profiles_bulk(profiles, type: str):
+    """
+    Insert profiles into the database in a single transaction, BULK_BATCH_SIZE rows per
+    executemany. The profiles are consumed as they arrive, so a streamed request body is
+    never held entirely in memory, and nothing is inserted if one of them is invalid.
+
+    Args:
+        profiles (Iterable[dict]): The profiles, with the keys of insert_profile.
+        type (str): The type of profiles to insert ("temp", "perm" or "shadow").
+
+    Returns:
+        dict: A dictionary with a success message and the number of profiles added.
     """
     try:
-        session = SessionLocal()
-        session.query(Profile).delete()
-        session.commit()
-        session.close()
+        table = profile_table(type)
+        profiles = iter(profiles)
+        count = 0
+        with engine.begin() as connection:
+            while True:
+                batch = [
+                    profile_values(payload, type)
+                    for payload in islice(profiles, BULK_BATCH_SIZE)
+                ]
+                if not batch:
+                    break
+                connection.execute(table.insert(), batch)
+                count += len(batch)
+        return {"message": "Profils ajoutés avec succès", "count": count}
+    except Exception as e:
+        raise Exception(f"Erreur lors de l'ajout des profils: {str(e)}")
 
-        session = SessionLocal()
-        session.execute("ALTER TABLE temp_profiles RENAME TO profiles")
-        session.commit()
-        session.close()
 
-        session = SessionLocal()
-        session.execute("DROP TABLE temp_profiles")
-        session.commit()
-        session.close()
+def create_shadow_table(source: str = None):
+    """
+    Create an empty shadow table, replacing the one left by an interrupted load. The new
+    profiles are inserted into it with the type "shadow", then replace_profiles swaps it
+    with the profiles table.
+
+    Args:
+        source (str): "temp" to fill the shadow table with the temporary profiles, already
+            validated, by a single INSERT ... SELECT instead of loading them again.
 
-        return {"message": "Profil remplacé avec succès"}
+    Returns:
+        dict: A dictionary with a success message and the number of profiles copied.
+    """
+    try:
+        if source not in (None, "temp"):
+            raise ValueError(f"Source inconnue: {source}")
+        count = 0
+        with engine.begin() as connection:
+            shadow_table.drop(connection, checkfirst=True)
+            shadow_table.create(connection)
+            if source == "temp":
+                # Les profils sont copiés par la base, dans l'ordre de leur chargement
+                temp_table = TempProfile.__table__
+                names = [name for name in PROFILE_FIELDS if name != "id"]
+                query = (
+                    select(*(temp_table.c[name] for name in names))
+                    .where(temp_table.c.type == "temp")
+                    .order_by(temp_table.c.id)
+                )
+                count = connection.execute(
+                    shadow_table.insert().from_select(names, query)
+                ).rowcount
+        return {"message": "Table fantôme créée avec succès", "count": count}
     except Exception as e:
-        raise f"Erreur lors du remplacement des profils: {str(e)}"
+        raise Exception(f"Erreur lors de la création de la table fantôme: {str(e)}")
+
+
+def replace_profiles():
+    """
+    Replace the profiles table with the shadow table in a single transaction. The readers
+    see either all the old profiles or all the new ones, never an empty or partial table.
+    If the lock can't be taken within SWAP_LOCK_TIMEOUT, because of long-running reads,
+    the swap is retried up to SWAP_ATTEMPTS times.
+
+    Returns:
+        dict: A dictionary with a success message.
+    """
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text("SELECT set_config('lock_timeout', :timeout, true)"),
+                    {"timeout": SWAP_LOCK_TIMEOUT},
+                )
+                for statement in SWAP_STATEMENTS:
+                    connection.execute(text(statement))
+            return {"message": "Profils remplacés avec succès"}
+        except OperationalError as e:
+            # Verrou non obtenu à temps, la transaction a été annulée
+            if attempt == SWAP_ATTEMPTS:
+                raise Exception(f"Erreur lors du remplacement des profils: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Erreur lors du remplacement des profils: {str(e)}")
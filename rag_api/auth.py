@@ -1,5 +1,4 @@
 import os
-import requests
 from fastapi import HTTPException, Depends, status
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -7,6 +6,7 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from docker_check import is_running_in_docker
+from http_pool import bdd_api_session
 
 # Configuration du secret et des algorithmes
 SECRET_KEY = os.environ.get("SECRET_KEY")
@@ -20,7 +20,7 @@ venv = is_running_in_docker()
 
 def get_user(username: str):
     try:
-        user = requests.post(
+        user = bdd_api_session.post(
             f"http://{venv['db_api_host']}:{venv['db_api_port']}/user",
             json={"email": username},
         )
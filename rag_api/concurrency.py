@@ -0,0 +1,116 @@
+import os
+import asyncio
+import weakref
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import ollama
+
+# Threads running the blocking work of the async endpoints (spaCy, ChromaDB)
+BLOCKING_WORKERS = int(
+    os.getenv("BLOCKING_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+)
+
+# Maximum number of requests in each stage at the same time
+STAGE_LIMITS = {
+    "analysis": int(os.getenv("ANALYSIS_CONCURRENCY", os.cpu_count() or 1)),
+    "embedding": int(os.getenv("EMBEDDING_CONCURRENCY", 16)),
+    "chroma": int(os.getenv("CHROMA_CONCURRENCY", 8)),
+    "generation": int(os.getenv("GENERATION_CONCURRENCY", 64)),
+}
+
+# Timeout of the requests to the models, generation can take minutes
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 300))
+
+executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking"
+)
+
+# Semaphores and clients are bound to the event loop that created them
+_loop_state = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    if loop not in _loop_state:
+        _loop_state[loop] = {
+            "semaphores": {
+                stage: asyncio.Semaphore(limit) for stage, limit in STAGE_LIMITS.items()
+            },
+            "clients": {},
+        }
+    return _loop_state[loop]
+
+
+def stage_limit(stage: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore limiting the number of concurrent requests in a stage.
+
+    Args:
+        stage (str): The stage name, a key of STAGE_LIMITS.
+
+    Returns:
+        asyncio.Semaphore: The semaphore of the running event loop.
+    """
+    return _state()["semaphores"][stage]
+
+
+async def run_in_stage(stage: str, func, *args, **kwargs):
+    """
+    Runs a blocking function in the executor, within the concurrency limit of a stage.
+
+    Args:
+        stage (str): The stage name, a key of STAGE_LIMITS.
+        func (callable): The blocking function.
+
+    Returns:
+        The result of the function.
+    """
+    async with stage_limit(stage):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(func, *args, **kwargs)
+        )
+
+
+def ollama_client() -> ollama.AsyncClient:
+    """
+    Returns the asynchronous Ollama client of the running event loop.
+
+    Returns:
+        ollama.AsyncClient: A client reusing its connections.
+    """
+    clients = _state()["clients"]
+    if "ollama" not in clients:
+        # The client has no close method, its connections are held by this transport
+        clients["ollama_transport"] = httpx.AsyncHTTPTransport()
+        clients["ollama"] = ollama.AsyncClient(
+            timeout=HTTP_TIMEOUT, transport=clients["ollama_transport"]
+        )
+    return clients["ollama"]
+
+
+def http_client() -> httpx.AsyncClient:
+    """
+    Returns the asynchronous HTTP client of the running event loop.
+
+    Returns:
+        httpx.AsyncClient: A client reusing its connections.
+    """
+    clients = _state()["clients"]
+    if "http" not in clients:
+        clients["http"] = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+    return clients["http"]
+
+
+async def close_clients() -> None:
+    """
+    Closes the clients of the running event loop.
+    """
+    clients = _state()["clients"]
+    if "ollama" in clients:
+        del clients["ollama"]
+        await clients.pop("ollama_transport").aclose()
+    if "http" in clients:
+        await clients.pop("http").aclose()
@@ -2,6 +2,9 @@ import pandas as pd
 from faker import Faker
 import random
 
+from data.workbook_loader import read_workbook
+from data.table_store import write_table, COAFF_SCHEMA, PSARM_SCHEMA, CERTS_SCHEMA
+
 fake = Faker()
 
 
@@ -252,22 +255,15 @@ def create_fixtures(
     RETURNS:
     str: A message indicating the number of new rows created for each file.
     """
-    # Retrieve data from the PSA RM file
-    psa_rm_df = pd.read_excel(psarm_path)
-
-    # Read existing data from the COAFF file
-    coaff_df = pd.read_excel(coaff_path)
-    # Set the 3rd row as the header and remove the first two rows
-    coaff_df = coaff_df.rename(columns=coaff_df.iloc[2].to_dict()).drop(
-        coaff_df.index[:3]
-    )
-
-    # Read existing data from the certifications file
-    certs_df = pd.read_excel(certs_path)
-    # Set the first row as the header to remove unnecessary information
-    certs_df = certs_df.rename(columns=certs_df.iloc[0].to_dict()).drop(
-        certs_df.index[0]
-    )
+    # Retrieve data from the PSA RM file, already parsed by get_skills
+    psa_rm_df = read_workbook(psarm_path)
+
+    # Read existing data from the COAFF file, with the 3rd row as the header
+    coaff_df = read_workbook(coaff_path, header_row=2)
+
+    # Read existing data from the certifications file, with the first row as the header
+    # to remove unnecessary information
+    certs_df = read_workbook(certs_path, header_row=0)
 
     # Rename the 'Membres' column to 'Nom'
     if "Membres" in coaff_df.columns:
@@ -357,10 +353,10 @@ def create_fixtures(
         return f"Error: {str(e)}"
 
     try:
-        # Save the result in a new CSV file
-        new_coaff.to_csv(fixtures_coaff, index=False)
-        new_psarm.to_csv(fixtures_psarm, index=False)
-        new_certs.to_csv(fixtures_certs, index=False)
+        # Save the result in new typed tables, the dates stay dates
+        write_table(new_coaff, fixtures_coaff, COAFF_SCHEMA)
+        write_table(new_psarm, fixtures_psarm, PSARM_SCHEMA)
+        write_table(new_certs, fixtures_certs, CERTS_SCHEMA)
     except Exception as e:
         return f"Error: {str(e)}"
 
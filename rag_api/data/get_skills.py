@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from data.workbook_loader import read_workbook
+
 # Paths
 base_path = os.path.dirname(__file__)
 psarm_path = os.path.join(
@@ -14,13 +16,10 @@ output_profiles = os.path.join(base_path, "downloaded_files", "profils_uniques.t
 
 
 def get_skills(psarm, coaff, desc, profiles):
-    # Read the files into pandas DataFrames
-    df_psarm = pd.read_excel(psarm)
-    # Read existing data from the COAFF file
-    df_coaff = pd.read_excel(coaff)
-    df_coaff = df_coaff.rename(columns=df_coaff.iloc[2].to_dict()).drop(
-        df_coaff.index[:3]
-    )
+    # Read the files into pandas DataFrames, parsed once for create_fixtures too
+    df_psarm = read_workbook(psarm)
+    # Read existing data from the COAFF file, whose 3rd row is the header
+    df_coaff = read_workbook(coaff, header_row=2)
 
     # Extract the "Description" column and get unique values
     descriptions = df_psarm["Description"].unique()
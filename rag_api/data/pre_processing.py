@@ -1,14 +1,98 @@
+import os
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 import requests
 
+from http_pool import bdd_api_session
+from data.table_store import read_table, write_table, COMBINED_SCHEMA
 
-def pre_processing(
-    fixtures_coaff_path, fixtures_psarm_path, fixtures_certs_path, combined_path
-):
-    coaff_df = pd.read_csv(fixtures_coaff_path)
-    psarm_df = pd.read_csv(fixtures_psarm_path)
-    certs_df = pd.read_csv(fixtures_certs_path)
+# Profiles sent per chunk of the bulk insert request
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+# "vectorized", or "loop" to build the profiles one group of rows at a time
+PRE_PROCESSING_ENGINE = os.getenv("PRE_PROCESSING_ENGINE", "vectorized")
+
+# Columns identifying a member, and the ones describing its missions, competencies and
+# certifications
+MEMBER_KEYS = [
+    "Nom",
+    "COEFF_F212",
+    "PROFIL",
+    "Localisation",
+    "Stream_BT",
+    "Code",
+    "Supervisor Name",
+    "Métier",
+]
+MISSION_KEYS = [
+    "Missions_en_cours",
+    "Competences",
+    "Date_Demarrage",
+    "Date_de_fin",
+    "Tx_occup",
+]
+COMPETENCY_KEYS = ["Description", "Proficiency Description"]
+CERTIFICATION_KEYS = ["Code_cert", "Certification", "Obtention", "Expiration"]
+# Columns read from each fixtures table, the other ones are not used by the profiles
+COAFF_COLUMNS = ["Nom", "COEFF_F212", "PROFIL", "Localisation", "Stream_BT"]
+COAFF_COLUMNS += MISSION_KEYS
+PSARM_COLUMNS = ["Nom", "Code", "Supervisor Name"] + COMPETENCY_KEYS
+CERTS_COLUMNS = ["Nom"] + CERTIFICATION_KEYS
+
+PROFICIENCY_LEVELS = {
+    "1-Faible": "a low level",
+    "2-Bon": "a good level",
+    "3-Très bon": "a very good level",
+    "4-Expert": "an expert level",
+}
+
+
+def extract_member_name(membres: str) -> str:
+    """
+    Extracts the name of the member from the "Nom: ..., Code: ..., ..." description.
 
+    Args:
+        membres (str): The description of the member.
+
+    Returns:
+        str: The name of the member.
+    """
+    return membres.split(",")[0].split(":")[1].strip()
+
+
+def profile_id(profile: str) -> str:
+    """
+    Returns a stable ID for a profile, built from the member name and code that start
+    its description. Falls back to a hash of the profile if they can't be parsed.
+
+    Args:
+        profile (str): The profile ("Membres" or "Combined" column).
+
+    Returns:
+        str: The ID of the profile.
+    """
+    try:
+        code = profile.split(",")[1].split(":")[1].strip()
+        return f"{code}-{extract_member_name(profile)}"
+    except IndexError:
+        return hashlib.sha256(profile.encode("utf-8")).hexdigest()
+
+
+def profiles_by_member_loop(coaff_df, psarm_df, certs_df) -> pd.DataFrame:
+    """
+    Builds the missions, competencies and certifications of each member one group of
+    rows at a time, from the join of the three tables. Kept as the reference of
+    profiles_by_member.
+
+    Args:
+        coaff_df (pd.DataFrame): The COAFF fixtures.
+        psarm_df (pd.DataFrame): The PSA RM fixtures.
+        certs_df (pd.DataFrame): The certifications fixtures.
+
+    Returns:
+        pd.DataFrame: The lists of sentences of each member, indexed by its description.
+    """
     # Join the three dataframes with the 'Nom' column as key
     combined_df = pd.merge(coaff_df, psarm_df, on="Nom")
     combined_df = pd.merge(combined_df, certs_df, on="Nom")
@@ -121,8 +205,237 @@ def pre_processing(
 
             resultat_dict[cle_principale]["Certifications"].append(key_value)
 
-    # Export the dictionary to csv
-    resultat_df = pd.DataFrame(resultat_dict).T
+    return pd.DataFrame(resultat_dict).T
+
+
+def mission_sentences(missions: pd.DataFrame) -> pd.Series:
+    """
+    Describes missions, leaves and availabilities, one sentence per row.
+
+    Args:
+        missions (pd.DataFrame): The MISSION_KEYS columns of the COAFF rows.
+
+    Returns:
+        pd.Series: The sentences.
+    """
+    mission = missions["Missions_en_cours"]
+    rate = (missions["Tx_occup"].astype(float) * 100).astype(int).astype(str) + "%"
+    period = (
+        " from "
+        + missions["Date_Demarrage"].astype(str)
+        + " to "
+        + missions["Date_de_fin"].astype(str)
+    )
+    sentences = (
+        "Mission "
+        + missions["Competences"].astype(str)
+        + " at "
+        + rate
+        + " occupation at "
+        + mission.astype(str)
+        + period
+    )
+    sentences = sentences.mask(mission == "congés", "On leave at " + rate + period)
+    return sentences.mask(mission == "DISPO ICE", "Available at " + rate + period)
+
+
+def competency_sentences(competencies: pd.DataFrame) -> pd.Series:
+    """
+    Describes competencies, one sentence per row. The sentence of an unknown
+    proficiency level is None.
+
+    Args:
+        competencies (pd.DataFrame): The COMPETENCY_KEYS columns of the PSA RM rows.
+
+    Returns:
+        pd.Series: The sentences.
+    """
+    level = competencies["Proficiency Description"].map(PROFICIENCY_LEVELS)
+    sentences = (
+        "Competent in " + competencies["Description"].astype(str) + " at " + level
+    )
+    return sentences.astype(object).where(level.notna(), None)
+
+
+def certification_sentences(certifications: pd.DataFrame) -> pd.Series:
+    """
+    Describes certifications, one sentence per row.
+
+    Args:
+        certifications (pd.DataFrame): The CERTIFICATION_KEYS columns of the rows.
+
+    Returns:
+        pd.Series: The sentences.
+    """
+    return (
+        "Certified "
+        + certifications["Certification"].astype(str)
+        + " ("
+        + certifications["Code_cert"].astype(str)
+        + ") since "
+        + certifications["Obtention"].astype(str)
+        + " and until "
+        + certifications["Expiration"].astype(str)
+    )
+
+
+def member_descriptions(members: pd.DataFrame) -> pd.Series:
+    """
+    Builds the description of members, which identifies them in the profiles.
+
+    Args:
+        members (pd.DataFrame): The MEMBER_KEYS columns.
+
+    Returns:
+        pd.Series: The descriptions.
+    """
+    developer = members["Métier"] == "Développeur, Programmeur"
+    return (
+        "Nom: "
+        + members["Nom"].astype(str)
+        + ", Code: "
+        + members["Code"].astype(str)
+        + ", Coefficient: "
+        + members["COEFF_F212"].astype(str)
+        + ", Profil: "
+        + members["PROFIL"].astype(str)
+        + ", Localisation: "
+        + members["Localisation"].astype(str)
+        + ", Equipe: "
+        + members["Stream_BT"].astype(str)
+        + ", Manager: "
+        + members["Supervisor Name"].astype(str)
+        + ", "
+        + ("Métier: " + members["Métier"].astype(str) + ", ").where(developer, "")
+    )
+
+
+def sentence_lists(df, group_keys, item_keys, sentences) -> pd.DataFrame:
+    """
+    Aggregates the rows of a table into one list of sentences per group, one sentence
+    per distinct item of the group, in the order of a groupby on the item keys.
+
+    Args:
+        df (pd.DataFrame): The table.
+        group_keys (list): The columns identifying a group.
+        item_keys (list): The columns identifying an item.
+        sentences (callable): Builds the sentences of the item rows.
+
+    Returns:
+        pd.DataFrame: The group_keys columns and the list of sentences of each group,
+        empty for a group without valid item.
+    """
+    groups = df[group_keys].dropna().drop_duplicates()
+    items = df[group_keys + item_keys].dropna().drop_duplicates()
+    items = items.sort_values(group_keys + item_keys, kind="stable")
+    texts = sentences(items).tolist()
+    sizes = items.groupby(group_keys, sort=False).size()
+    bounds = np.concatenate([[0], np.cumsum(sizes.to_numpy())])
+    lists = sizes.index.to_frame(index=False).assign(
+        sentences=[texts[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    )
+    groups = groups.merge(lists, on=group_keys, how="left")
+    groups["sentences"] = [
+        sentences if isinstance(sentences, list) else []
+        for sentences in groups["sentences"]
+    ]
+    return groups
+
+
+def fill_unknown_levels(missions, competencies, certifications):
+    # The loop reuses the previous sentence, whatever its kind, for an unknown level
+    last = None
+    for i in range(len(competencies)):
+        if missions[i]:
+            last = missions[i][-1]
+        if None in competencies[i]:
+            filled = []
+            for sentence in competencies[i]:
+                if sentence is None:
+                    if last is None:
+                        raise ValueError(
+                            "Unknown proficiency level for the first competency."
+                        )
+                    sentence = last
+                filled.append(sentence)
+                last = sentence
+            competencies[i] = filled
+        elif competencies[i]:
+            last = competencies[i][-1]
+        if certifications[i]:
+            last = certifications[i][-1]
+
+
+def profiles_by_member(coaff_df, psarm_df, certs_df) -> pd.DataFrame:
+    """
+    Builds the missions, competencies and certifications of each member with vectorized
+    operations. Each table is first aggregated into one list of sentences per member,
+    then the lists are joined, one row per member: the size of the join grows with the
+    number of members, not with the product of their missions, competencies and
+    certifications. Same result as profiles_by_member_loop.
+
+    Args:
+        coaff_df (pd.DataFrame): The COAFF fixtures.
+        psarm_df (pd.DataFrame): The PSA RM fixtures.
+        certs_df (pd.DataFrame): The certifications fixtures.
+
+    Returns:
+        pd.DataFrame: The lists of sentences of each member, indexed by its description.
+    """
+    psarm_df = psarm_df.assign(
+        Métier=psarm_df["Description"]
+        .str.contains("développements|programmation", na=False)
+        .map({True: "Développeur, Programmeur", False: "Autre"})
+    )
+    missions = sentence_lists(
+        coaff_df,
+        ["Nom", "COEFF_F212", "PROFIL", "Localisation", "Stream_BT"],
+        MISSION_KEYS,
+        mission_sentences,
+    ).rename(columns={"sentences": "Missions"})
+    competencies = sentence_lists(
+        psarm_df,
+        ["Nom", "Code", "Supervisor Name", "Métier"],
+        COMPETENCY_KEYS,
+        competency_sentences,
+    ).rename(columns={"sentences": "Compétences"})
+    certifications = sentence_lists(
+        certs_df, ["Nom"], CERTIFICATION_KEYS, certification_sentences
+    ).rename(columns={"sentences": "Certifications"})
+
+    members = missions.merge(competencies, on="Nom").merge(certifications, on="Nom")
+    members = members.sort_values(MEMBER_KEYS, kind="stable", ignore_index=True)
+    columns = {
+        section: members[section].tolist()
+        for section in ("Missions", "Compétences", "Certifications")
+    }
+    if any(None in sentences for sentences in columns["Compétences"]):
+        fill_unknown_levels(*columns.values())
+
+    profiles = pd.DataFrame(columns, index=member_descriptions(members), dtype=object)
+    if profiles.index.has_duplicates:
+        # Members with the same description are gathered, in order
+        profiles = profiles.groupby(level=0, sort=False).agg(
+            lambda lists: [sentence for sentences in lists for sentence in sentences]
+        )
+    return profiles.rename_axis(None)
+
+
+def pre_processing(
+    fixtures_coaff_path,
+    fixtures_psarm_path,
+    fixtures_certs_path,
+    combined_path,
+    engine=PRE_PROCESSING_ENGINE,
+):
+    coaff_df = read_table(fixtures_coaff_path, COAFF_COLUMNS)
+    psarm_df = read_table(fixtures_psarm_path, PSARM_COLUMNS)
+    certs_df = read_table(fixtures_certs_path, CERTS_COLUMNS)
+
+    if engine == "loop":
+        resultat_df = profiles_by_member_loop(coaff_df, psarm_df, certs_df)
+    else:
+        resultat_df = profiles_by_member(coaff_df, psarm_df, certs_df)
 
     # Rename the first column to 'Membre'
     resultat_df = resultat_df.rename_axis("Membres").reset_index()
@@ -141,21 +454,62 @@ def pre_processing(
     resultat_df["Combined"] = resultat_df["Combined"].str.replace('"', "")
 
     # Extract the name of the member
-    resultat_df["Nom"] = resultat_df["Membres"].apply(
-        lambda x: x.split(",")[0].split(":")[1].strip()
+    resultat_df["Nom"] = (
+        resultat_df["Membres"].str.split(",").str[0].str.split(":").str[1].str.strip()
     )
-    resultat_df["Métier"] = resultat_df["Membres"].apply(
-        lambda x: x.split(",")[-1].split(":")[-1].strip() if "Métier" in x else "Autre"
+    resultat_df["Métier"] = (
+        resultat_df["Membres"]
+        .str.split(",")
+        .str[-1]
+        .str.split(":")
+        .str[-1]
+        .str.strip()
+        .where(resultat_df["Membres"].str.contains("Métier", regex=False), "Autre")
     )
 
     resultat_df = resultat_df.drop_duplicates(subset="Nom", keep="last")
 
-    # Save the final result to a csv file
-    resultat_df.to_csv(combined_path, index=False)
+    # Save the final result, in the format given by the extension of the path
+    write_table(resultat_df, combined_path, COMBINED_SCHEMA)
 
     return resultat_df
 
 
+def profile_lines(resultat_df, type, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Serializes the profiles as JSON lines, in chunks of chunk_size profiles.
+
+    Args:
+        resultat_df (pd.DataFrame): The profiles returned by pre_processing.
+        type (str): The type of profiles.
+        chunk_size (int): The number of profiles per chunk.
+
+    Yields:
+        bytes: The JSON lines of a chunk of profiles.
+    """
+    profiles = resultat_df[
+        ["Membres", "Missions", "Compétences", "Certifications", "Combined"]
+    ]
+    for start in range(0, len(profiles), chunk_size):
+        rows = profiles.iloc[start : start + chunk_size]
+        yield "".join(
+            json.dumps(
+                {
+                    "membre": membre,
+                    "mission": mission,
+                    "competence": competence,
+                    "certification": certification,
+                    "combined": combined,
+                    "type": type,
+                }
+            )
+            + "\n"
+            for membre, mission, competence, certification, combined in rows.itertuples(
+                index=False
+            )
+        ).encode("utf-8")
+
+
 def insert_profiles(db_host, db_port, coaff, psarm, certs, combined, type):
     """
     Insert the profiles into the database.
@@ -172,29 +526,18 @@ def insert_profiles(db_host, db_port, coaff, psarm, certs, combined, type):
     Returns:
         int: The number of profiles added to the database.
     """
-    # Vider la table raw_profiles avant d'insérer les nouveaux profils
     try:
         resultat_df = pre_processing(coaff, psarm, certs, combined)
-        # Insérer le résultat final dans la base de données grâce à une réquète à l'api bdd
-        for index, row in resultat_df.iterrows():
-            payload = {
-                "membre": row["Membres"],
-                "mission": row["Missions"],
-                "competence": row["Compétences"],
-                "certification": row["Certifications"],
-                "combined": row["Combined"],
-                "type": type,
-            }
-
-            try:
-                response = requests.post(
-                    f"http://{db_host}:{db_port}/profile", json=payload
-                )
-                response.raise_for_status()
-
-            except requests.exceptions.HTTPError as err:
-                raise f"HTTP error occurred: {err}"
+        # Insérer le résultat final dans la base de données en une seule requête à l'api
+        # bdd, envoyée par morceaux au fil de la sérialisation
+        response = bdd_api_session.post(
+            f"http://{db_host}:{db_port}/profiles/bulk",
+            params={"type": type},
+            data=profile_lines(resultat_df, type),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        response.raise_for_status()
         return response.json().get("message")
 
     except requests.exceptions.HTTPError as err:
-        raise f"HTTP error occurred: {err}"
+        raise Exception(f"HTTP error occurred: {err}")
@@ -0,0 +1,177 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Format of the tables passed between the ingestion stages: "arrow" (uncompressed, read
+# through a memory map), "parquet" (compressed) or "csv"
+TABLE_FORMAT = os.getenv("TABLE_FORMAT", "arrow")
+# Also write a CSV copy of each table, to open it in a spreadsheet
+TABLE_CSV_EXPORT = os.getenv("TABLE_CSV_EXPORT", "0") == "1"
+
+EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet", "csv": ".csv"}
+
+# Types of the known columns of each table, the other columns keep their inferred type
+COAFF_SCHEMA = {
+    "Localisation": pa.string(),
+    "COEFF_F212": pa.int64(),
+    "PROFIL": pa.string(),
+    "Nom": pa.string(),
+    "Missions_en_cours": pa.string(),
+    "Competences": pa.string(),
+    "Date_Demarrage": pa.date32(),
+    "Date_de_fin": pa.date32(),
+    "Tx_occup": pa.float64(),
+    "Stream_BT": pa.string(),
+}
+PSARM_SCHEMA = {
+    "Nom": pa.string(),
+    "Competency": pa.string(),
+    "Description": pa.string(),
+    "Proficiency Description": pa.string(),
+    "Supervisor Name": pa.string(),
+}
+CERTS_SCHEMA = {
+    "Nom": pa.string(),
+    "Code_cert": pa.string(),
+    "Certification": pa.string(),
+    "Obtention": pa.date32(),
+    "Expiration": pa.date32(),
+}
+COMBINED_SCHEMA = {
+    "Membres": pa.string(),
+    "Missions": pa.list_(pa.string()),
+    "Compétences": pa.list_(pa.string()),
+    "Certifications": pa.list_(pa.string()),
+    "Combined": pa.string(),
+    "Nom": pa.string(),
+    "Métier": pa.string(),
+}
+
+
+def table_path(directory: str, name: str, table_format: str = TABLE_FORMAT) -> str:
+    """
+    Returns the path of a table, with the extension of its format.
+
+    Args:
+        directory (str): The directory of the table.
+        name (str): The name of the table, without extension.
+        table_format (str): The format of the table.
+
+    Returns:
+        str: The path to the table file.
+    """
+    return os.path.join(directory, name + EXTENSIONS[table_format])
+
+
+def _table_format(path):
+    extension = os.path.splitext(path)[1]
+    for table_format, known in EXTENSIONS.items():
+        if extension == known:
+            return table_format
+    raise ValueError(f"Unknown table format: {path}")
+
+
+def _column_array(values, type):
+    if type is None:
+        try:
+            return pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed values read from a workbook, stored as text like in a CSV file
+            type = pa.string()
+    if type == pa.date32():
+        dates = pd.to_datetime(values, errors="coerce")
+        return pa.array(dates, from_pandas=True).cast(type, safe=False)
+    if type == pa.string():
+        values = values.where(values.isna(), values.astype(str))
+    elif pa.types.is_integer(type) or pa.types.is_floating(type):
+        values = pd.to_numeric(values, errors="coerce")
+    return pa.array(values, type=type, from_pandas=True)
+
+
+def to_arrow(df: pd.DataFrame, schema: dict = None) -> pa.Table:
+    """
+    Converts a DataFrame to an Arrow table, with the types of its known columns.
+
+    Args:
+        df (pd.DataFrame): The table, its index is not kept.
+        schema (dict): The Arrow type of the known columns.
+
+    Returns:
+        pa.Table: The typed table.
+    """
+    schema = schema or {}
+    return pa.Table.from_arrays(
+        [_column_array(df[column], schema.get(column)) for column in df.columns],
+        names=[str(column) for column in df.columns],
+    )
+
+
+def write_table(df: pd.DataFrame, path: str, schema: dict = None) -> None:
+    """
+    Writes a table in the format given by the extension of its path, and its CSV copy if
+    TABLE_CSV_EXPORT is set.
+
+    Args:
+        df (pd.DataFrame): The table, its index is not kept.
+        path (str): The path to the table file.
+        schema (dict): The Arrow type of the known columns.
+    """
+    table_format = _table_format(path)
+    if table_format == "csv" or TABLE_CSV_EXPORT:
+        df.to_csv(os.path.splitext(path)[0] + ".csv", index=False)
+    if table_format == "arrow":
+        feather.write_feather(to_arrow(df, schema), path, compression="uncompressed")
+    elif table_format == "parquet":
+        pq.write_table(to_arrow(df, schema), path)
+
+
+def read_table(path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Reads the columns of a table, in the format given by the extension of its path. The
+    Arrow files are memory-mapped, only the pages of the requested columns are read.
+
+    Args:
+        path (str): The path to the table file.
+        columns (list): The columns to read, all of them if None.
+
+    Returns:
+        pd.DataFrame: The table, with its dates as datetime.date objects.
+    """
+    table_format = _table_format(path)
+    if table_format == "csv":
+        df = pd.read_csv(path, usecols=columns)
+        return df if columns is None else df[columns]
+    if table_format == "arrow":
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def remove_table(path: str) -> None:
+    """
+    Deletes a table and its CSV copy, if they exist.
+
+    Args:
+        path (str): The path to the table file.
+    """
+    for file in {path, os.path.splitext(path)[0] + ".csv"}:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def move_table(source: str, destination: str) -> None:
+    """
+    Moves a table and its CSV copy, if any, with os.replace: the readers of the
+    destination see either the old table or the new one.
+
+    Args:
+        source (str): The path to the table file.
+        destination (str): The new path of the table file, in the same format.
+    """
+    source_csv = os.path.splitext(source)[0] + ".csv"
+    if source_csv != source and os.path.exists(source_csv):
+        os.replace(source_csv, os.path.splitext(destination)[0] + ".csv")
+    os.replace(source, destination)
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+import pandas as pd
+
+from log_module.prometheus_metrics import count_cache_lookup
+
+# Parsed sheets kept in memory, the workbooks of one upload are read by several stages
+WORKBOOK_CACHE_SIZE = int(os.getenv("WORKBOOK_CACHE_SIZE", 6))
+# pandas engine reading the workbooks, "auto" picks calamine when it is installed
+WORKBOOK_ENGINE = os.getenv("WORKBOOK_ENGINE", "auto")
+
+# Parsed sheets, keyed by (content hash, header row, engine), least recently used first
+_sheets = OrderedDict()
+# Content hashes, keyed by path, with the stat signature they were computed at
+_digests = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def workbook_engine() -> str:
+    """
+    Returns the engine used to read the workbooks.
+
+    Returns:
+        str: WORKBOOK_ENGINE, or for "auto" calamine if installed, openpyxl otherwise.
+    """
+    if WORKBOOK_ENGINE != "auto":
+        return WORKBOOK_ENGINE
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def _digest(path):
+    stat = os.stat(path)
+    # The workbooks are moved between the temp and sources directories by os.replace,
+    # which keeps their modification time, so the hash follows them
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached is None or cached[0] != signature:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        cached = (signature, sha.hexdigest())
+        _digests[path] = cached
+    return cached[1]
+
+
+def read_workbook(path: str, header_row: int = None) -> pd.DataFrame:
+    """
+    Reads the first sheet of a workbook, parsing it only once as long as its content and
+    modification time are unchanged, even if it was moved in the meantime.
+
+    Args:
+        path (str): The path to the workbook.
+        header_row (int): The row holding the column names, when the sheet starts with
+            rows of information above them. These rows are dropped.
+
+    Returns:
+        pd.DataFrame: A copy of the sheet, free to be modified.
+    """
+    engine = workbook_engine()
+    with _lock:
+        key = (_digest(os.path.abspath(path)), header_row, engine)
+        df = _sheets.get(key)
+        if df is not None:
+            _sheets.move_to_end(key)
+            _stats["hits"] += 1
+            count_cache_lookup("workbook", True)
+            return df.copy()
+
+    df = pd.read_excel(path, engine=engine)
+    if header_row is not None:
+        df = df.rename(columns=df.iloc[header_row].to_dict()).drop(
+            df.index[: header_row + 1]
+        )
+        # The rows of information made all the columns text, the values get their type
+        df = df.infer_objects()
+    logging.info(f"Workbook {os.path.basename(path)} read with {engine}.")
+
+    with _lock:
+        _stats["misses"] += 1
+        count_cache_lookup("workbook", False)
+        _sheets[key] = df
+        _sheets.move_to_end(key)
+        while len(_sheets) > WORKBOOK_CACHE_SIZE:
+            _sheets.popitem(last=False)
+    return df.copy()
+
+
+def clear_workbook_cache() -> None:
+    """
+    Drops the parsed sheets.
+    """
+    with _lock:
+        _sheets.clear()
+        _digests.clear()
+
+
+def cache_stats() -> dict:
+    """
+    Returns the hit/miss counters of the workbook cache.
+
+    Returns:
+        dict: The hits and misses counters.
+    """
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,35 @@
+# Command: gunicorn -c gunicorn.conf.py rag_api:app
+import gc
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('RAG_API_PORT', '8080')}"
+workers = int(os.getenv("RAG_API_WORKERS", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("RAG_API_TIMEOUT", 300))
+
+# Import the application once in the master, with the spaCy model, so that the forked
+# workers share its memory pages copy-on-write instead of loading one copy each
+preload_app = True
+os.environ.setdefault("SPACY_PRELOAD", "1")
+
+# Each worker writes its Prometheus metrics to this directory so that /metrics reports
+# the whole server whichever worker answers the scrape. Emptied at every start.
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rag_api_metrics")
+)
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir)
+
+
+def pre_fork(server, worker):
+    # Move the preloaded objects out of the garbage collector's reach: collections in the
+    # workers would otherwise write to their headers and copy the shared pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,97 @@
+import os
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from log_module.prometheus_metrics import HTTP_CONNECTIONS, HTTP_REQUESTS
+
+# Kept-alive connections per host, at least the number of threads calling the host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+# Timeouts in seconds, the read timeout of the model APIs covers whole generations
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+MINAI_READ_TIMEOUT = float(os.getenv("MINAI_READ_TIMEOUT", 300))
+# Retries of failed connections, and of idempotent requests answered by 502/503/504
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 3))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.5))
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.labels(self.host).inc()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.labels(self.host).inc()
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTP adapter applying a default timeout and counting the requests sent and the
+    connections opened per host, whose difference is the number of reused connections.
+    """
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        HTTP_REQUESTS.labels(urlparse(request.url).hostname).inc()
+        if timeout is None:
+            timeout = self.timeout
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def create_session(
+    read_timeout: float = HTTP_READ_TIMEOUT,
+    pool_size: int = HTTP_POOL_SIZE,
+    retries: int = HTTP_RETRIES,
+) -> requests.Session:
+    """
+    Creates a session keeping its connections alive, with a default timeout and retries
+    with exponential backoff. Connection failures are retried for every method, HTTP
+    errors only for idempotent methods.
+
+    Args:
+        read_timeout (float): The default read timeout, in seconds.
+        pool_size (int): The number of connections kept per host.
+        retries (int): The number of retries.
+
+    Returns:
+        requests.Session: The session, safe to share between threads.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        # The last response is returned so that the callers' raise_for_status still applies
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(
+        timeout=(HTTP_CONNECT_TIMEOUT, read_timeout),
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Sessions shared by the whole process, one per remote service
+bdd_api_session = create_session()
+minai_session = create_session(read_timeout=MINAI_READ_TIMEOUT)
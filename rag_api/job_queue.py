@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+# Local database of the jobs, shared by the workers of the API
+JOBS_DB_PATH = os.getenv(
+    "JOBS_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "jobs", "jobs.db")
+)
+# Jobs run at the same time, across all the processes sharing the database
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+# A running job whose heartbeat is older than this (s) was interrupted and is requeued
+JOB_LEASE = float(os.getenv("JOB_LEASE", 60))
+# Delay (s) between two looks for a job queued by another process
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+# Runs of an interrupted job before it is marked as failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+
+class JobProgress:
+    """
+    Records the stages of a running job, each one as soon as it starts and ends, so that
+    the progress can be polled while the job runs.
+    """
+
+    def __init__(self, queue, job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times a stage of the job.
+
+        Args:
+            name (str): The stage name.
+        """
+        stage = {"name": name, "status": "running", "started_at": time.time()}
+        self.stages.append(stage)
+        self.queue._save_stages(self.job_id, self.stages)
+        start_time = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stage["status"] = "failed"
+            raise
+        else:
+            stage["status"] = "done"
+        finally:
+            stage["duration"] = round(time.perf_counter() - start_time, 3)
+            self.queue._save_stages(self.job_id, self.stages)
+
+
+class JobQueue:
+    """
+    Persistent job queue stored in SQLite, run by a pool of background threads. The jobs
+    survive a restart: a running job stops sending heartbeats when its process dies, and
+    is requeued once its lease expires.
+
+    The handler is called with the payload of the job and a JobProgress, its return value
+    is stored as the result of the job. If the payload has a "file" key, that file is
+    deleted once the job is finished.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        handler,
+        workers: int = JOB_WORKERS,
+        lease: float = JOB_LEASE,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.owner = self._new_owner()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+        self._created = False
+
+    @staticmethod
+    def _new_owner():
+        return f"{os.getpid()}-{uuid.uuid4().hex}"
+
+    def _create(self, db):
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, payload TEXT, "
+            "status TEXT, attempts INTEGER, stages TEXT, result TEXT, error TEXT, "
+            "owner TEXT, heartbeat REAL, created_at REAL, started_at REAL, "
+            "finished_at REAL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, created_at)"
+        )
+
+    @contextmanager
+    def _connect(self):
+        # The database is created on first use, not when the API module is imported
+        if not self._created:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit, the transactions are opened explicitly where needed
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._created:
+                self._create(db)
+                self._created = True
+            yield db
+        finally:
+            db.close()
+
+    def enqueue(self, payload: dict) -> str:
+        """
+        Stores a job and wakes up a worker of this process.
+
+        Args:
+            payload (dict): The JSON arguments of the handler.
+
+        Returns:
+            str: The ID of the job.
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, payload, status, attempts, stages, created_at) "
+                "VALUES (?, ?, 'queued', 0, '[]', ?)",
+                (job_id, json.dumps(payload), time.time()),
+            )
+        with self._condition:
+            self._condition.notify()
+        logging.info(f"Job {job_id} queued.")
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        """
+        Returns the state of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            dict: The status, attempts, stages, result and error of the job, with its
+            creation, start and end times, or None if the job does not exist.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, status, attempts, stages, result, error, created_at, "
+                "started_at, finished_at, payload FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(
+            zip(
+                (
+                    "job_id",
+                    "status",
+                    "attempts",
+                    "stages",
+                    "result",
+                    "error",
+                    "created_at",
+                    "started_at",
+                    "finished_at",
+                ),
+                row[:-1],
+            )
+        )
+        job["stages"] = json.loads(job["stages"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["filename"] = json.loads(row[-1]).get("filename")
+        return job
+
+    def _claim(self):
+        now = time.time()
+        with self._connect() as db:
+            # The write lock is taken first, only one process claims a job at a time
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                expired = db.execute(
+                    "SELECT id, attempts, payload FROM jobs "
+                    "WHERE status = 'running' AND heartbeat < ?",
+                    (now - self.lease,),
+                ).fetchall()
+                for job_id, attempts, payload in expired:
+                    if attempts < self.max_attempts:
+                        logging.warning(f"Job {job_id} interrupted, requeued.")
+                        db.execute(
+                            "UPDATE jobs SET status = 'queued', owner = NULL "
+                            "WHERE id = ?",
+                            (job_id,),
+                        )
+                    else:
+                        self._finish(
+                            db,
+                            job_id,
+                            payload,
+                            error=f"Interrupted {attempts} times.",
+                        )
+
+                (running,) = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'running'"
+                ).fetchone()
+                row = None
+                if running < self.workers:
+                    row = db.execute(
+                        "SELECT id, payload FROM jobs WHERE status = 'queued' "
+                        "ORDER BY created_at LIMIT 1"
+                    ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                        "stages = '[]', error = NULL, owner = ?, heartbeat = ?, "
+                        "started_at = ? WHERE id = ?",
+                        (self.owner, now, now, row[0]),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, db, job_id, payload, result=None, error=None):
+        db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, "
+            "finished_at = ? WHERE id = ?",
+            (
+                "failed" if error is not None else "done",
+                json.dumps(result) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+        file = json.loads(payload).get("file")
+        if file and os.path.exists(file):
+            os.remove(file)
+
+    def _save_stages(self, job_id, stages):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET stages = ?, heartbeat = ? WHERE id = ?",
+                (json.dumps(stages), time.time(), job_id),
+            )
+
+    def run_next(self) -> bool:
+        """
+        Runs the oldest queued job, if the limit of running jobs allows it.
+
+        Returns:
+            bool: True if a job was run.
+        """
+        row = self._claim()
+        if row is None:
+            return False
+        job_id, payload = row
+        logging.info(f"Job {job_id} started.")
+
+        result, error = None, None
+        try:
+            result = self.handler(json.loads(payload), JobProgress(self, job_id))
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            error = str(e)
+        with self._connect() as db:
+            self._finish(db, job_id, payload, result, error)
+        logging.info(f"Job {job_id} finished.")
+        return True
+
+    def _work(self):
+        while not self._closed:
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                logging.error(f"Job queue error: {e}")
+            with self._condition:
+                if not self._closed:
+                    self._condition.wait(self.poll_interval)
+
+    def _beat(self):
+        # The handlers may run one stage for minutes, the lease is renewed meanwhile
+        while not self._closed:
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        "UPDATE jobs SET heartbeat = ? "
+                        "WHERE owner = ? AND status = 'running'",
+                        (time.time(), self.owner),
+                    )
+            except Exception as e:
+                logging.warning(f"Job heartbeat failed: {e}")
+            with self._condition:
+                if not self._closed:
+                    self._condition.wait(self.lease / 3)
+
+    def start(self) -> None:
+        """
+        Starts the workers and the heartbeat of this process.
+        """
+        # The queue may be built before the workers are forked, each process must renew
+        # only the leases of its own jobs: the owner is drawn again once started
+        self.owner = self._new_owner()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+        ] + [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Stops the workers. A job still running after timeout seconds is abandoned, it is
+        requeued once its lease expires.
+
+        Args:
+            timeout (float): The maximum time to wait, in seconds.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import deque
+
+
+def _fold(text):
+    # Lowercase character by character so that positions match the original text
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def _is_word(text, i):
+    # Same definition as \w for str patterns, outside the text is not a word character
+    return 0 <= i < len(text) and (text[i].isalnum() or text[i] == "_")
+
+
+def _at_boundary(text, i):
+    # Same definition as \b: a transition between a word and a non-word character
+    return _is_word(text, i - 1) != _is_word(text, i)
+
+
+class _Automaton:
+    """
+    Aho–Corasick automaton over lowercased keywords. Each keyword carries payloads
+    returned with the end position of every occurrence, overlapping ones included.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for keyword, payload in keywords:
+            state = 0
+            for c in keyword:
+                if c not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][c] = len(self.goto) - 1
+                state = self.goto[state][c]
+            self.output[state].append((len(keyword), payload))
+
+        # Breadth-first computation of the failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and c not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(c, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter(self, text):
+        state = 0
+        for end, c in enumerate(text):
+            while state and c not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(c, 0)
+            for length, payload in self.output[state]:
+                yield end - length + 1, end + 1, payload
+
+
+class AcronymMatcher:
+    """
+    Detects the acronyms of a JSON file, or their definitions, in a single pass over the
+    text. The file is reloaded when its modification time or size changes.
+
+    An acronym is detected when the text contains, case-insensitively, the acronym as a
+    whole word, the acronym followed by its definition in parentheses, or the definition
+    as a whole word.
+    """
+
+    ACRONYM, DEFINITION = 0, 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._state = None
+        self._version = 0
+        self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                acronyms = json.load(f)
+            items = list(acronyms.items())
+            keywords = []
+            for i, (acronym, definition) in enumerate(items):
+                keywords.append((_fold(acronym), (i, self.ACRONYM)))
+                keywords.append((_fold(definition), (i, self.DEFINITION)))
+            # Acronym followed by its definition, only tried when the acronym occurs
+            with_definition = [
+                re.compile(
+                    rf"{re.escape(acronym)}\s*\({re.escape(definition)}\)",
+                    re.IGNORECASE,
+                )
+                for acronym, definition in items
+            ]
+            # Swapped as a whole so that concurrent calls never see a partial state
+            self._state = (items, _Automaton(keywords), with_definition)
+            self._signature = signature
+            self._version += 1
+            logging.info(f"{len(items)} acronyms loaded from {self.path}.")
+
+    @property
+    def acronyms(self) -> dict:
+        """
+        Returns the acronyms and their definitions, as currently loaded.
+
+        Returns:
+            dict: The definition of each acronym.
+        """
+        return dict(self._state[0])
+
+    @property
+    def version(self) -> int:
+        """
+        Reloads the file if it changed, and returns the number of times it was loaded. The
+        results computed from the detected acronyms must be keyed by this version.
+
+        Returns:
+            int: The version of the acronyms currently loaded.
+        """
+        self._reload_if_changed()
+        return self._version
+
+    def detect(self, text: str) -> dict:
+        """
+        Detects the acronyms mentioned in a text.
+
+        Args:
+            text (str): The text to search.
+
+        Returns:
+            dict: The detected acronyms and their definitions, in the order of the file.
+        """
+        self._reload_if_changed()
+        items, automaton, with_definition = self._state
+
+        found = set()
+        occurring = set()
+        for start, end, (i, kind) in automaton.iter(_fold(text)):
+            if i in found:
+                continue
+            if _at_boundary(text, start) and _at_boundary(text, end):
+                found.add(i)
+            elif kind == self.ACRONYM:
+                occurring.add(i)
+
+        for i in occurring - found:
+            if with_definition[i].search(text):
+                found.add(i)
+
+        return {items[i][0]: items[i][1] for i in sorted(found)}
@@ -0,0 +1,142 @@
+import re
+import datetime
+
+# Date formats merged into a single alternation. At a given position the first matching
+# alternative wins, so the most specific formats come first. The alternation is wrapped in
+# a lookahead so that overlapping dates are found too, like with one scan per format.
+date_formats = [
+    r"\d{4}-\d{2}-\d{2}",  # YYYY-MM-DD (ISO 8601)
+    r"\d{4}/\d{2}/\d{2}",  # YYYY/MM/DD
+    r"\d{4}\.\d{2}\.\d{2}",  # YYYY.MM.DD
+    r"\d{4} \d{2} \d{2}",  # YYYY MM DD
+    r"\d{4}-\w+-\d{2}",  # YYYY-Month-DD
+    r"\d{4} \w+ \d{1,2}",  # YYYY Month DD
+    r"\d{1,2}/\d{1,2}/\d{4}",  # DD/MM/YYYY
+    r"\d{1,2}-\d{1,2}-\d{4}",  # DD-MM-YYYY
+    r"\d{1,2}\.\d{1,2}\.\d{4}",  # DD.MM.YYYY
+    r"\d{1,2} \d{1,2} \d{4}",  # DD MM YYYY
+    r"\d{1,2}/\d{1,2}/\d{2,4}",  # DD/MM/YY
+    r"\d{1,2}-\w+-\d{4}",  # DD-Month-YYYY
+    r"\d{1,2} \w+ \d{4}",  # DD Month YYYY
+    r"\w+ \d{1,2}th, \d{4}",  # Month DDth, YYYY
+    r"\w+ \d{1,2}, \d{4}",  # Month DD, YYYY
+    r"\w+ \d{1,2} \d{4}",  # Month DD YYYY
+    r"\w+ \d{4}",  # Month YYYY
+    r"\d{4} \w+",  # YYYY Month
+    r"\d{2}\d{2}\d{2}",  # YYMMDD (compact format)
+]
+
+date_pattern = re.compile(r"(?=\b(" + "|".join(date_formats) + r")\b)", re.IGNORECASE)
+
+# Month names in French and English, with and without accents
+month_numbers = {
+    **dict.fromkeys(["janvier", "january", "jan"], 1),
+    **dict.fromkeys(["février", "fevrier", "february", "feb", "fév", "fev"], 2),
+    **dict.fromkeys(["mars", "march", "mar"], 3),
+    **dict.fromkeys(["avril", "april", "apr", "avr"], 4),
+    **dict.fromkeys(["mai", "may"], 5),
+    **dict.fromkeys(["juin", "june", "jun"], 6),
+    **dict.fromkeys(["juillet", "july", "jul", "juil"], 7),
+    **dict.fromkeys(["août", "aout", "august", "aug"], 8),
+    **dict.fromkeys(["septembre", "september", "sep", "sept"], 9),
+    **dict.fromkeys(["octobre", "october", "oct"], 10),
+    **dict.fromkeys(["novembre", "november", "nov"], 11),
+    **dict.fromkeys(["décembre", "decembre", "december", "dec", "déc"], 12),
+}
+
+# Layouts of the parsed dates, as (regex, order of the year, month and day groups)
+_numeric_layouts = [
+    (re.compile(r"(\d{4})[-/. ](\d{1,2})[-/. ](\d{1,2})"), "ymd"),
+    (re.compile(r"(\d{1,2})[-/. ](\d{1,2})[-/. ](\d{4}|\d{2})"), "dmy"),
+    (re.compile(r"(\d{2})(\d{2})(\d{2})"), "ymd"),
+]
+_named_layouts = [
+    (re.compile(r"(\d{4})[- ](\w+)(?:[- ](\d{1,2}))?"), "ymd"),
+    (re.compile(r"(\d{1,2})[- ](\w+)[- ](\d{4})"), "dmy"),
+    (re.compile(r"(\w+) (?:(\d{1,2})(?:st|nd|rd|th)?,? )?(\d{4})"), "mdy"),
+]
+
+
+def _to_date(year, month, day):
+    year = int(year)
+    if year < 100:
+        # Same pivot as strptime's %y
+        year += 1900 if year >= 69 else 2000
+    try:
+        return datetime.date(year, month, int(day) if day else 1)
+    except ValueError:
+        return None
+
+
+def parse_date(text: str):
+    """
+    Parses a date detected in a query. Dates without a day are mapped to the first day of
+    the month.
+
+    Args:
+        text (str): The detected date, such as "12/03/2024" or "mars 2024".
+
+    Returns:
+        datetime.date: The parsed date, or None when it is not a calendar date.
+    """
+    text = " ".join(text.lower().split())
+
+    for layout, order in _numeric_layouts:
+        match = layout.fullmatch(text)
+        if match:
+            parts = dict(zip(order, match.groups()))
+            return _to_date(parts["y"], int(parts["m"]), parts["d"])
+
+    for layout, order in _named_layouts:
+        match = layout.fullmatch(text)
+        if match:
+            parts = dict(zip(order, match.groups()))
+            month = month_numbers.get(parts["m"])
+            if month is None:
+                continue
+            return _to_date(parts["y"], month, parts["d"])
+
+    return None
+
+
+def extract_dates(text: str) -> list:
+    """
+    Detects the dates of a text in a single scan.
+
+    Args:
+        text (str): The text to search.
+
+    Returns:
+        list: (detected text, ISO date or None) tuples, without duplicates, in order of
+        appearance.
+    """
+    seen = set()
+    dates = []
+    for match in date_pattern.finditer(text):
+        date_str = match.group(1)
+        if date_str in seen:
+            continue
+        seen.add(date_str)
+        parsed = parse_date(date_str)
+        dates.append((date_str, parsed.isoformat() if parsed else None))
+    return dates
+
+
+def sort_dates(dates: list) -> list:
+    """
+    Sorts detected dates: calendar dates chronologically, then the others alphabetically.
+
+    Args:
+        dates (list): The detected dates, as strings.
+
+    Returns:
+        list: The sorted dates, without duplicates.
+    """
+    parsed, unparsed = [], []
+    for date_str in dict.fromkeys(dates):
+        date = parse_date(date_str)
+        if date is None:
+            unparsed.append(date_str)
+        else:
+            parsed.append((date, date_str))
+    return [date_str for _, date_str in sorted(parsed)] + sorted(unparsed)
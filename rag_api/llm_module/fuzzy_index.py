@@ -0,0 +1,108 @@
+import numpy as np
+from collections import Counter
+from rapidfuzz import fuzz, process
+
+
+def fuzzy_ratio(s1: str, s2: str) -> int:
+    """
+    Similarity between two strings, identical to fuzzywuzzy's fuzz.ratio backed by
+    python-Levenshtein: the rounded normalized InDel similarity.
+
+    Args:
+        s1 (str): The first string.
+        s2 (str): The second string.
+
+    Returns:
+        int: The similarity, from 0 to 100.
+    """
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
+    return int(round(fuzz.ratio(s1, s2)))
+
+
+class FuzzyIndex:
+    """
+    Precomputed index returning the entries of a vocabulary whose fuzzy_ratio with a
+    token is strictly greater than a threshold, case-insensitively.
+
+    The similarity is 200 * LCS / (len1 + len2), and the LCS can't exceed the number of
+    characters the two strings have in common. The index keeps the character counts of
+    every entry, so this upper bound is computed for the whole vocabulary with a few
+    vectorized operations. Only the candidates passing the length and character bounds
+    are verified with rapidfuzz.
+    """
+
+    def __init__(self, vocabulary: list, threshold: int):
+        self.vocabulary = list(vocabulary)
+        self.threshold = threshold
+
+        # Lowercased distinct entries, with the vocabulary positions sharing each one
+        positions = {}
+        for i, entry in enumerate(self.vocabulary):
+            positions.setdefault(entry.lower(), []).append(i)
+        self._entries = list(positions)
+        self._positions = list(positions.values())
+        self._lengths = np.array([len(e) for e in self._entries], dtype=np.int32)
+
+        # Character counts of each entry: one column per character of the vocabulary
+        alphabet = sorted({c for e in self._entries for c in e})
+        self._columns = {c: j for j, c in enumerate(alphabet)}
+        self._counts = np.zeros((len(self._entries), len(alphabet)), dtype=np.int32)
+        for i, entry in enumerate(self._entries):
+            for c, count in Counter(entry).items():
+                self._counts[i, self._columns[c]] = count
+
+        # A score above the threshold once rounded is at least threshold + 0.5
+        self._cutoff = threshold + 0.5
+
+    def lookup(self, token: str) -> list:
+        """
+        Finds the vocabulary entries similar to a token.
+
+        Args:
+            token (str): The token to look up.
+
+        Returns:
+            list: (vocabulary position, score) tuples, ordered by position.
+        """
+        token = token.lower()
+        if not token or not self._entries:
+            return []
+
+        total_lengths = self._lengths + len(token)
+
+        # Upper bound of the LCS: the characters the token and each entry have in common
+        chars, token_counts = np.unique(list(token), return_counts=True)
+        known = [j for j, c in enumerate(chars) if c in self._columns]
+        if known:
+            columns = [self._columns[chars[j]] for j in known]
+            shared = np.minimum(self._counts[:, columns], token_counts[known]).sum(
+                axis=1
+            )
+        else:
+            shared = np.zeros(len(self._entries), dtype=np.int32)
+
+        # Small tolerance so that float rounding never drops a valid candidate
+        bound = 200 * shared / total_lengths
+        candidates = np.nonzero(bound >= self._cutoff - 1e-9)[0]
+        if len(candidates) == 0:
+            return []
+
+        scores = process.cdist(
+            [token],
+            [self._entries[i] for i in candidates],
+            scorer=fuzz.ratio,
+            score_cutoff=self._cutoff - 1e-6,
+            dtype=np.float64,
+        )[0]
+
+        matches = []
+        for i, score in zip(candidates, scores):
+            if score == 0:
+                continue
+            score = fuzzy_ratio(token, self._entries[i])
+            if score > self.threshold:
+                matches.extend((position, score) for position in self._positions[i])
+        return sorted(matches)
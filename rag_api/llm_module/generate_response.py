@@ -1,13 +1,18 @@
 import os
 import sys
 import json
+import codecs
 import ollama
+import httpx
 import requests
-from typing import Optional
+from typing import Iterator, Optional
 import logging
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from log_module.custom_logging import log_response
+from log_module.prometheus_metrics import track_stage, count_stage_error
+from concurrency import ollama_client, http_client
+from http_pool import minai_session
 
 # Import environment variables
 USERNAME = os.getenv("RAG_LOCAL_USERNAME")
@@ -35,8 +40,6 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s",  # Log format
 )
 
-session = requests.Session()
-
 
 def validate_input(
     question: str,
@@ -56,6 +59,24 @@ def validate_input(
         ValueError: Si les données d'entrée, la question ou le modèle sont invalides.
     """
 
+    validate_question(question)
+
+    # Check if the optional model argument is provided
+    if model:
+        # Check if the model is in the list of available models
+        check_model(model, ollama.list().get("models", []))
+
+
+def validate_question(question: str) -> None:
+    """
+    Valide la question.
+
+    Args:
+        question (str): La question à laquelle répondre.
+
+    Raises:
+        ValueError: Si la question est vide ou trop longue.
+    """
     # Check if the question is empty
     if not question or question.isspace() or not question.strip():
         logging.warning(ERROR_MESSAGES["no_question"])
@@ -66,14 +87,78 @@ def validate_input(
         logging.warning(ERROR_MESSAGES["question_too_long"])
         raise ValueError(ERROR_MESSAGES["question_too_long"])
 
-    # Check if the optional model argument is provided
-    if model:
-        # Check if the model is in the list of available models
-        available_models = ollama.list().get("models", [])
-        model_names = [m["name"] for m in available_models]
-        if model not in model_names:
-            logging.warning(ERROR_MESSAGES["invalid_model"].format(model, model_names))
-            raise ValueError(ERROR_MESSAGES["invalid_model"].format(model, model_names))
+
+def check_model(model: str, available_models: list) -> None:
+    """
+    Vérifie que le modèle fait partie des modèles disponibles.
+
+    Args:
+        model (str): Le modèle à utiliser pour la réponse.
+        available_models (list): Les modèles renvoyés par Ollama.
+
+    Raises:
+        ValueError: Si le modèle n'est pas disponible.
+    """
+    model_names = [m["name"] for m in available_models]
+    if model not in model_names:
+        logging.warning(ERROR_MESSAGES["invalid_model"].format(model, model_names))
+        raise ValueError(ERROR_MESSAGES["invalid_model"].format(model, model_names))
+
+
+def build_prompt(data: list, history: list) -> list:
+    """
+    Builds the messages sent to the model: the system message with the retrieved data,
+    followed by the alternating user and assistant messages.
+
+    Args:
+        data (list): The data to use for the response.
+        history (list): The chat history.
+
+    Returns:
+        list: The messages of the prompt.
+    """
+    with track_stage("prompt_build"):
+        prompt = [
+            {
+                "role": history[0]["role"],
+                "content": history[0]["content"]
+                + "\n"
+                + f"Use this data: {data} to respond to the user in this conversation.",
+            }
+        ]
+
+        for i, message in enumerate(history[1:], start=1):
+            prompt.append(
+                {
+                    "role": "user" if i % 2 == 1 else "assistant",
+                    "content": message["content"],
+                }
+            )
+    return prompt
+
+
+def build_minai_payload(prompt: list, chat_id: str, model: str) -> dict:
+    """
+    Builds the body of a 1min.ai chat request.
+
+    Args:
+        prompt (list): The messages of the prompt.
+        chat_id (str): The conversation ID.
+        model (str): The model to use for the response.
+
+    Returns:
+        dict: The request payload.
+    """
+    return {
+        "type": "CHAT_WITH_AI",
+        "conversationId": f"{chat_id}",
+        "model": f"{model}",
+        "promptObject": {
+            "prompt": f"{prompt}",
+            "isMixed": "false",
+            "webSearch": "false",
+        },
+    }
 
 
 def generate_ollama_response(
@@ -101,22 +186,7 @@ def generate_ollama_response(
         validate_input(question=history[-1]["content"], model=model)
 
         # Add the user and assistant messages to the prompt
-        prompt = [
-            {
-                "role": history[0]["role"],
-                "content": history[0]["content"]
-                + "\n"
-                + f"Use this data: {data} to respond to the user in this conversation.",
-            }
-        ]
-
-        for i, message in enumerate(history[1:], start=1):
-            prompt.append(
-                {
-                    "role": "user" if i % 2 == 1 else "assistant",
-                    "content": message["content"],
-                }
-            )
+        prompt = build_prompt(data, history)
 
         # Generate the response
         output = ollama.generate(
@@ -135,6 +205,56 @@ def generate_ollama_response(
         return str(e)
 
 
+def generate_ollama_response_stream(
+    data: list, history: list, model: str = "llama3.1:8b"
+) -> Iterator[str]:
+    """
+    Generates a response like generate_ollama_response, yielding the text as the model
+    produces it.
+
+    Args:
+        data (list, optional): The data to use for the response.
+        history (list): The chat history.
+        model (str): The model to use for the response.
+
+    Yields:
+        str: The pieces of the generated response, or the error message.
+    """
+    response = ""
+    try:
+        if not history or history == []:
+            logging.warning("History is empty")
+            raise ValueError("History is empty")
+        if not model:
+            logging.warning("No model provided")
+            raise ValueError("No model provided")
+        # Validate inputs
+        validate_input(question=history[-1]["content"], model=model)
+
+        # Add the user and assistant messages to the prompt
+        prompt = build_prompt(data, history)
+
+        # Forward the pieces of the response as soon as they are generated
+        for chunk in ollama.generate(
+            model=model,
+            prompt=json.dumps(prompt),
+            stream=True,
+        ):
+            if chunk["response"]:
+                response += chunk["response"]
+                yield chunk["response"]
+
+        log_response(
+            history[-1]["content"], response
+        )  # Log the asked question and the generated response
+
+    except Exception as e:
+        count_stage_error("generation", model)
+        question = history[-1]["content"] if history else "No history"
+        log_response(question, str(e))  # Log the error message
+        yield str(e)
+
+
 def generate_conversation_id(model: str, prompt: str) -> str:
     # Set up the API request
     url = "https://api.1min.ai/api/conversations"
@@ -152,7 +272,7 @@ def generate_conversation_id(model: str, prompt: str) -> str:
 
     try:
         # Send the request to the Minai API
-        response = session.post(url, headers=headers, json=payload)
+        response = minai_session.post(url, headers=headers, json=payload)
         response.raise_for_status()  # Raise an HTTPError for bad responses
 
         # Check if the response is empty
@@ -213,37 +333,13 @@ def generate_minai_response(data: list, chat_id: str, history: list, model: str)
         }
 
         # Add the user and assistant messages to the payload
-        prompt = [
-            {
-                "role": history[0]["role"],
-                "content": history[0]["content"]
-                + "\n"
-                + f"Use this data: {data} to respond to the user in this conversation.",
-            }
-        ]
-
-        for i, message in enumerate(history[1:], start=1):
-            prompt.append(
-                {
-                    "role": "user" if i % 2 == 1 else "assistant",
-                    "content": message["content"],
-                }
-            )
+        prompt = build_prompt(data, history)
 
         # Prepare the payload with the model
-        payload = {
-            "type": "CHAT_WITH_AI",
-            "conversationId": f"{chat_id}",
-            "model": f"{model}",
-            "promptObject": {
-                "prompt": f"{prompt}",
-                "isMixed": "false",
-                "webSearch": "false",
-            },
-        }
+        payload = build_minai_payload(prompt, chat_id, model)
 
         # Send the request to the Perplexity API
-        response = requests.post(url, headers=headers, json=payload)
+        response = minai_session.post(url, headers=headers, json=payload)
         response.raise_for_status()  # Raise an error for bad responses
 
         # Log HTTP response status if raised
@@ -276,3 +372,211 @@ def generate_minai_response(data: list, chat_id: str, history: list, model: str)
         else:
             log_response(history[-1]["content"], str(e))
         return "I'm sorry, I can't answer you :" + str(e)
+
+
+def generate_minai_response_stream(
+    data: list, chat_id: str, history: list, model: str
+) -> Iterator[str]:
+    """
+    Generates a response like generate_minai_response, yielding the text as the API
+    streams it.
+
+    Args:
+        data (list): The data to use for the response.
+        chat_id (str): The conversation ID.
+        history (list): The chat history.
+        model (str): The model to use for the response.
+
+    Yields:
+        str: The pieces of the generated response, or the error message.
+    """
+    response = None
+    text = ""
+    try:
+        if not history or history == []:
+            logging.warning("History is empty")
+            raise ValueError("History is empty")
+        if not model:
+            logging.warning("No model provided")
+            raise ValueError("No model provided")
+        # Validate inputs
+        validate_input(history[-1]["content"])
+
+        # Set up the API request
+        url = "https://api.1min.ai/api/features?isStreaming=true"
+        headers = {
+            "API-KEY": f"{MINAI_API_KEY}",
+            "Content-Type": "application/json",
+        }
+
+        # Add the user and assistant messages to the payload
+        prompt = build_prompt(data, history)
+
+        # Prepare the payload with the model
+        payload = build_minai_payload(prompt, chat_id, model)
+
+        # Read the body as it arrives instead of waiting for the whole response
+        response = minai_session.post(url, headers=headers, json=payload, stream=True)
+        response.raise_for_status()  # Raise an error for bad responses
+
+        # A UTF-8 character can be split between two chunks
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in response.iter_content(chunk_size=None):
+            piece = decoder.decode(chunk)
+            if piece:
+                text += piece
+                yield piece
+        piece = decoder.decode(b"", final=True)
+        if piece:
+            text += piece
+            yield piece
+
+        # Log the response
+        log_response(history[-1]["content"], text)
+
+    except ValueError as e:
+        count_stage_error("generation", model)
+        # Log the error message
+        if not history or history == []:
+            log_response("No history", str(e))
+        else:
+            log_response(history[-1]["content"], str(e))
+        yield str(e)
+
+    except requests.exceptions.HTTPError as e:
+        count_stage_error("generation", model)
+        logging.error(f"HTTP error occurred: {str(e)}")
+        yield f"I'm sorry, I can't answer you : {response.json()['message']}"
+
+    except Exception as e:
+        count_stage_error("generation", model)
+        # Log the error message
+        if not history or history == []:
+            log_response("No history", str(e))
+        else:
+            log_response(history[-1]["content"], str(e))
+        yield "I'm sorry, I can't answer you :" + str(e)
+
+    finally:
+        if response is not None:
+            response.close()
+
+
+async def agenerate_ollama_response(
+    data: list, history: list, model: str = "llama3.1:8b"
+) -> str:
+    """
+    Generates a response like generate_ollama_response, with the asynchronous Ollama
+    client so that the event loop keeps serving other requests during the generation.
+
+    Args:
+        data (list, optional): The data to use for the response.
+        history (list): The chat history.
+        model (str): The model to use for the response.
+
+    Returns:
+        str: The generated response.
+    """
+    try:
+        if not history or history == []:
+            logging.warning("History is empty")
+            raise ValueError("History is empty")
+        if not model:
+            logging.warning("No model provided")
+            raise ValueError("No model provided")
+        # Validate inputs
+        validate_question(history[-1]["content"])
+        client = ollama_client()
+        check_model(model, (await client.list()).get("models", []))
+
+        # Add the user and assistant messages to the prompt
+        prompt = build_prompt(data, history)
+
+        # Generate the response
+        output = await client.generate(
+            model=model,
+            prompt=json.dumps(prompt),
+        )
+
+        response = output["response"]
+        log_response(
+            history[-1]["content"], response
+        )  # Log the asked question and the generated response
+        return response
+
+    except Exception as e:
+        count_stage_error("generation", model)
+        question = history[-1]["content"] if history else "No history"
+        log_response(question, str(e))  # Log the error message
+        return str(e)
+
+
+async def agenerate_minai_response(
+    data: list, chat_id: str, history: list, model: str
+) -> str:
+    """
+    Generates a response like generate_minai_response, with an asynchronous HTTP client.
+
+    Args:
+        data (list): The data to use for the response.
+        chat_id (str): The conversation ID.
+        history (list): The chat history.
+        model (str): The model to use for the response.
+
+    Returns:
+        str: The generated response.
+    """
+    response = None
+    try:
+        if not history or history == []:
+            logging.warning("History is empty")
+            raise ValueError("History is empty")
+        if not model:
+            logging.warning("No model provided")
+            raise ValueError("No model provided")
+        # Validate inputs
+        validate_question(history[-1]["content"])
+
+        # Set up the API request
+        url = "https://api.1min.ai/api/features?isStreaming=true"
+        headers = {
+            "API-KEY": f"{MINAI_API_KEY}",
+            "Content-Type": "application/json",
+        }
+
+        # Add the user and assistant messages to the payload
+        prompt = build_prompt(data, history)
+
+        # Prepare the payload with the model
+        payload = build_minai_payload(prompt, chat_id, model)
+
+        # Send the request to the 1min.ai API
+        response = await http_client().post(url, headers=headers, json=payload)
+        response.raise_for_status()  # Raise an error for bad responses
+
+        # Log and return the response
+        log_response(history[-1]["content"], response.content)
+        return response.content.decode("utf-8")
+
+    except ValueError as e:
+        count_stage_error("generation", model)
+        # Log the error message
+        if not history or history == []:
+            log_response("No history", str(e))
+        else:
+            log_response(history[-1]["content"], str(e))
+        return str(e)
+
+    except httpx.HTTPStatusError as e:
+        count_stage_error("generation", model)
+        logging.error(f"HTTP error occurred: {str(e)}")
+        return f"I'm sorry, I can't answer you : {response.json()['message']}"
+
+    except Exception as e:
+        count_stage_error("generation", model)
+        # Log the error message
+        if not history or history == []:
+            log_response("No history", str(e))
+        else:
+            log_response(history[-1]["content"], str(e))
+        return "I'm sorry, I can't answer you :" + str(e)
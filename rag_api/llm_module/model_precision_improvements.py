@@ -1,9 +1,16 @@
 import spacy
 import re
-import json
 import os
+import time
+import logging
+import threading
+from functools import lru_cache
 from fuzzywuzzy import fuzz
 
+from llm_module.fuzzy_index import FuzzyIndex
+from llm_module.acronym_matcher import AcronymMatcher
+from llm_module.date_extraction import extract_dates, sort_dates
+
 base_path = os.path.dirname(__file__)
 data_path = os.path.join(base_path, "..", "data", "sources_files")
 
@@ -12,8 +19,47 @@ acronyms_file = os.path.join(data_path, "acronyms.txt")
 profiles_file = os.path.join(data_path, "profils_uniques.txt")
 professions_file = os.path.join(data_path, "professions_uniques.txt")
 
-# Load the pre-trained model for French
-nlp = spacy.load("fr_core_news_lg")
+# Number of analyzed queries kept in memory
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv("QUERY_ANALYSIS_CACHE_SIZE", 1024))
+
+# Pre-trained model for French, loaded on first use
+SPACY_MODEL = os.getenv("SPACY_MODEL", "fr_core_news_lg")
+# Components not used by the query analysis, which only needs the tokens and entities
+SPACY_EXCLUDE = [
+    component.strip()
+    for component in os.getenv(
+        "SPACY_EXCLUDE", "morphologizer,parser,attribute_ruler,lemmatizer"
+    ).split(",")
+    if component.strip()
+]
+# Load the model at import, so that a preloading server shares it with its workers
+SPACY_PRELOAD = os.getenv("SPACY_PRELOAD", "0") == "1"
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    Return the spaCy pipeline, loading it on first call.
+
+    :return: spacy.language.Language (pipeline without the excluded components)
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                start = time.perf_counter()
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+                logging.info(
+                    f"spaCy model {SPACY_MODEL} loaded in {time.perf_counter() - start:.2f}s "
+                    f"with components {_nlp.pipe_names}."
+                )
+    return _nlp
+
+
+if SPACY_PRELOAD:
+    get_nlp()
 
 # List of skills
 with open(descriptions_file, "r", encoding="utf-8") as file:
@@ -31,9 +77,8 @@ skill_levels = {
     "Très bon": ["senior", "avancé", "fort"],
 }
 
-# Dictionary for acronyms and their definitions
-with open(acronyms_file, "r", encoding="utf-8") as f:
-    acronyms_dict = json.load(f)
+# Acronyms and their definitions, reloaded when the file changes
+acronym_matcher = AcronymMatcher(acronyms_file)
 
 # List of professions
 with open(professions_file, "r", encoding="utf-8") as file:
@@ -41,127 +86,91 @@ with open(professions_file, "r", encoding="utf-8") as file:
 professions_list = [prof.strip() for prof in content.split(",")]
 professions_list = [prof.strip('" ') for prof in professions_list]
 
-# Regular expressions to detect different date formats
-date_patterns = [
-    # Existing formats
-    r"\b(\d{1,2}/\d{1,2}/\d{4})\b",  # DD/MM/YYYY
-    r"\b(\d{1,2}-\d{1,2}-\d{4})\b",  # DD-MM-YYYY
-    r"\b(\d{1,2} \w+ \d{4})\b",  # DD Month YYYY
-    r"\b(\w+ \d{4})\b",  # Month YYYY
-    r"\b(\d{1,2} \d{1,2} \d{4})\b",  # DD MM YYYY
-    r"\b(\d{1,2}/\d{1,2}/\d{2,4})\b",  # DD/MM/YY
-    r"\b(\w+ \d{1,2}, \d{4})\b",  # Month DD, YYYY
-    r"\b(\w+ \d{1,2} \d{4})\b",  # Month DD YYYY
-    r"\b(\d{1,2}-\w+-\d{4})\b",  # DD-Month-YYYY
-    r"\b(\w+ \d{1,2}th, \d{4})\b",  # Month DDth, YYYY
-    r"\b(\d{1,2}\.\d{1,2}\.\d{4})\b",  # DD.MM.YYYY
-    r"\b(\d{4}-\d{2}-\d{2})\b",  # YYYY-MM-DD (ISO 8601)
-    r"\b(\d{4}/\d{2}/\d{2})\b",  # YYYY/MM/DD
-    r"\b(\d{4}\.\d{2}\.\d{2})\b",  # YYYY.MM.DD
-    r"\b(\d{4} \d{2} \d{2})\b",  # YYYY MM DD
-    r"\b(\d{4}-\w+-\d{2})\b",  # YYYY-Month-DD
-    r"\b(\d{4} \w+ \d{1,2})\b",  # YYYY Month DD
-    r"\b(\d{4} \w+)\b",  # YYYY Month
-    r"\b(\d{2}\d{2}\d{2})\b",  # YYMMDD (compact format)
-]
+# Fuzzy indexes returning the skills and professions similar to a token
+skills_index = FuzzyIndex(skills_list, 70)
+professions_index = FuzzyIndex(professions_list, 70)
 
 # Regular expression to detect months in French
 month_pattern = r"\b(janvier|février|fevrier|mars|avril|mai|juin|juillet|août|aout|septembre|octobre|novembre|décembre|decembre|Janvier|Février|Fevrier|Mars|Avril|Mai|Juin|Juillet|Août|Aout|Septembre|Octobre|Novembre|Décembre|Decembre)\b"
 
-# Compile each pattern separately with the IGNORECASE flag
-date_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in date_patterns]
-
 
 def detect_dates(text):
-    dates = []
-    for pattern in date_patterns:
-        matches = re.findall(pattern, text)
-        for match in matches:
-            date_str = match if isinstance(match, str) else match[0]
-            if date_str not in dates:
-                dates.append(date_str)
-    return dates
+    return [date_str for date_str, _ in extract_dates(text)]
 
 
-def detect_skills_and_levels(text):
+def detect_skills_and_levels(text, doc=None):
     """
     Detect skills and their levels in a given text.
 
     :param text: str (text to analyze)
+    :param doc: spacy.tokens.Doc (text already parsed, optional)
     :return: dict (skills detected with their levels)
     """
 
-    doc = nlp(text)
+    doc = doc if doc is not None else get_nlp()(text)
     skills_detected = {}
 
     # Iterate over each token in the document 'doc'
     for token in doc:
 
-        # Iterate over each skill in the 'skills_list'
-        for skill in skills_list:
+        # Iterate over each skill of the 'skills_list' with a similarity greater than 70%
+        for position, _ in skills_index.lookup(token.text):
+            skill = skills_list[position]
 
-            # Check if the 'skill' and the 'token' have a similarity greater than 65%
-            if fuzz.ratio(skill.lower(), token.text.lower()) > 70:
+            # Add the detected skill to the 'skills_detected' dictionary with a level "Not specified"
+            skills_detected[skill] = "Non spécifié"
 
-                # Add the detected skill to the 'skills_detected' dictionary with a level "Not specified"
-                skills_detected[skill] = "Non spécifié"
+            # Define a context window around the current token (7 tokens before and 8 after)
+            context_window = doc[max(0, token.i - 7) : token.i + 8]
 
-                # Define a context window around the current token (7 tokens before and 8 after)
-                context_window = doc[max(0, token.i - 7) : token.i + 8]
+            # Iterate over skill levels and associated keywords in 'skill_levels'
+            for level, keywords in skill_levels.items():
 
-                # Iterate over skill levels and associated keywords in 'skill_levels'
-                for level, keywords in skill_levels.items():
+                # Iterate over each keyword associated with a skill level
+                for keyword in keywords:
 
-                    # Iterate over each keyword associated with a skill level
-                    for keyword in keywords:
+                    # Check if any keyword in the context window has a similarity greater than 80%
+                    if any(
+                        fuzz.ratio(keyword, t.text.lower()) > 80 for t in context_window
+                    ):
 
-                        # Check if any keyword in the context window has a similarity greater than 80%
-                        if any(
-                            fuzz.ratio(keyword, t.text.lower()) > 80
+                        # Find the indices of tokens in the context window corresponding to the keyword
+                        keyword_index = [
+                            t.i
                             for t in context_window
-                        ):
+                            if fuzz.ratio(keyword, t.text.lower()) > 70
+                        ]
 
-                            # Find the indices of tokens in the context window corresponding to the keyword
-                            keyword_index = [
-                                t.i
-                                for t in context_window
-                                if fuzz.ratio(keyword, t.text.lower()) > 70
-                            ]
+                        # If a keyword is found in the context window and it is within 7 positions of the current token
+                        if keyword_index and abs(keyword_index[0] - token.i) <= 7:
 
-                            # If a keyword is found in the context window and it is within 7 positions of the current token
-                            if keyword_index and abs(keyword_index[0] - token.i) <= 7:
-
-                                # Update the detected skill level for this skill
-                                skills_detected[skill] = level
-                                break  # Exit the keyword loop once the skill level is detected
+                            # Update the detected skill level for this skill
+                            skills_detected[skill] = level
+                            break  # Exit the keyword loop once the skill level is detected
 
     return skills_detected
 
 
-def detect_profession(text):
+def detect_profession(text, doc=None):
     """
     Detect the main profession in a given text.
 
     :param text: str (text to analyze)
+    :param doc: spacy.tokens.Doc (text already parsed, optional)
     :return: tuple (main profession detected, confidence level)
     """
 
-    doc = nlp(text)
+    doc = doc if doc is not None else get_nlp()(text)
     professions = {}
 
     # Iterate over each token in the document 'doc'
     for token in doc:
 
-        # Iterate over each profession in the 'professions_list'
-        for profession in professions_list:
-
-            # Check if the 'profession' and the 'token' have a similarity greater than 70%
-            if fuzz.ratio(profession.lower(), token.text.lower()) > 70:
+        # Iterate over each profession of the 'professions_list' with a similarity greater than 70%
+        for position, score in professions_index.lookup(token.text):
 
-                # Add the detected profession to the 'professions' dictionary with a confidence level
-                professions[profession] = fuzz.ratio(
-                    profession.lower(), token.text.lower()
-                )
+            # Add the detected profession to the 'professions' dictionary with a confidence level
+            professions[professions_list[position]] = score
 
     # Sort professions by descending order of confidence
     sorted_professions = sorted(professions.items(), key=lambda x: x[1], reverse=True)
@@ -179,23 +188,7 @@ def get_main_skill(skills):
 
 
 def detect_acronyms_and_definitions(text):
-    acronyms_detected = {}
-
-    for acronym, definition in acronyms_dict.items():
-        patterns = [
-            rf"\b{re.escape(acronym)}\b",  # Acronym alone
-            rf"{re.escape(acronym)}\s*\({re.escape(definition)}\)",  # Acronym followed by definition in parentheses
-            rf"\b{re.escape(definition)}\b",  # Definition alone
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-
-            if matches:
-                acronyms_detected[acronym] = definition
-                break  # Stop searching for this acronym if it has already been found
-
-    return acronyms_detected
+    return acronym_matcher.detect(text)
 
 
 def structure_query(query):
@@ -205,17 +198,54 @@ def structure_query(query):
     :param query: str (user query)
     :return: str (query structured with extracted entities)
     """
+    return structure_query_with_timings(query)[0]
+
+
+def structure_query_with_timings(query):
+    """
+    Structure a user query and report the time spent in each analysis stage.
+    Queries are memoized once their whitespaces are normalized, until the acronyms file
+    is reloaded.
+
+    :param query: str (user query)
+    :return: tuple (query structured with extracted entities, timings in seconds per stage)
+    """
+    normalized = " ".join(query.split())
+    hits = _analyze_query.cache_info().hits
+    structured, timings = _analyze_query(normalized, acronym_matcher.version)
+    cached = _analyze_query.cache_info().hits > hits
+    return structured, {**timings, "cached": cached}
+
 
-    doc = nlp(query)
+@lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)
+def _analyze_query(query, acronyms_version):
+    # acronyms_version is only part of the key: the analyses made with the previous
+    # acronyms are no longer returned once the file is reloaded
+    timings = {}
+
+    # Parse the query once, the document is shared by the detectors
+    start = time.perf_counter()
+    doc = get_nlp()(query)
+    timings["ner"] = time.perf_counter() - start
 
     # Extract entities
     person_names = []
     location = None
-    dates = detect_dates(query)
     months = []
-    skills_with_levels = detect_skills_and_levels(query)
+
+    start = time.perf_counter()
+    dates = detect_dates(query)
+    timings["dates"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    skills_with_levels = detect_skills_and_levels(query, doc)
+    timings["skills"] = time.perf_counter() - start
+
+    start = time.perf_counter()
     acronyms_with_definitions = detect_acronyms_and_definitions(query)
+    timings["acronyms"] = time.perf_counter() - start
 
+    start = time.perf_counter()
     for ent in doc.ents:
         if ent.label_ == "PER":
             if ent.text not in skills_list:
@@ -228,13 +258,14 @@ def structure_query(query):
                 location = ent.text
         elif ent.label_ == "DATE":
             dates.append(ent.text)
+    timings["ner"] += time.perf_counter() - start
 
     # Extract months from the text
     month_matches = re.findall(month_pattern, query.lower())
     months.extend(month_matches)
 
-    # Sort dates and identify start and end dates
-    dates = sorted(dates)
+    # Sort dates chronologically and identify start and end dates
+    dates = sort_dates(dates)
     start_date = dates[0] if dates else "Not specified"
     end_date = dates[1] if len(dates) > 1 else "Not specified"
 
@@ -273,5 +304,5 @@ def structure_query(query):
 
     # Display the values extracted from the query
     if values_str == "" or not values_str:
-        return query
-    return values_str
+        return query, timings
+    return values_str, timings
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections import deque
+
+# Runs kept in memory while the tracker is slow or unavailable, the oldest are dropped
+METRICS_QUEUE_SIZE = int(os.getenv("METRICS_QUEUE_SIZE", 1000))
+# Runs exported by the worker at each round
+METRICS_BATCH_SIZE = int(os.getenv("METRICS_BATCH_SIZE", 50))
+# Delay before retrying after a failed export, doubled up to METRICS_MAX_RETRY_DELAY
+METRICS_RETRY_DELAY = float(os.getenv("METRICS_RETRY_DELAY", 1))
+METRICS_MAX_RETRY_DELAY = float(os.getenv("METRICS_MAX_RETRY_DELAY", 60))
+# "mlflow", or "sqlite" to store the runs in METRICS_SQLITE_PATH instead
+METRICS_SINK = os.getenv("METRICS_SINK", "mlflow")
+METRICS_SQLITE_PATH = os.getenv(
+    "METRICS_SQLITE_PATH",
+    os.path.join(os.path.dirname(__file__), "logs", "metrics.db"),
+)
+
+
+class MLflowSink:
+    """
+    Exports runs to an MLflow tracking server, with one batch request per run.
+    """
+
+    def __init__(self, tracking_uri: str):
+        self.tracking_uri = tracking_uri
+        self._client = None
+        self._experiments = {}
+
+    def _experiment_id(self, name):
+        if name not in self._experiments:
+            experiment = self._client.get_experiment_by_name(name)
+            self._experiments[name] = (
+                experiment.experiment_id
+                if experiment is not None
+                else self._client.create_experiment(name)
+            )
+        return self._experiments[name]
+
+    def export(self, runs: list) -> None:
+        # Imported here so that the API starts even when MLflow is slow to import
+        from mlflow.tracking import MlflowClient
+        from mlflow.entities import Metric, Param
+
+        if self._client is None:
+            self._client = MlflowClient(tracking_uri=self.tracking_uri)
+
+        for run in runs:
+            created = self._client.create_run(
+                self._experiment_id(run["experiment"]),
+                start_time=int(run["time"] * 1000),
+            )
+            run_id = created.info.run_id
+            timestamp = int(run["time"] * 1000)
+            self._client.log_batch(
+                run_id,
+                metrics=[
+                    Metric(name, float(value), timestamp, 0)
+                    for name, value in run["metrics"].items()
+                ],
+                params=[
+                    Param(name, str(value)) for name, value in run["params"].items()
+                ],
+            )
+            if run["artifacts"]:
+                with tempfile.TemporaryDirectory() as directory:
+                    for file_name, content in run["artifacts"].items():
+                        path = os.path.join(directory, file_name)
+                        with open(path, "w", encoding="utf-8") as f:
+                            f.write(content)
+                        self._client.log_artifact(run_id, path)
+            self._client.set_terminated(run_id)
+
+
+class SQLiteSink:
+    """
+    Stores runs in a local SQLite database, a stand-in for MLflow in tests and offline.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with sqlite3.connect(self.path) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, "
+                "experiment TEXT, params TEXT, metrics TEXT, artifacts TEXT, time REAL)"
+            )
+
+    def export(self, runs: list) -> None:
+        with sqlite3.connect(self.path) as db:
+            db.executemany(
+                "INSERT INTO runs (experiment, params, metrics, artifacts, time) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        run["experiment"],
+                        json.dumps(run["params"]),
+                        json.dumps(run["metrics"]),
+                        json.dumps(run["artifacts"]),
+                        run["time"],
+                    )
+                    for run in runs
+                ],
+            )
+
+    def runs(self) -> list:
+        """
+        Returns the stored runs.
+
+        Returns:
+            list: The runs, as dictionaries, in insertion order.
+        """
+        with sqlite3.connect(self.path) as db:
+            rows = db.execute(
+                "SELECT experiment, params, metrics, artifacts, time FROM runs ORDER BY id"
+            ).fetchall()
+        return [
+            {
+                "experiment": experiment,
+                "params": json.loads(params),
+                "metrics": json.loads(metrics),
+                "artifacts": json.loads(artifacts),
+                "time": logged_at,
+            }
+            for experiment, params, metrics, artifacts, logged_at in rows
+        ]
+
+
+class MetricsExporter:
+    """
+    Exports runs to a sink from a background thread, so that logging a run never waits
+    for the tracker. The queue is bounded: when the sink can't keep up, the oldest runs
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_queue: int = METRICS_QUEUE_SIZE,
+        batch_size: int = METRICS_BATCH_SIZE,
+        retry_delay: float = METRICS_RETRY_DELAY,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._queue = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._worker = None
+        self._stats = {"queued": 0, "exported": 0, "dropped": 0, "failed_exports": 0}
+
+    def log_run(
+        self, experiment: str, params: dict, metrics: dict, artifacts: dict = None
+    ) -> None:
+        """
+        Queues a run for export and returns immediately.
+
+        Args:
+            experiment (str): The experiment name.
+            params (dict): The parameters, by name.
+            metrics (dict): The numeric metrics, by name.
+            artifacts (dict): The text artifacts, by file name.
+        """
+        run = {
+            "experiment": experiment,
+            "params": dict(params),
+            "metrics": dict(metrics),
+            "artifacts": dict(artifacts or {}),
+            "time": time.time(),
+        }
+        with self._condition:
+            if self._closed:
+                logging.warning(
+                    f"Metrics exporter closed, run of {experiment} dropped."
+                )
+                self._stats["dropped"] += 1
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self._stats["dropped"] += 1
+            self._queue.append(run)
+            self._stats["queued"] += 1
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="metrics-exporter", daemon=True
+                )
+                self._worker.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        delay = self.retry_delay
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+                self._in_flight = len(batch)
+
+            try:
+                self.sink.export(batch)
+            except Exception as e:
+                logging.warning(f"Export of {len(batch)} runs failed: {e}")
+                with self._condition:
+                    self._stats["failed_exports"] += 1
+                    self._in_flight = 0
+                    # Put the runs back in front, unless newer runs took their place
+                    for run in reversed(batch):
+                        if len(self._queue) < self._queue.maxlen:
+                            self._queue.appendleft(run)
+                        else:
+                            self._stats["dropped"] += 1
+                    self._condition.notify_all()
+                    if self._closed:
+                        return
+                    self._condition.wait(delay)
+                delay = min(delay * 2, METRICS_MAX_RETRY_DELAY)
+                continue
+
+            delay = self.retry_delay
+            with self._condition:
+                self._stats["exported"] += len(batch)
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until the queued runs are exported.
+
+        Args:
+            timeout (float): The maximum time to wait, in seconds.
+
+        Returns:
+            bool: True if every queued run was exported in time.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._queue and not self._in_flight, timeout
+            )
+
+    def close(self, timeout: float = 5) -> None:
+        """
+        Exports the remaining runs, for at most timeout seconds, and stops the worker.
+
+        Args:
+            timeout (float): The maximum time to wait, in seconds.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the exporter.
+
+        Returns:
+            dict: The queued, exported and dropped runs, the failed exports and the
+            current queue length.
+        """
+        with self._condition:
+            return {**self._stats, "pending": len(self._queue) + self._in_flight}
+
+
+def create_exporter(tracking_uri: str) -> MetricsExporter:
+    """
+    Creates the exporter configured by METRICS_SINK.
+
+    Args:
+        tracking_uri (str): The URI of the MLflow tracking server.
+
+    Returns:
+        MetricsExporter: The exporter, its worker starts with the first run.
+    """
+    if METRICS_SINK == "sqlite":
+        return MetricsExporter(SQLiteSink(METRICS_SQLITE_PATH))
+    return MetricsExporter(MLflowSink(tracking_uri))
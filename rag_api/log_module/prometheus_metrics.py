@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Distinct model names kept as labels, the next ones are reported as "other"
+METRICS_MAX_MODELS = int(os.getenv("METRICS_MAX_MODELS", 20))
+
+# From cache hits (milliseconds) to generations (minutes)
+STAGE_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    20,
+    30,
+    60,
+    120,
+    300,
+)
+
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of the stages of the chat pipeline.",
+    ["stage", "model"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors",
+    "Exceptions raised by the stages of the chat pipeline.",
+    ["stage", "model"],
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "rag_time_to_first_token_seconds",
+    "Time between the start of a streamed generation and its first piece of text.",
+    ["model"],
+    buckets=STAGE_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups",
+    "Lookups of the query embedding and collection caches.",
+    ["cache", "result"],
+)
+HTTP_REQUESTS = Counter(
+    "rag_http_requests",
+    "Requests sent to the other services, by host.",
+    ["host"],
+)
+HTTP_CONNECTIONS = Counter(
+    "rag_http_connections",
+    "Connections opened to the other services, by host. The other requests reused one.",
+    ["host"],
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_models = set()
+_models_lock = threading.Lock()
+
+
+def model_label(model: str) -> str:
+    """
+    Returns the label of a model. The model comes from the request, so the number of
+    distinct labels is capped to keep the number of series bounded.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        str: The model name, "none" for stages without a model, or "other".
+    """
+    if not model:
+        return "none"
+    with _models_lock:
+        if model not in _models:
+            if len(_models) >= METRICS_MAX_MODELS:
+                return "other"
+            _models.add(model)
+    return model
+
+
+@contextmanager
+def track_stage(stage: str, model: str = None):
+    """
+    Times a block as a stage of the pipeline, counting the exceptions it raises.
+
+    Args:
+        stage (str): The stage name.
+        model (str): The model used by the stage, if any.
+    """
+    label = model_label(model)
+    start_time = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage, label).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(stage, label).observe(time.perf_counter() - start_time)
+
+
+def observe_stage(stage: str, model: str, seconds: float) -> None:
+    """
+    Records the duration of a stage timed by the caller.
+
+    Args:
+        stage (str): The stage name.
+        model (str): The model used by the stage, if any.
+        seconds (float): The duration.
+    """
+    STAGE_DURATION.labels(stage, model_label(model)).observe(seconds)
+
+
+def count_stage_error(stage: str, model: str) -> None:
+    """
+    Counts an error of a stage caught by the caller.
+
+    Args:
+        stage (str): The stage name.
+        model (str): The model used by the stage, if any.
+    """
+    STAGE_ERRORS.labels(stage, model_label(model)).inc()
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Counts a cache lookup.
+
+    Args:
+        cache (str): The cache name.
+        hit (bool): Whether the entry was found.
+    """
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics() -> bytes:
+    """
+    Renders the metrics in the Prometheus text format. Under gunicorn, the metrics of
+    all the workers are aggregated from PROMETHEUS_MULTIPROC_DIR.
+
+    Returns:
+        bytes: The exposition.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
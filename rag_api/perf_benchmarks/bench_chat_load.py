@@ -0,0 +1,150 @@
+# Command: python -m perf_benchmarks.bench_chat_load
+import time
+import asyncio
+import multiprocessing
+from unittest.mock import patch
+
+import httpx
+import uvicorn
+
+import rag_api
+import concurrency
+from auth import get_current_user
+
+# Simulated duration of each stage, in seconds
+ANALYSIS = 0.005
+EMBEDDING = 0.05
+CHROMA = 0.01
+GENERATION = 2.0
+
+USERS = 128
+REQUESTS = 512
+PORT = 8799
+
+PAYLOAD = {
+    "service_type": "ollama",
+    "question": "Qui connaît Python ?",
+    "history": [
+        {"role": "system", "content": "context"},
+        {"role": "user", "content": "Qui connaît Python ?"},
+    ],
+    "chat_id": "chat_id123",
+    "model": "llama3.1:8b",
+}
+
+
+def analysis(question):
+    time.sleep(ANALYSIS)
+    return question, {}
+
+
+def query_collection(*args):
+    time.sleep(CHROMA)
+    return [["document"]]
+
+
+def embed_texts(texts, model):
+    time.sleep(EMBEDDING)
+    return [[1.0, 0.0]]
+
+
+async def aembed_texts(texts, model, client):
+    await asyncio.sleep(EMBEDDING)
+    return [[1.0, 0.0]]
+
+
+def generate_response(*args):
+    time.sleep(GENERATION)
+    return "response"
+
+
+async def agenerate_response(*args):
+    await asyncio.sleep(GENERATION)
+    return "response"
+
+
+@rag_api.app.post("/bench/sync")
+def sync_chat(input: rag_api.ChatRequest):
+    # Previous handler: every stage blocks one thread of the default threadpool
+    data = rag_api.retrieve_documents(
+        rag_api.paths["collection"], "perm", input.question, rag_api.MODEL_EMBEDDING
+    )
+    return {"response": generate_response(data, input.history, input.model)}
+
+
+async def load(path):
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}",
+        timeout=600,
+        limits=httpx.Limits(max_connections=USERS),
+    ) as client:
+        remaining = iter(range(REQUESTS))
+
+        async def user():
+            for _ in remaining:
+                response = await client.post(path, json=PAYLOAD)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(USERS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def serve(generation_limit):
+    # Server process: the simulated stages replace the models, the database and MLflow
+    rag_api.app.dependency_overrides[get_current_user] = lambda: "bench"
+    with patch.dict(concurrency.STAGE_LIMITS, {"generation": generation_limit}), patch(
+        "rag_module.embedding.structure_query_with_timings", analysis
+    ), patch("rag_module.embedding.query_collection", query_collection), patch(
+        "rag_module.embedding.embed_texts", embed_texts
+    ), patch(
+        "rag_module.embedding.aembed_texts", aembed_texts
+    ), patch(
+        "rag_module.embedding.query_cache.get", return_value=None
+    ), patch(
+        "rag_module.embedding.query_cache.put"
+    ), patch(
+        "rag_api.agenerate_ollama_response", agenerate_response
+    ), patch(
+        "rag_api.log_chat_metrics"
+    ), patch(
+        "rag_api.warm_up"
+    ):
+        uvicorn.run(
+            rag_api.app,
+            port=PORT,
+            log_level="error",
+            backlog=4096,
+            timeout_keep_alive=60,
+        )
+
+
+def run(path, generation_limit):
+    # The load generator runs in another process so that it doesn't compete for the GIL
+    server = multiprocessing.get_context("fork").Process(
+        target=serve, args=(generation_limit,), daemon=True
+    )
+    server.start()
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{PORT}/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        return asyncio.run(load(path))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    print(f"{USERS} users, {REQUESTS} requests, {GENERATION}s of generation each")
+    print(f"sync handler (default threadpool): {run('/bench/sync', 1):7.1f} req/s")
+    for limit in (16, 64, 128):
+        throughput = run("/chat", limit)
+        print(f"async handler, generation limit {limit:>3}: {throughput:7.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Command: python -m perf_benchmarks.bench_fuzzy_index
+import os
+import random
+import time
+from fuzzywuzzy import fuzz
+
+from llm_module.fuzzy_index import FuzzyIndex
+
+base_path = os.path.dirname(__file__)
+descriptions_file = os.path.join(
+    base_path, "..", "data", "sources_files", "descriptions_uniques.txt"
+)
+
+QUERY = "Liste les membres experts en Python, SQL Server et Talend disponibles en mars"
+
+
+def load_skills():
+    with open(descriptions_file, "r", encoding="utf-8") as file:
+        content = file.read()
+    return [desc.strip().strip('" ') for desc in content.split(",")]
+
+
+def grow_vocabulary(skills, factor):
+    """
+    Builds a vocabulary factor times larger, made of the skills and variants of them.
+    """
+    random.seed(42)
+    vocabulary = list(skills)
+    while len(vocabulary) < factor * len(skills):
+        words = random.choice(skills).split() + random.choice(skills).split()
+        vocabulary.append(" ".join(random.sample(words, min(len(words), 3))))
+    return vocabulary
+
+
+def brute_force(vocabulary, token, threshold):
+    return [
+        (i, fuzz.ratio(skill.lower(), token.lower()))
+        for i, skill in enumerate(vocabulary)
+        if fuzz.ratio(skill.lower(), token.lower()) > threshold
+    ]
+
+
+def run_benchmark(factor=10, threshold=70, repeat=20):
+    vocabulary = grow_vocabulary(load_skills(), factor)
+    tokens = QUERY.replace(",", "").split()
+
+    start = time.perf_counter()
+    index = FuzzyIndex(vocabulary, threshold)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        indexed = [index.lookup(token) for token in tokens]
+    index_time = (time.perf_counter() - start) / (repeat * len(tokens))
+
+    start = time.perf_counter()
+    expected = [brute_force(vocabulary, token, threshold) for token in tokens]
+    brute_time = (time.perf_counter() - start) / len(tokens)
+
+    print(f"Vocabulary: {len(vocabulary)} entries ({factor}x), threshold {threshold}")
+    print(f"Index built in {build_time * 1000:.1f} ms")
+    print(f"Indexed lookup: {index_time * 1000:.3f} ms per token")
+    print(f"fuzz.ratio scan: {brute_time * 1000:.3f} ms per token")
+    print(f"Same matches: {indexed == expected}")
+
+
+if __name__ == "__main__":
+    run_benchmark(factor=1)
+    print()
+    run_benchmark(factor=10)
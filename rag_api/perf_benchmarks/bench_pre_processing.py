@@ -0,0 +1,189 @@
+# Command: python -m perf_benchmarks.bench_pre_processing [members ...]
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+MEMBERS = [10_000, 100_000]
+# Above this number of members the loop engine takes too long to be measured
+LOOP_MAX_MEMBERS = int(os.getenv("BENCH_LOOP_MAX_MEMBERS", 10_000))
+
+COMPANIES = ["Orange", "Enedis", "Engie", "LVMH", "BPCE", "La Poste"]
+COMPANIES += ["DISPO ICE", "congés"]
+FONCTIONS = ["DevOps", "SAS", "SSIS", "Azure", "UX", "Talend, Talend BD"]
+DESCRIPTIONS = [
+    "Python",
+    "SQL Server",
+    "Power BI",
+    "Scrum",
+    "Talend",
+    "Java",
+    "développements web",
+    "programmation objet",
+]
+PROFICIENCIES = ["1-Faible", "2-Bon", "3-Très bon", "4-Expert", "0-Non évalué"]
+CERTIFICATIONS = [
+    ("AZ-900", "Microsoft Azure Fundamentals"),
+    ("PSM I", "Professional Scrum Master I"),
+    ("CLF-C02", "AWS Certified Cloud Practitioner"),
+    ("TOEIC", "Test of English for International Communication"),
+]
+
+
+def dates(rng, size, start="2023-01-01", days=730):
+    return (
+        pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, size), unit="D")
+    ).strftime("%Y-%m-%d")
+
+
+def make_fixtures(members, directory, seed=42):
+    """
+    Writes fixtures shaped like create_fixtures ones: 3 to 8 missions, 3 to 7
+    competencies and 1 to 3 certifications per member.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Membre {i:06d}" for i in range(members)])
+
+    counts = rng.integers(3, 9, members)
+    nom = np.repeat(names, counts)
+    start = dates(rng, len(nom))
+    coaff = pd.DataFrame(
+        {
+            "Localisation": np.repeat(
+                rng.choice(["Mtp", "Tours", "Paris"], members), counts
+            ),
+            "COEFF_F212": np.repeat(rng.choice([100, 105, 115, 150], members), counts),
+            "PROFIL": np.repeat(
+                rng.choice(["Junior", "Sénior", "Expert"], members), counts
+            ),
+            "Nom": nom,
+            "Missions_en_cours": rng.choice(COMPANIES, len(nom)),
+            "Competences": np.repeat(rng.choice(FONCTIONS, members), counts),
+            "Date_Demarrage": start,
+            "Date_de_fin": (pd.to_datetime(start) + pd.Timedelta(weeks=12)).strftime(
+                "%Y-%m-%d"
+            ),
+            "Tx_occup": rng.choice([0.2, 0.5, 0.7, 0.8, 1.0], len(nom)),
+            "Stream_BT": np.repeat(
+                rng.choice(["DSIA", "MSBI", "ODI"], members), counts
+            ),
+        }
+    )
+
+    counts = rng.integers(3, 8, members)
+    nom = np.repeat(names, counts)
+    psarm = pd.DataFrame(
+        {
+            "Code": np.repeat(rng.integers(100000, 999999, members), counts),
+            "Nom": nom,
+            "Competency": rng.choice(["C1", "C2", "C3"], len(nom)),
+            "Description": rng.choice(DESCRIPTIONS, len(nom)),
+            "Proficiency Description": rng.choice(
+                PROFICIENCIES, len(nom), p=[0.24, 0.24, 0.24, 0.24, 0.04]
+            ),
+            "Supervisor Name": np.repeat(
+                rng.choice([f"Manager {i}" for i in range(50)], members), counts
+            ),
+        }
+    )
+
+    counts = rng.integers(1, 4, members)
+    nom = np.repeat(names, counts)
+    picked = rng.integers(0, len(CERTIFICATIONS), len(nom))
+    obtention = dates(rng, len(nom), "2019-01-01", 1800)
+    certs = pd.DataFrame(
+        {
+            "Nom": nom,
+            "Code_cert": [CERTIFICATIONS[i][0] for i in picked],
+            "Certification": [CERTIFICATIONS[i][1] for i in picked],
+            "Obtention": obtention,
+            "Expiration": (
+                pd.to_datetime(obtention) + pd.Timedelta(days=1095)
+            ).strftime("%Y-%m-%d"),
+        }
+    )
+
+    paths = {
+        name: os.path.join(directory, f"fixtures_{name}.csv")
+        for name in ("coaff", "psarm", "certs")
+    }
+    coaff.to_csv(paths["coaff"], index=False)
+    psarm.to_csv(paths["psarm"], index=False)
+    certs.to_csv(paths["certs"], index=False)
+    return paths
+
+
+# Run each engine in a fresh interpreter, so that its peak memory is measured alone
+CHILD = """
+import sys, json, time, resource
+sys.path.insert(0, ".")
+from data.pre_processing import pre_processing
+
+coaff, psarm, certs, combined, engine = sys.argv[1:]
+start = time.perf_counter()
+result = pre_processing(coaff, psarm, certs, combined, engine=engine)
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "profiles": len(result),
+    "peak_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def run_engine(paths, directory, engine):
+    combined = os.path.join(directory, f"combined_{engine}.csv")
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            CHILD,
+            paths["coaff"],
+            paths["psarm"],
+            paths["certs"],
+            combined,
+            engine,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    with open(combined, "rb") as f:
+        report["combined"] = f.read()
+    return report
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or MEMBERS
+    print(
+        f"{'Members':>9}{'Profiles':>10}{'Loop':>10}{'Peak':>10}"
+        f"{'Vectorized':>12}{'Peak':>10}{'Speedup':>9}"
+    )
+    for members in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = make_fixtures(members, directory)
+            vectorized = run_engine(paths, directory, "vectorized")
+            line = f"{members:>9}{vectorized['profiles']:>10}"
+            timing = (
+                f"{vectorized['seconds']:>11.2f}s{vectorized['peak_mib']:>6.0f} MiB"
+            )
+
+            if members > LOOP_MAX_MEMBERS:
+                print(f"{line}{'-':>10}{'-':>10}{timing}{'-':>9}")
+                continue
+
+            loop = run_engine(paths, directory, "loop")
+            if loop["combined"] != vectorized["combined"]:
+                raise AssertionError("The engines wrote different combined files.")
+            print(
+                f"{line}{loop['seconds']:>9.2f}s{loop['peak_mib']:>6.0f} MiB{timing}"
+                f"{loop['seconds'] / vectorized['seconds']:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
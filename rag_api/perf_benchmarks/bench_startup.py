@@ -0,0 +1,92 @@
+# Command: python -m perf_benchmarks.bench_startup
+import os
+import sys
+import json
+import subprocess
+
+WORKERS = 2
+QUERY = "Liste les membres experts en Python disponibles en mars 2025"
+
+# Run in a fresh interpreter: imports the API, then forks workers answering one query
+# each, like gunicorn with preload_app, and reports the memory of every process
+CHILD = f"""
+import gc, os, sys, json, time
+sys.path.insert(0, ".")
+
+def memory():
+    fields = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {{key: round(fields.get(key, 0), 1) for key in ("Rss", "Pss", "Private_Dirty")}}
+
+start = time.perf_counter()
+import rag_api
+import_seconds = time.perf_counter() - start
+master = memory()
+gc.freeze()
+
+pipes = []
+for _ in range({WORKERS}):
+    read_end, write_end = os.pipe()
+    if os.fork() == 0:
+        # A forked worker must never return into the master's code or exit handlers
+        try:
+            from llm_module.model_precision_improvements import structure_query
+            start = time.perf_counter()
+            structure_query({QUERY!r})
+            report = {{"first_query": time.perf_counter() - start, **memory()}}
+        except Exception as e:
+            report = {{"error": repr(e)}}
+        os.write(write_end, json.dumps(report).encode())
+        os._exit(0)
+    os.close(write_end)
+    pipes.append(read_end)
+
+workers = [json.loads(os.read(read_end, 4096)) for read_end in pipes]
+for _ in pipes:
+    os.wait()
+print(json.dumps({{"import": import_seconds, "master": master, "workers": workers}}))
+"""
+
+
+def run(preload):
+    env = {**os.environ, "SPACY_PRELOAD": "1" if preload else "0"}
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    for worker in report["workers"]:
+        if "error" in worker:
+            raise RuntimeError(worker["error"])
+    return report
+
+
+def main():
+    print(
+        f"{'Mode':<10}{'Import':>10}{'Master RSS':>12}{'1st query':>12}"
+        f"{'Worker RSS':>12}{'Worker PSS':>12}{'Private':>10}"
+    )
+    for mode, preload in (("lazy", False), ("preload", True)):
+        try:
+            report = run(preload)
+        except RuntimeError as e:
+            print(f"{mode:<10}failed: {e}")
+            continue
+        workers = report["workers"]
+        first_query = max(w["first_query"] for w in workers)
+        print(
+            f"{mode:<10}{report['import']:>9.2f}s{report['master']['Rss']:>10.0f}MB"
+            f"{first_query:>11.2f}s"
+            f"{sum(w['Rss'] for w in workers) / len(workers):>10.0f}MB"
+            f"{sum(w['Pss'] for w in workers) / len(workers):>10.0f}MB"
+            f"{sum(w['Private_Dirty'] for w in workers) / len(workers):>8.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Command: python -m perf_benchmarks.bench_table_store [members ...]
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+
+from data.table_store import (
+    read_table,
+    write_table,
+    table_path,
+    COAFF_SCHEMA,
+    PSARM_SCHEMA,
+    CERTS_SCHEMA,
+)
+from data.pre_processing import COAFF_COLUMNS, PSARM_COLUMNS, CERTS_COLUMNS
+from perf_benchmarks.bench_pre_processing import make_fixtures
+
+MEMBERS = [10_000, 100_000]
+FORMATS = ["csv", "arrow", "parquet"]
+TABLES = {
+    "coaff": (COAFF_SCHEMA, COAFF_COLUMNS),
+    "psarm": (PSARM_SCHEMA, PSARM_COLUMNS),
+    "certs": (CERTS_SCHEMA, CERTS_COLUMNS),
+}
+# PSA RM columns of the workbook not used by the profiles, written by create_fixtures
+PSARM_EXTRA_COLUMNS = 30
+
+
+def best_time(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or MEMBERS
+    print(
+        f"{'Members':>9}{'Format':>9}{'Size':>11}{'Write':>9}{'Read':>9}{'Needed':>9}"
+    )
+    for members in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_paths = make_fixtures(members, directory)
+            tables = {name: pd.read_csv(path) for name, path in csv_paths.items()}
+            for i in range(PSARM_EXTRA_COLUMNS):
+                tables["psarm"][f"Colonne {i}"] = f"Valeur {i}"
+
+            for table_format in FORMATS:
+                paths = {
+                    name: table_path(directory, f"bench_{name}", table_format)
+                    for name in TABLES
+                }
+
+                def write():
+                    for name, (schema, _) in TABLES.items():
+                        write_table(tables[name], paths[name], schema)
+
+                def read(needed):
+                    for name, (_, columns) in TABLES.items():
+                        read_table(paths[name], columns if needed else None)
+
+                write_seconds = best_time(write)
+                size = sum(os.path.getsize(path) for path in paths.values())
+                print(
+                    f"{members:>9}{table_format:>9}{size / 2**20:>7.1f} MiB"
+                    f"{write_seconds:>8.2f}s{best_time(lambda: read(False)):>8.2f}s"
+                    f"{best_time(lambda: read(True)):>8.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
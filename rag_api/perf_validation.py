@@ -1,30 +1,29 @@
+import os
 import pandas as pd
 import re
 import random
 
+from data.table_store import read_table
 from rag_module.embedding import retrieve_documents
 from llm_module.generate_response import generate_minai_response
 from llm_module.model_precision_improvements import structure_query
 
+# Highest false rate (%) for a new version of the profiles to be put into service
+MAX_FALSE_RATE = float(os.getenv("MAX_FALSE_RATE", 7))
+
 
 def import_data(combined_path: str) -> pd.DataFrame:
     """
-    Imports data from a CSV file.
+    Imports the names and profiles of the members from the combined table.
 
     Args:
-        data_path (str): The path to the CSV file.
+        combined_path (str): The path to the combined table.
 
     Returns:
         pd.DataFrame: The imported data.
     """
-    # Load the data
-    data = pd.read_csv(combined_path)
-
-    # Extract the name of the member
-    data["Nom"] = data["Membres"].apply(lambda x: x.split(",")[0].split(":")[1].strip())
-    data = data[["Nom", "Combined"]]
-
-    return data
+    # Load only the name of the members, extracted by pre_processing, and their profile
+    return read_table(combined_path, ["Nom", "Combined"])
 
 
 def validate_response(combined_path: str, question: str, llm_response: str) -> list:
@@ -32,7 +31,7 @@ def validate_response(combined_path: str, question: str, llm_response: str) -> l
     Validates the response.
 
     Args:
-        combined_path (str): The path to the CSV file.
+        combined_path (str): The path to the combined table.
         question (str): The question.
         llm_response (str): The response.
 
@@ -87,16 +86,22 @@ def validate_response(combined_path: str, question: str, llm_response: str) -> l
 
 
 def run_validation(
-    collection: str, type: str, combined_path: str, embed_model: str, llm_model: str
+    collection: str,
+    type: str,
+    combined_path: str,
+    embed_model: str,
+    llm_model: str,
+    name: str = None,
 ) -> tuple:
     """
     Runs the validation process.
 
     Args:
         collection (str): The path to the collection ChromaDB.
-        combined_path (str): The path to the CSV file.
+        combined_path (str): The path to the combined table.
         embed_model (str): The name of the embedding model.
         llm_model (str): The name of the LLM model.
+        name (str): The collection version to validate, instead of the active collection.
 
     Returns:
         tuple: The validation results and false rate.
@@ -112,7 +117,9 @@ def run_validation(
 
     for i, question in enumerate(questions):
         question_structured = structure_query(question)
-        data = retrieve_documents(collection, type, question_structured, embed_model)
+        data = retrieve_documents(
+            collection, type, question_structured, embed_model, name
+        )
 
         history = [
             {
@@ -1,26 +1,47 @@
 import os
+import json
 import time
+import uuid
+import shutil
 import logging
 
 # import requests
 import uvicorn
-import mlflow
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
 from typing import List
 
 from auth import create_access_token, get_user, get_current_user
 from llm_module.generate_response import (
-    generate_ollama_response,
-    generate_minai_response,
+    agenerate_ollama_response,
+    agenerate_minai_response,
+    generate_ollama_response_stream,
+    generate_minai_response_stream,
     generate_conversation_id,
 )
-from rag_module.embedding import retrieve_documents
-from rag_cd import delete_temp_files, process_file
+from rag_module.embedding import retrieve_documents, aretrieve_documents
+from rag_module.collection_registry import warm_up, cache_stats
+from rag_module.query_cache import query_cache
+from rag_cd import delete_temp_files, process_file, promote_temp, PROMOTE_TEMP
+from perf_validation import MAX_FALSE_RATE
+from job_queue import JobQueue, JOBS_DB_PATH
 from docker_check import is_running_in_docker
+from concurrency import stage_limit, close_clients
+from log_module.metrics_exporter import create_exporter
+from log_module.prometheus_metrics import (
+    CONTENT_TYPE,
+    TIME_TO_FIRST_TOKEN,
+    count_stage_error,
+    model_label,
+    observe_stage,
+    render_metrics,
+    track_stage,
+)
 
 venv = is_running_in_docker()
 
@@ -30,6 +51,7 @@ paths = {
     "logs": os.path.join(base_path, "log_module", "logs", "api.log"),
     "temp_combined": os.path.join(base_path, "data", "combined", "_temp"),
     "collection": os.path.join(base_path, "data", "chroma", "docs"),
+    "uploads": os.path.join(os.path.dirname(JOBS_DB_PATH), "uploads"),
 }
 
 # Logging module configuration
@@ -44,7 +66,24 @@ GPT_4O_MINI = "gpt-4o-mini"
 MODEL_EMBEDDING = "nomic-embed-text:v1.5"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-app = FastAPI()
+# MLflow runs are exported in the background, off the request path
+metrics_exporter = create_exporter(f"http://{venv['mf_host']}:{venv['mf_port']}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the ChromaDB collection once for the whole process
+    warm_up(paths["collection"], "perm")
+    # Run the uploaded files, including the ones interrupted by the last shutdown
+    job_queue.start()
+    yield
+    job_queue.stop(timeout=5)
+    await close_clients()
+    # Give the queued runs a last chance to reach MLflow
+    metrics_exporter.close(timeout=5)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class TestInput(BaseModel):
@@ -103,6 +142,15 @@ def root():
     return {"message": "API is running"}
 
 
+@app.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="This endpoint exposes the latency histograms and counters of the API.",
+)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.post("/test", summary="Test endpoint", description="This is a test endpoint.")
 def test(input: TestInput, token: str = Depends(get_current_user)):
     return {"message": input.message + " Success"}
@@ -137,42 +185,154 @@ async def token(username: str):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+def ingest_file(payload: dict, progress) -> dict:
+    """
+    Runs the ingestion pipeline of an uploaded file: the temporary profiles first, then
+    if they pass the validation, they are promoted to permanent ones, or the permanent
+    ones are processed again when PROMOTE_TEMP is off.
+
+    Args:
+        payload (dict): The path of the stored upload and its original file name.
+        progress (JobProgress): The progress of the job.
+
+    Returns:
+        dict: The false rates of the validations.
+    """
+    with open(payload["file"], "rb") as f:
+        file = UploadFile(file=f, filename=payload["filename"])
+        result_validation_temp = process_file(file, "temp", progress)
+        result_validation_perm = None
+        if result_validation_temp[1] <= MAX_FALSE_RATE:
+            if PROMOTE_TEMP:
+                # The validated temporary profiles become the permanent ones as they are
+                promote_temp(progress)
+                result_validation_perm = result_validation_temp
+            else:
+                result_validation_perm = process_file(file, "perm", progress)
+
+        # The result tables are serialized now, the files are overwritten by the next upload
+        if file.filename != "test_file.txt":
+            artifacts = {
+                "result_validation_temp.csv": result_validation_temp[0].to_csv(
+                    index=False
+                )
+            }
+            if result_validation_perm is not None:
+                result_validation_path = os.path.join(
+                    paths["temp_combined"], "result_validation.csv"
+                )
+                result_validation_perm[0].to_csv(result_validation_path, index=False)
+                artifacts["result_validation.csv"] = result_validation_perm[0].to_csv(
+                    index=False
+                )
+            metrics_exporter.log_run(
+                "Profile Finder RAG Metrics",
+                {
+                    "file_name": file.filename,
+                    "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                },
+                {"False rate": result_validation_temp[1]},
+                artifacts,
+            )
+
+        delete_temp_files(file)
+
+    return {
+        "false_rate_temp": result_validation_temp[1],
+        "false_rate_perm": (
+            result_validation_perm[1] if result_validation_perm is not None else None
+        ),
+    }
+
+
+# The uploaded files are processed in the background, one job per upload
+job_queue = JobQueue(JOBS_DB_PATH, ingest_file)
+
+
 @app.post(
     "/file",
+    status_code=202,
     summary="Store file",
-    description="This endpoint stores a file in the database.",
+    description="This endpoint stores a file and queues its processing, the progress "
+    "is polled with GET /file/{job_id}.",
 )
-async def storing_file(
-    file: UploadFile = File(...), token: str = Depends(get_current_user)
-):
-    try:
-        result_validation_temp = process_file(file, "temp")
-        if result_validation_temp[1] <= 7:
-            result_validation_perm = process_file(file, "perm")
+def storing_file(file: UploadFile = File(...), token: str = Depends(get_current_user)):
+    # The upload is kept until the job is finished, a restart must be able to rerun it
+    os.makedirs(paths["uploads"], exist_ok=True)
+    upload_path = os.path.join(paths["uploads"], uuid.uuid4().hex)
+    with open(upload_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
 
-        mlflow.set_tracking_uri(f"http://{venv['mf_host']}:{venv['mf_port']}")
-        mlflow.set_experiment("Profile Finder RAG Metrics")
+    job_id = job_queue.enqueue({"file": upload_path, "filename": file.filename})
+    return {"job_id": job_id, "status": "queued"}
 
-        with mlflow.start_run():
-            if file.filename != "test_file.txt":
-                mlflow.log_param("file_name", file.filename)
-                mlflow.log_param("date", time.strftime("%Y-%m-%d %H:%M:%S"))
 
-                mlflow.log_metric("False rate", result_validation_temp[1])
-                mlflow.log_artifact("Result table", result_validation_temp[0])
+@app.get(
+    "/file/{job_id}",
+    summary="File processing status",
+    description="This endpoint returns the status of a file processing job, with the "
+    "duration of each stage.",
+)
+def file_status(job_id: str, token: str = Depends(get_current_user)):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-                result_validation_path = os.path.join(
-                    paths["temp_combined"], "result_validation.csv"
-                )
-                result_validation_perm[0].to_csv(result_validation_path, index=False)
-                mlflow.log_artifact(result_validation_path)
 
-        mlflow.end_run()
+def retrieve_data(question: str) -> list:
+    """
+    Retrieves the documents relevant to a question from the permanent collection.
 
-        delete_temp_files(file)
+    Args:
+        question (str): The user question
+
+    Returns:
+        list: The retrieved documents
 
+    Raises:
+        HTTPException: Exception HTTP 500 if the retrieval fails or finds nothing
+    """
+    start_time = time.time()
+    try:
+        data = retrieve_documents(
+            paths["collection"], "perm", question, MODEL_EMBEDDING
+        )
     except Exception as e:
-        raise Exception(f"Error: {str(e)}")
+        logging.error(f"Error retrieving documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    end_time = time.time()
+    logging.info(f"RAG performed in {end_time - start_time} seconds.")
+    logging.info(f"Query embedding cache: {query_cache.stats()}")
+    logging.info(f"Collection cache: {cache_stats()}\n")
+
+    if data is None:
+        logging.error("No document found")
+        raise HTTPException(status_code=500, detail="No document found")
+    return data
+
+
+def log_chat_metrics(input: ChatRequest, metrics: dict) -> None:
+    """
+    Queues the parameters and the timings of a chat response for export to MLflow.
+
+    Args:
+        input (ChatRequest): The chat request
+        metrics (dict): The metrics to log, by name
+    """
+    if input.chat_id == "chat_id123":
+        return
+
+    metrics_exporter.log_run(
+        "Profile Finder Chat Metrics",
+        {
+            "service_type": input.service_type,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "chat_id": input.chat_id,
+            "model": input.model,
+        },
+        metrics,
+    )
 
 
 @app.post(
@@ -180,52 +340,141 @@ async def storing_file(
     summary="Process question and return response",
     description="This endpoint processes a question and returns a response with ollama.",
 )
-def process_question(input: ChatRequest, token: str = Depends(get_current_user)):
+async def process_question(input: ChatRequest, token: str = Depends(get_current_user)):
+    # The blocking stages run in the executor, the event loop only waits for them
     start_time = time.time()
     try:
-        data = retrieve_documents(
+        data = await aretrieve_documents(
             paths["collection"], "perm", input.question, MODEL_EMBEDDING
         )
     except Exception as e:
         logging.error(f"Error retrieving documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     end_time = time.time()
-    logging.info(f"RAG performed in {end_time - start_time} seconds.\n")
+    logging.info(f"RAG performed in {end_time - start_time} seconds.")
+    logging.info(f"Query embedding cache: {query_cache.stats()}")
+    logging.info(f"Collection cache: {cache_stats()}\n")
 
     start_time = time.time()
     try:
         if data is None:
             logging.error("No document found")
             raise HTTPException(status_code=500, detail="No document found")
-        if input.service_type == "ollama":
-            response = generate_ollama_response(data, input.history, input.model)
-        elif input.service_type == "minai":
-            response = generate_minai_response(
-                data[0], input.chat_id, input.history, input.model
-            )
-        else:
+        if input.service_type not in ("ollama", "minai"):
             raise HTTPException(status_code=500, detail="Incorrect service type")
+        async with stage_limit("generation"):
+            with track_stage("generation", input.model):
+                if input.service_type == "ollama":
+                    response = await agenerate_ollama_response(
+                        data, input.history, input.model
+                    )
+                else:
+                    response = await agenerate_minai_response(
+                        data[0], input.chat_id, input.history, input.model
+                    )
     except Exception as e:
         logging.error(f"Error generating response: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     end_time = time.time()
     logging.info(f"Response generated in {end_time - start_time} seconds.\n\n")
 
-    if input.chat_id != "chat_id123":
-        mlflow.set_tracking_uri(f"http://{venv['mf_host']}:{venv['mf_port']}")
-        mlflow.set_experiment("Profile Finder Chat Metrics")
+    log_chat_metrics(input, {"response_time": round(end_time - start_time, 2)})
+
+    return {"response": response, "duration": end_time - start_time}
+
+
+def format_event(event: str, data: dict) -> str:
+    """
+    Formats a server-sent event.
+
+    Args:
+        event (str): The event type
+        data (dict): The event data, sent as JSON
+
+    Returns:
+        str: The event, terminated by an empty line
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        run = mlflow.start_run()
+
+@app.post(
+    "/chat/stream",
+    summary="Process question and stream response",
+    description="This endpoint processes a question and streams the response as server-sent events.",
+)
+def process_question_stream(input: ChatRequest, token: str = Depends(get_current_user)):
+    """
+    Stream the response to a question as it is generated. Each piece of text is sent as a
+    "token" event, followed by a "done" event with the time to first token and the total
+    generation time, or by an "error" event.
+
+    Args:
+        input (ChatRequest): The chat request
+        current_user (dict): Current user information
+
+    Returns:
+        StreamingResponse: The text/event-stream response
+
+    Raises:
+        HTTPException: Exception HTTP 500 if no document is found or the service type is incorrect
+    """
+    data = retrieve_data(input.question)
+
+    if input.service_type == "ollama":
+        pieces = generate_ollama_response_stream(data, input.history, input.model)
+    elif input.service_type == "minai":
+        pieces = generate_minai_response_stream(
+            data[0], input.chat_id, input.history, input.model
+        )
+    else:
+        raise HTTPException(status_code=500, detail="Incorrect service type")
+
+    def events():
+        start_time = time.time()
+        first_token_time = None
         try:
-            mlflow.log_param("service_type", input.service_type)
-            mlflow.log_param("date", time.strftime("%Y-%m-%d %H:%M:%S"))
-            mlflow.log_param("chat_id", input.chat_id)
-            mlflow.log_param("model", input.model)
-            mlflow.log_metric("response_time", round(end_time - start_time, 2))
-        finally:
-            mlflow.end_run()
+            for piece in pieces:
+                if first_token_time is None:
+                    first_token_time = time.time()
+                yield format_event("token", {"text": piece})
+        except Exception as e:
+            logging.error(f"Error generating response: {str(e)}")
+            count_stage_error("generation", input.model)
+            yield format_event("error", {"detail": str(e)})
+            return
+        end_time = time.time()
+        time_to_first_token = (first_token_time or end_time) - start_time
+        observe_stage("generation", input.model, end_time - start_time)
+        TIME_TO_FIRST_TOKEN.labels(model_label(input.model)).observe(
+            time_to_first_token
+        )
+        logging.info(
+            f"First token in {time_to_first_token} seconds, "
+            f"response generated in {end_time - start_time} seconds.\n\n"
+        )
 
-    return {"response": response, "duration": end_time - start_time}
+        yield format_event(
+            "done",
+            {
+                "duration": end_time - start_time,
+                "time_to_first_token": time_to_first_token,
+            },
+        )
+
+        log_chat_metrics(
+            input,
+            {
+                "response_time": round(end_time - start_time, 2),
+                "time_to_first_token": round(time_to_first_token, 2),
+            },
+        )
+
+    # Disable the buffering of reverse proxies so that events are delivered at once
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post(
@@ -1,20 +1,32 @@
 import os
-import requests
 import logging
+from contextlib import nullcontext
 
 from data.store_file import store_file, download_files
 from data.get_skills import get_skills
 from data.create_fixtures import create_fixtures
 from data.pre_processing import insert_profiles
+from data.table_store import table_path, remove_table, move_table
 import test_unitaires.test_embedding as test_embedding
 import test_unitaires.test_load_documents as test_load_documents
 import test_unitaires.test_ollama as test_ollama
-from rag_module.embedding import embed_documents, delete_collection
-from perf_validation import run_validation
+from rag_module.embedding import embed_documents
+from rag_module.collection_registry import (
+    create_version,
+    import_version,
+    switch_version,
+    discard_version,
+)
+from perf_validation import run_validation, MAX_FALSE_RATE
 from docker_check import is_running_in_docker
+from http_pool import bdd_api_session
 
 venv = is_running_in_docker()
 
+# Put the validated temporary profiles into service as the permanent ones, instead of
+# processing the uploaded file a second time
+PROMOTE_TEMP = os.getenv("PROMOTE_TEMP", "1") == "1"
+
 GPT_4O_MINI = "gpt-4o-mini"
 MODEL_EMBEDDING = "nomic-embed-text:v1.5"
 
@@ -59,162 +71,214 @@ def create_directories():
     )
 
 
-def process_file(file, process_type):
+def process_file(file, process_type, progress=None):
     """
     Process the file uploaded by the user
-    
+
     Args:
     file: File uploaded by the user
     process_type: type of process ("temp" or "perm")
-    
+    progress: JobProgress recording the duration of each stage, if any
+
     Returns:
     result_validation: Validation result
     """
+
+    def stage(name):
+        if progress is None:
+            return nullcontext()
+        return progress.stage(f"{process_type}/{name}")
+
     file_path = os.path.join(paths["temp_files"], file.filename)
     with open(file_path, "wb") as f:
         f.write(file.file.read())
 
     if process_type == "temp":
-        create_directories()
-        result_storing = store_file(
-            file_path,
+        with stage("store_file"):
+            create_directories()
+            result_storing = store_file(
+                file_path,
+                venv["mongo_user"],
+                venv["mongo_pwd"],
+                venv["mongo_host"],
+                venv["mongo_port"],
+                venv["mongo_db"],
+            )
+
+    with stage("download_files"):
+        result_download = download_files(
             venv["mongo_user"],
             venv["mongo_pwd"],
             venv["mongo_host"],
             venv["mongo_port"],
             venv["mongo_db"],
+            process_type,
         )
 
-    result_download = download_files(
-        venv["mongo_user"],
-        venv["mongo_pwd"],
-        venv["mongo_host"],
-        venv["mongo_port"],
-        venv["mongo_db"],
-        process_type,
-    )
+    with stage("get_skills"):
+        result_skills = get_skills(
+            (
+                os.path.join(
+                    paths["temp_files"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
+                )
+                if process_type == "temp"
+                else os.path.join(
+                    paths["sources"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
+                )
+            ),
+            (
+                os.path.join(paths["temp_files"], "Coaff_V1.xlsx")
+                if process_type == "temp"
+                else os.path.join(paths["sources"], "Coaff_V1.xlsx")
+            ),
+            (
+                os.path.join(paths["temp_files"], "descriptions_uniques.txt")
+                if process_type == "temp"
+                else os.path.join(paths["sources"], "profils_uniques.txt")
+            ),
+            (
+                os.path.join(paths["temp_files"], "profils_uniques.txt")
+                if process_type == "temp"
+                else os.path.join(paths["sources"], "profils_uniques.txt")
+            ),
+        )
 
-    result_skills = get_skills(
-        (
-            os.path.join(
-                paths["temp_files"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
-            )
-            if process_type == "temp"
-            else os.path.join(
-                paths["sources"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
-            )
-        ),
-        (
-            os.path.join(paths["temp_files"], "Coaff_V1.xlsx")
-            if process_type == "temp"
-            else os.path.join(paths["sources"], "Coaff_V1.xlsx")
-        ),
-        (
-            os.path.join(paths["temp_files"], "descriptions_uniques.txt")
-            if process_type == "temp"
-            else os.path.join(paths["sources"], "profils_uniques.txt")
-        ),
-        (
-            os.path.join(paths["temp_files"], "profils_uniques.txt")
-            if process_type == "temp"
-            else os.path.join(paths["sources"], "profils_uniques.txt")
-        ),
-    )
+    with stage("create_fixtures"):
+        result_fixtures = create_fixtures(
+            (
+                os.path.join(
+                    paths["temp_files"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
+                )
+                if process_type == "temp"
+                else os.path.join(
+                    paths["sources"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
+                )
+            ),
+            (
+                os.path.join(paths["temp_files"], "Coaff_V1.xlsx")
+                if process_type == "temp"
+                else os.path.join(paths["sources"], "Coaff_V1.xlsx")
+            ),
+            (
+                os.path.join(
+                    paths["temp_files"], "UC_RS_RESOURCE_LIC_CERT_22_564150616.xlsx"
+                )
+                if process_type == "temp"
+                else os.path.join(
+                    paths["sources"], "UC_RS_RESOURCE_LIC_CERT_22_564150616.xlsx"
+                )
+            ),
+            (
+                table_path(paths["temp_fixtures"], "fixtures_psarm")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_psarm")
+            ),
+            (
+                table_path(paths["temp_fixtures"], "fixtures_coaff")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_coaff")
+            ),
+            (
+                table_path(paths["temp_fixtures"], "fixtures_certs")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_certs")
+            ),
+        )
 
-    result_fixtures = create_fixtures(
-        (
-            os.path.join(
-                paths["temp_files"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
+    with stage("insert_profiles"):
+        db_api_url = f"http://{venv['db_api_host']}:{venv['db_api_port']}"
+        if process_type == "temp":
+            response = bdd_api_session.delete(
+                f"{db_api_url}/profiles", json={"type": process_type}
             )
-            if process_type == "temp"
-            else os.path.join(
-                paths["sources"], "UC_RS_LP_RES_SKILLS_DETLS_22_1440892995.xlsx"
-            )
-        ),
-        (
-            os.path.join(paths["temp_files"], "Coaff_V1.xlsx")
-            if process_type == "temp"
-            else os.path.join(paths["sources"], "Coaff_V1.xlsx")
-        ),
-        (
-            os.path.join(
-                paths["temp_files"], "UC_RS_RESOURCE_LIC_CERT_22_564150616.xlsx"
-            )
-            if process_type == "temp"
-            else os.path.join(
-                paths["sources"], "UC_RS_RESOURCE_LIC_CERT_22_564150616.xlsx"
-            )
-        ),
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_psarm.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_psarm.csv")
-        ),
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_coaff.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_coaff.csv")
-        ),
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_certs.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_certs.csv")
-        ),
-    )
+        else:
+            # The permanent profiles are loaded into a shadow table, swapped in once
+            # complete so that the readers never see an empty or partial table
+            response = bdd_api_session.post(f"{db_api_url}/profiles/shadow")
+        response.raise_for_status()
 
-    response = requests.delete(
-        f"http://{venv['db_api_host']}:{venv['db_api_port']}/profiles",
-        json={"type": process_type},
-    )
-    response.raise_for_status()
-
-    result_insert = insert_profiles(
-        venv["db_api_host"],
-        venv["db_api_port"],
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_psarm.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_psarm.csv")
-        ),
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_coaff.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_coaff.csv")
-        ),
-        (
-            os.path.join(paths["temp_fixtures"], "fixtures_certs.csv")
-            if process_type == "temp"
-            else os.path.join(paths["fixtures"], "fixtures_certs.csv")
-        ),
-        (
-            os.path.join(paths["temp_combined"], "combined_result.csv")
-            if process_type == "temp"
-            else os.path.join(paths["combined"], "combined_result.csv")
-        ),
-        process_type,
-    )
+        result_insert = insert_profiles(
+            venv["db_api_host"],
+            venv["db_api_port"],
+            (
+                table_path(paths["temp_fixtures"], "fixtures_coaff")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_coaff")
+            ),
+            (
+                table_path(paths["temp_fixtures"], "fixtures_psarm")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_psarm")
+            ),
+            (
+                table_path(paths["temp_fixtures"], "fixtures_certs")
+                if process_type == "temp"
+                else table_path(paths["fixtures"], "fixtures_certs")
+            ),
+            (
+                table_path(paths["temp_combined"], "combined_result")
+                if process_type == "temp"
+                else table_path(paths["combined"], "combined_result")
+            ),
+            "temp" if process_type == "temp" else "shadow",
+        )
 
-    result_embed = embed_documents(
-        paths[f"temp_collection"] if process_type == "temp" else paths[f"collection"],
-        process_type,
-        MODEL_EMBEDDING,
-    )
+        if process_type != "temp":
+            response = bdd_api_session.put(f"{db_api_url}/profiles")
+            response.raise_for_status()
+
+    with stage("embed_documents"):
+        # The permanent profiles are embedded into a new version of the collection, the
+        # current one keeps answering the questions until the new one is validated
+        version = (
+            create_version(paths["collection"], process_type)
+            if process_type != "temp"
+            else None
+        )
+
+        result_embed = embed_documents(
+            (
+                paths[f"temp_collection"]
+                if process_type == "temp"
+                else paths[f"collection"]
+            ),
+            process_type,
+            MODEL_EMBEDDING,
+            incremental=True,
+            name=version,
+        )
 
     test_embedding
     test_load_documents
     test_ollama
 
-    result_validation = run_validation(
-        paths[f"temp_collection"] if process_type == "temp" else paths[f"collection"],
-        process_type,
-        (
-            os.path.join(paths["temp_combined"], "combined_result.csv")
-            if process_type == "temp"
-            else os.path.join(paths["combined"], "combined_result.csv")
-        ),
-        MODEL_EMBEDDING,
-        GPT_4O_MINI,
-    )
+    with stage("validation"):
+        result_validation = run_validation(
+            (
+                paths[f"temp_collection"]
+                if process_type == "temp"
+                else paths[f"collection"]
+            ),
+            process_type,
+            (
+                table_path(paths["temp_combined"], "combined_result")
+                if process_type == "temp"
+                else table_path(paths["combined"], "combined_result")
+            ),
+            MODEL_EMBEDDING,
+            GPT_4O_MINI,
+            version,
+        )
+
+        if version is not None:
+            if result_validation[1] <= MAX_FALSE_RATE:
+                switch_version(paths["collection"], process_type, version)
+            else:
+                logging.warning(
+                    f"Collection {version} not put into service, false rate "
+                    f"{result_validation[1]}% above {MAX_FALSE_RATE}%."
+                )
+                discard_version(paths["collection"], process_type, version)
 
     if process_type == "temp":
         os.replace(
@@ -239,6 +303,64 @@ def process_file(file, process_type):
     return result_validation
 
 
+def promote_temp(progress=None):
+    """
+    Makes the temporary profiles, validated by process_file, the permanent ones without
+    recomputing them: the embeddings are copied into a new version of the collection, the
+    profiles within the database, then the fixtures and combined tables are moved.
+
+    Args:
+    progress: JobProgress recording the duration of each stage, if any
+    """
+
+    def stage(name):
+        if progress is None:
+            return nullcontext()
+        return progress.stage(f"perm/{name}")
+
+    # The embeddings are copied into a new version, which is not served yet
+    with stage("promote_collection"):
+        version = import_version(
+            paths["collection"], "perm", paths["temp_collection"], "temp"
+        )
+
+    try:
+        with stage("promote_profiles"):
+            # The shadow table is filled from the temporary profiles by the database
+            # itself, then swapped in like after a load
+            db_api_url = f"http://{venv['db_api_host']}:{venv['db_api_port']}"
+            response = bdd_api_session.post(
+                f"{db_api_url}/profiles/shadow", params={"source": "temp"}
+            )
+            response.raise_for_status()
+            response = bdd_api_session.put(f"{db_api_url}/profiles")
+            response.raise_for_status()
+        switch_version(paths["collection"], "perm", version)
+    except BaseException:
+        discard_version(paths["collection"], "perm", version)
+        raise
+
+    # The files are moved last, a failed promotion leaves them in the temp directories
+    # to be promoted again
+    with stage("promote_tables"):
+        for name in ("fixtures_psarm", "fixtures_coaff", "fixtures_certs"):
+            move_table(
+                table_path(paths["temp_fixtures"], name),
+                table_path(paths["fixtures"], name),
+            )
+        move_table(
+            table_path(paths["temp_combined"], "combined_result"),
+            table_path(paths["combined"], "combined_result"),
+        )
+        for name in ("descriptions_uniques.txt", "profils_uniques.txt"):
+            os.replace(
+                os.path.join(paths["temp_files"], name),
+                os.path.join(paths["sources"], name),
+            )
+
+    logging.info("Temporary profiles promoted to permanent ones.")
+
+
 def delete_temp_files(file):
 
     if file.filename == "test_file.txt":
@@ -268,11 +390,6 @@ def delete_temp_files(file):
         os.remove(os.path.join(paths["temp_files"], "descriptions_uniques.txt"))
     if os.path.exists(os.path.join(paths["temp_files"], "profils_uniques.txt")):
         os.remove(os.path.join(paths["temp_files"], "profils_uniques.txt"))
-    if os.path.exists(os.path.join(paths["temp_fixtures"], "fixtures_psarm.csv")):
-        os.remove(os.path.join(paths["temp_fixtures"], "fixtures_psarm.csv"))
-    if os.path.exists(os.path.join(paths["temp_fixtures"], "fixtures_coaff.csv")):
-        os.remove(os.path.join(paths["temp_fixtures"], "fixtures_coaff.csv"))
-    if os.path.exists(os.path.join(paths["temp_fixtures"], "fixtures_certs.csv")):
-        os.remove(os.path.join(paths["temp_fixtures"], "fixtures_certs.csv"))
-    if os.path.exists(os.path.join(paths["temp_combined"], "combined_result.csv")):
-        os.remove(os.path.join(paths["temp_combined"], "combined_result.csv"))
+    for name in ("fixtures_psarm", "fixtures_coaff", "fixtures_certs"):
+        remove_table(table_path(paths["temp_fixtures"], name))
+    remove_table(table_path(paths["temp_combined"], "combined_result"))
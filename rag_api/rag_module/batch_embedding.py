@@ -0,0 +1,99 @@
+import os
+import math
+import asyncio
+import logging
+import ollama
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of concurrent requests when the server can't embed several inputs at once
+MAX_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 4))
+
+# Models for which the server answered that /api/embed is not available
+_single_input_models = set()
+
+
+def _normalize(embedding):
+    # /api/embed returns L2-normalized vectors, /api/embeddings doesn't
+    norm = math.sqrt(sum(x * x for x in embedding))
+    return [x / norm for x in embedding] if norm else list(embedding)
+
+
+def _embed_one(text, model):
+    response = ollama.embeddings(model=model, prompt=text)
+    return _normalize(response["embedding"])
+
+
+def embed_texts(texts: list, model: str, max_workers: int = MAX_WORKERS) -> list:
+    """
+    Embeds a list of texts with a single multi-input request, or with a bounded pool of
+    concurrent single-input requests when the Ollama server doesn't support it.
+
+    Args:
+        texts (list): The texts to embed.
+        model (str): The model to use for embedding.
+        max_workers (int): The maximum number of concurrent requests for the fallback.
+
+    Returns:
+        list: The embeddings, in the same order as the texts.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    if model not in _single_input_models:
+        try:
+            embeddings = ollama.embed(model=model, input=texts)["embeddings"]
+            if len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+            return [list(e) for e in embeddings]
+        except ollama.ResponseError as e:
+            # Servers older than 0.3 don't know /api/embed
+            if e.status_code != 404:
+                raise
+            logging.warning(
+                f"Multi-input embedding not supported for {model}, using {max_workers} workers."
+            )
+            _single_input_models.add(model)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as executor:
+        return list(executor.map(lambda text: _embed_one(text, model), texts))
+
+
+async def aembed_texts(texts: list, model: str, client: ollama.AsyncClient) -> list:
+    """
+    Embeds a list of texts like embed_texts, without blocking the event loop.
+
+    Args:
+        texts (list): The texts to embed.
+        model (str): The model to use for embedding.
+        client (ollama.AsyncClient): The asynchronous Ollama client.
+
+    Returns:
+        list: The embeddings, in the same order as the texts.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    if model not in _single_input_models:
+        try:
+            response = await client.embed(model=model, input=texts)
+            embeddings = response["embeddings"]
+            if len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+            return [list(e) for e in embeddings]
+        except ollama.ResponseError as e:
+            # Servers older than 0.3 don't know /api/embed
+            if e.status_code != 404:
+                raise
+            logging.warning(f"Multi-input embedding not supported for {model}.")
+            _single_input_models.add(model)
+
+    responses = await asyncio.gather(
+        *(client.embeddings(model=model, prompt=text) for text in texts)
+    )
+    return [_normalize(response["embedding"]) for response in responses]
@@ -0,0 +1,344 @@
+import os
+import re
+import json
+import logging
+import tempfile
+import threading
+import chromadb
+from chromadb.config import Settings
+
+from log_module.prometheus_metrics import count_cache_lookup
+
+# File mapping each type of profiles to its active collection version
+ALIAS_FILE = "aliases.json"
+# Versions kept after a switch, the active one included, to be able to roll back
+COLLECTION_KEEP_VERSIONS = int(os.getenv("COLLECTION_KEEP_VERSIONS", 2))
+# Records copied at once from the active version into a new one
+COPY_BATCH_SIZE = int(os.getenv("COLLECTION_COPY_BATCH_SIZE", 1000))
+
+# Long-lived ChromaDB collections, keyed by (collection path, type), with their name
+_collections = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# Parsed alias files, keyed by path, with the stat signature they were read at
+_aliases = {}
+
+
+def collection_name(type: str) -> str:
+    """
+    Returns the base name of the ChromaDB collections used for a type of profiles.
+
+    Args:
+        type (str): The type of profiles ("temp" or "perm").
+
+    Returns:
+        str: The name of the collection, the versions are named "{name}_v{n}".
+    """
+    return "temp" if type == "temp" else "docs"
+
+
+def _key(collection_path, type):
+    return (os.path.abspath(collection_path), type)
+
+
+def _client(collection_path):
+    return chromadb.PersistentClient(
+        path=collection_path,
+        settings=Settings(allow_reset=True),
+    )
+
+
+def _read_aliases(collection_path):
+    path = os.path.join(collection_path, ALIAS_FILE)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    # The file is replaced at every switch, its inode changes even within the same tick
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = _aliases.get(path)
+    if cached is None or cached[0] != signature:
+        with open(path, encoding="utf-8") as f:
+            cached = (signature, json.load(f))
+        _aliases[path] = cached
+    return cached[1]
+
+
+def active_collection(collection_path, type) -> str:
+    """
+    Resolves the name of the collection serving a type of profiles. The alias file is
+    checked at every call, so that a switch made by another process is picked up.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+
+    Returns:
+        str: The active version, or the unversioned collection if there is no alias.
+    """
+    return _read_aliases(collection_path).get(type, collection_name(type))
+
+
+def _versions(client, type):
+    # The unversioned collection counts as version 0
+    pattern = re.compile(rf"^{collection_name(type)}(?:_v(\d+))?$")
+    versions = {}
+    for collection in client.list_collections():
+        match = pattern.match(collection.name)
+        if match:
+            versions[int(match.group(1) or 0)] = collection.name
+    return versions
+
+
+def get_collection(collection_path, type, name=None):
+    """
+    Returns the ChromaDB collection for a path and a type, opening it only once per process.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        name (str): A version to open instead of the active one, it is not cached.
+
+    Returns:
+        chromadb.Collection: The cached collection.
+    """
+    if name is not None:
+        return _client(collection_path).get_collection(name=name)
+
+    key = _key(collection_path, type)
+    name = active_collection(collection_path, type)
+    with _lock:
+        cached = _collections.get(key)
+        if cached is not None and cached[0] == name:
+            _stats["hits"] += 1
+            count_cache_lookup("collection", True)
+            return cached[1]
+
+        _stats["misses"] += 1
+        count_cache_lookup("collection", False)
+        collection = _client(collection_path).get_collection(name=name)
+        _collections[key] = (name, collection)
+        logging.info(f"Collection {collection.name} opened from {collection_path}.")
+        return collection
+
+
+def warm_up(collection_path, type):
+    """
+    Opens the collection ahead of the first request. A missing collection is not an error
+    since it is created by the first file upload.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+    """
+    try:
+        get_collection(collection_path, type)
+    except Exception as e:
+        logging.warning(
+            f"Collection {collection_name(type)} not opened at startup: {e}"
+        )
+
+
+def invalidate_collection(collection_path, type):
+    """
+    Drops the cached collection so the next lookup reopens it. Must be called whenever the
+    collection is recreated or deleted.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+    """
+    with _lock:
+        if _collections.pop(_key(collection_path, type), None) is not None:
+            _stats["invalidations"] += 1
+            logging.info(f"Collection {collection_name(type)} cache invalidated.")
+
+
+def _next_version(client, type):
+    versions = _versions(client, type)
+    name = f"{collection_name(type)}_v{max(versions, default=0) + 1}"
+    return client.create_collection(name=name), versions
+
+
+def _copy_records(source, collection):
+    ids = source.get(include=[])["ids"]
+    for i in range(0, len(ids), COPY_BATCH_SIZE):
+        records = source.get(
+            ids=ids[i : i + COPY_BATCH_SIZE],
+            include=["embeddings", "documents", "metadatas"],
+        )
+        collection.add(
+            ids=records["ids"],
+            embeddings=records["embeddings"],
+            documents=records["documents"],
+            metadatas=records["metadatas"],
+        )
+
+
+def create_version(collection_path, type) -> str:
+    """
+    Creates the next version of a collection, filled with the records of the active one
+    so that only the changed profiles have to be embedded. The active version keeps
+    serving the queries while the new one is built.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+
+    Returns:
+        str: The name of the new version.
+    """
+    client = _client(collection_path)
+    collection, versions = _next_version(client, type)
+
+    active = active_collection(collection_path, type)
+    if active in versions.values():
+        _copy_records(client.get_collection(name=active), collection)
+    logging.info(
+        f"Collection {collection.name} created from {active} "
+        f"({collection.count()} records)."
+    )
+    return collection.name
+
+
+def import_version(collection_path, type, source_path, source_type) -> str:
+    """
+    Creates the next version of a collection, filled with the records of the active
+    collection of another ChromaDB, embeddings included: profiles validated in the
+    temporary collection are put into service without being embedded again.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        source_path (str): The path to the ChromaDB to copy the records from.
+        source_type (str): The type of profiles of the copied collection.
+
+    Returns:
+        str: The name of the new version.
+    """
+    source_name = active_collection(source_path, source_type)
+    source = _client(source_path).get_collection(name=source_name)
+    client = _client(collection_path)
+    collection, _ = _next_version(client, type)
+    try:
+        _copy_records(source, collection)
+    except BaseException:
+        client.delete_collection(name=collection.name)
+        raise
+    logging.info(
+        f"Collection {collection.name} imported from {source_name} of {source_path} "
+        f"({collection.count()} records)."
+    )
+    return collection.name
+
+
+def _write_aliases(collection_path, aliases):
+    # The new file is complete before it replaces the old one
+    fd, temp_path = tempfile.mkstemp(dir=collection_path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(aliases, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(collection_path, ALIAS_FILE))
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def switch_version(collection_path, type, name):
+    """
+    Makes a version the active collection of a type, by atomically replacing the alias
+    file, then deletes the versions beyond COLLECTION_KEEP_VERSIONS.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        name (str): The version to activate.
+    """
+    aliases = dict(_read_aliases(collection_path))
+    aliases[type] = name
+    _write_aliases(collection_path, aliases)
+    logging.info(f"Collection {name} is now the active {type} collection.")
+
+    invalidate_collection(collection_path, type)
+    garbage_collect(collection_path, type)
+
+
+def discard_version(collection_path, type, name):
+    """
+    Deletes a version that failed its validation, unless it is the active one.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        name (str): The version to delete.
+    """
+    if name == active_collection(collection_path, type):
+        return
+    _client(collection_path).delete_collection(name=name)
+    logging.info(f"Collection {name} discarded.")
+
+
+def delete_versions(collection_path, type) -> list:
+    """
+    Deletes every version of a collection, the unversioned one included, and its alias.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+
+    Returns:
+        list: The names of the deleted versions.
+    """
+    client = _client(collection_path)
+    deleted = list(_versions(client, type).values())
+    # The alias goes first, so that no lookup resolves to a deleted version
+    aliases = dict(_read_aliases(collection_path))
+    if aliases.pop(type, None) is not None:
+        _write_aliases(collection_path, aliases)
+    invalidate_collection(collection_path, type)
+    for name in deleted:
+        client.delete_collection(name=name)
+        logging.info(f"Collection {name} deleted.")
+    return deleted
+
+
+def garbage_collect(collection_path, type, keep=COLLECTION_KEEP_VERSIONS):
+    """
+    Deletes the old versions of a collection, keeping the active one and the most recent
+    ones older than it, up to keep versions in total. The versions newer than the active
+    one may still be being built, they are left alone.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        keep (int): The number of versions to keep.
+
+    Returns:
+        list: The names of the deleted versions.
+    """
+    client = _client(collection_path)
+    versions = _versions(client, type)
+    active = active_collection(collection_path, type)
+    numbers = [number for number, name in versions.items() if name == active]
+    if not numbers:
+        return []
+    older = sorted((number for number in versions if number < numbers[0]), reverse=True)
+    deleted = [versions[number] for number in older[max(keep - 1, 0) :]]
+    for name in deleted:
+        client.delete_collection(name=name)
+        logging.info(f"Collection {name} deleted by the garbage collection.")
+    return deleted
+
+
+def cache_stats() -> dict:
+    """
+    Returns the hit/miss counters of the collection cache.
+
+    Returns:
+        dict: The hits, misses and invalidations counters.
+    """
+    with _lock:
+        return dict(_stats)
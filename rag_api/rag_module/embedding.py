@@ -1,11 +1,23 @@
-import ollama
 import os
+import time
 import logging
 import chromadb
 from chromadb.config import Settings
 
 from rag_module.load_documents import load_profile
-from llm_module.model_precision_improvements import structure_query
+from rag_module.batch_embedding import embed_texts, aembed_texts
+from rag_module.embedding_cache import get_embedding_cache, text_key
+from rag_module.query_cache import query_cache
+from data.pre_processing import profile_id
+from rag_module.collection_registry import (
+    active_collection,
+    get_collection,
+    invalidate_collection,
+    delete_versions,
+)
+from llm_module.model_precision_improvements import structure_query_with_timings
+from concurrency import run_in_stage, stage_limit, ollama_client
+from log_module.prometheus_metrics import track_stage, count_cache_lookup
 
 logs_path = os.path.join(
     os.path.dirname(__file__), "..", "log_module", "logs", "embeddings.log"
@@ -19,8 +31,29 @@ logging.basicConfig(
 )
 
 
+def _embed_with_cache(texts, model, cache):
+    """
+    Embeds texts, sending only the ones missing from the cache to the model.
+
+    Returns:
+        tuple: The embeddings and the number of texts found in the cache.
+    """
+    embeddings = cache.get_many(texts, model)
+    misses = [j for j, e in enumerate(embeddings) if e is None]
+    missing_embeddings = embed_texts([texts[j] for j in misses], model)
+    for j, embedding in zip(misses, missing_embeddings):
+        embeddings[j] = embedding
+    cache.put_many([texts[j] for j in misses], missing_embeddings, model)
+    return embeddings, len(texts) - len(misses)
+
+
 def embed_documents(
-    collection_path, type, model="nomic-embed-text:v1.5", batch_size=10
+    collection_path,
+    type,
+    model="nomic-embed-text:v1.5",
+    batch_size=64,
+    incremental=False,
+    name=None,
 ):
     """
     Embeds the documents using an embedding model in batches.
@@ -29,6 +62,9 @@ def embed_documents(
         file_path (str): The path to the file containing documents to embed.
         model (str): The model to use for embedding.
         batch_size (int): The number of documents to process in each batch.
+        incremental (bool): Only upsert the new or changed profiles and delete the removed
+            ones, instead of adding every document.
+        name (str): The collection version to fill, instead of the active collection.
 
     Returns:
         chromadb.Collection: A collection of the embedded documents.
@@ -45,9 +81,13 @@ def embed_documents(
 
     # Create a new collection or get existing one
     collection = client.get_or_create_collection(
-        name="temp" if type == "temp" else "docs"
+        name=name or active_collection(collection_path, type)
     )
 
+    # The collection may have been recreated, the cached one must be reopened
+    if name is None:
+        invalidate_collection(collection_path, type)
+
     # Load documents
     documents = load_profile(type)
 
@@ -58,36 +98,111 @@ def embed_documents(
 
     logging.info(f"Found {len(documents)} documents.")
 
+    # Only the documents missing from the cache are sent to the embedding model
+    cache = get_embedding_cache()
+
+    if incremental:
+        update_collection(collection, documents, model, batch_size, cache)
+        cache.flush()
+        return collection
+
     # Store documents in batches
     for i in range(0, len(documents), batch_size):
-        batch_docs = documents[i : i + batch_size]
-        batch_embeddings = []
-        batch_ids = []
-        batch_texts = []
-        for j, d in enumerate(batch_docs):
-            try:
-                response = ollama.embeddings(model=model, prompt=d)
-                embedding = response["embedding"]
-                batch_embeddings.append(embedding)
-                batch_ids.append(str(i + j))  # Unique ID for each document
-                batch_texts.append(d)
-                # logging.info(f"Document {i + j} embedded.")
-            except Exception as e:
-                logging.error(f"Error embedding document {i + j}: {e}")
-                raise ValueError(f"Error embedding document {i + j}: {e}")
+        batch_texts = documents[i : i + batch_size]
+        batch_ids = [str(i + j) for j in range(len(batch_texts))]
+
+        start_time = time.time()
+        try:
+            batch_embeddings, cached = _embed_with_cache(batch_texts, model, cache)
+        except Exception as e:
+            logging.error(f"Error embedding batch {i // batch_size}: {e}")
+            raise ValueError(f"Error embedding batch {i // batch_size}: {e}")
+        duration = time.time() - start_time
 
         # Add the batch to the collection
         collection.add(
             ids=batch_ids, embeddings=batch_embeddings, documents=batch_texts
         )
-        logging.info(f"Batch {i // batch_size} added to the collection.")
+        logging.info(
+            f"Batch {i // batch_size} added to the collection "
+            f"({len(batch_texts) / duration if duration else 0:.1f} documents/s, "
+            f"{cached} from cache)."
+        )
+
+    cache.flush()
 
     return collection
 
 
+def update_collection(collection, documents, model, batch_size, cache):
+    """
+    Brings a collection in line with a list of profiles: profiles are identified by their
+    member name and code, only the new or changed ones are embedded and upserted, and the
+    ones no longer listed are deleted.
+
+    Args:
+        collection (chromadb.Collection): The collection to update.
+        documents (list): The profiles.
+        model (str): The model to use for embedding.
+        batch_size (int): The number of documents to process in each batch.
+        cache (EmbeddingCache): The embedding cache.
+
+    Returns:
+        dict: The number of upserted, deleted and unchanged profiles.
+    """
+    # The last profile wins if a member appears twice
+    profiles = {profile_id(d): d for d in documents}
+
+    existing = collection.get(include=["metadatas"])
+    existing_hashes = {
+        id: (metadata or {}).get("content_hash")
+        for id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+
+    changed = [
+        id for id, d in profiles.items() if existing_hashes.get(id) != text_key(d)
+    ]
+    removed = [id for id in existing_hashes if id not in profiles]
+
+    for i in range(0, len(removed), batch_size):
+        collection.delete(ids=removed[i : i + batch_size])
+
+    for i in range(0, len(changed), batch_size):
+        batch_ids = changed[i : i + batch_size]
+        batch_texts = [profiles[id] for id in batch_ids]
+
+        start_time = time.time()
+        try:
+            batch_embeddings, cached = _embed_with_cache(batch_texts, model, cache)
+        except Exception as e:
+            logging.error(f"Error embedding batch {i // batch_size}: {e}")
+            raise ValueError(f"Error embedding batch {i // batch_size}: {e}")
+        duration = time.time() - start_time
+
+        collection.upsert(
+            ids=batch_ids,
+            embeddings=batch_embeddings,
+            documents=batch_texts,
+            metadatas=[{"content_hash": text_key(d)} for d in batch_texts],
+        )
+        logging.info(
+            f"Batch {i // batch_size} upserted in the collection "
+            f"({len(batch_texts) / duration if duration else 0:.1f} documents/s, "
+            f"{cached} from cache)."
+        )
+
+    result = {
+        "upserted": len(changed),
+        "deleted": len(removed),
+        "unchanged": len(profiles) - len(changed),
+    }
+    logging.info(f"Incremental indexing: {result}")
+    return result
+
+
 # Retrieve documents
 def retrieve_documents(
-    collection_path, type, question: str, model="nomic-embed-text:v1.5"
+    collection_path, type, question: str, model="nomic-embed-text:v1.5", name=None
 ):
     """
     Embeds the question using an embedding model and queries the collection for the most similar document.
@@ -95,28 +210,48 @@ def retrieve_documents(
     Args:
         question (str): The question to embed.
         model (str): The model to use for embedding.
+        name (str): The collection version to query, instead of the active collection.
 
     Returns:
         str: The most similar document to the question.
     """
     # Improve the question structure
-    question = structure_query(question)
+    with track_stage("structure_query"):
+        question, timings = structure_query_with_timings(question)
+    logging.info(f"Query analysis timings: {timings}")
 
-    # Create embedding client
-    embedded_question = ollama.embeddings(prompt=question, model=model)
+    # Embed the question the same way as the documents, unless it was recently asked
+    embedded_question = query_cache.get(question, model)
+    count_cache_lookup("query_embedding", embedded_question is not None)
+    if embedded_question is None:
+        start_time = time.time()
+        with track_stage("query_embedding", model):
+            embedded_question = embed_texts([question], model)[0]
+        query_cache.put(question, model, embedded_question, time.time() - start_time)
 
-    # Connect to the ChromaDB client
-    client = chromadb.PersistentClient(
-        path=collection_path,
-        settings=Settings(allow_reset=True),
-    )
+    with track_stage("chroma_query"):
+        return query_collection(collection_path, type, embedded_question, name)
 
-    # Get the collection
-    collection = client.get_collection(name="temp" if type == "temp" else "docs")
+
+def query_collection(collection_path, type, embedded_question, name=None):
+    """
+    Queries the collection for the documents most similar to an embedded question.
+
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        embedded_question (list): The embedding of the question.
+        name (str): The collection version to query, instead of the active collection.
+
+    Returns:
+        list: The most similar documents.
+    """
+    # Get the collection from the process-wide cache
+    collection = get_collection(collection_path, type, name)
 
     # Query the collection with the embedded question for the most similar documents
     results = collection.query(
-        query_embeddings=[embedded_question["embedding"]],
+        query_embeddings=[embedded_question],
         n_results=20,
     )
     data = results["documents"]
@@ -124,35 +259,56 @@ def retrieve_documents(
     return data
 
 
-# Delete the collection
-def delete_collection(collection_path, type):
+async def aretrieve_documents(
+    collection_path, type, question: str, model="nomic-embed-text:v1.5"
+):
     """
-    Deletes the collection.
+    Retrieves the documents like retrieve_documents, without blocking the event loop: the
+    query analysis and the ChromaDB query run in the executor, the question is embedded
+    with the asynchronous Ollama client. Each stage has its own concurrency limit.
 
     Args:
         collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+        question (str): The question to embed.
+        model (str): The model to use for embedding.
+
+    Returns:
+        list: The most similar documents to the question.
     """
-    try:
-        # Connect to the client
-        client = chromadb.PersistentClient(
-            path=collection_path,
-            settings=Settings(allow_reset=True),
+    # Improve the question structure, the timings include the wait for a free slot
+    with track_stage("structure_query"):
+        question, timings = await run_in_stage(
+            "analysis", structure_query_with_timings, question
+        )
+    logging.info(f"Query analysis timings: {timings}")
+
+    # Embed the question the same way as the documents, unless it was recently asked
+    embedded_question = query_cache.get(question, model)
+    count_cache_lookup("query_embedding", embedded_question is not None)
+    if embedded_question is None:
+        start_time = time.time()
+        with track_stage("query_embedding", model):
+            async with stage_limit("embedding"):
+                embedded_question = (
+                    await aembed_texts([question], model, ollama_client())
+                )[0]
+        query_cache.put(question, model, embedded_question, time.time() - start_time)
+
+    with track_stage("chroma_query"):
+        return await run_in_stage(
+            "chroma", query_collection, collection_path, type, embedded_question
         )
-    except Exception as e:
-        logging.error(f"Error connecting to the ChromaDB client: {e}")
-        raise (f"Error connecting to the ChromaDB client: {e}")
 
-    # Delete the collection if it exists
-    collections = client.list_collections()
 
-    if collections:
-        for c in collections:
-            if c.name == "temp" if type == "temp" else "docs":
-                client.delete_collection(name=c.name)
-                logging.info(f"Collection {c.name} deleted.")
+# Delete the collection
+def delete_collection(collection_path, type):
+    """
+    Deletes the collection, with all its versions and its alias.
 
-            # vider le dossier temporaire
-            if type == "temp":
-                os.removedirs(collection_path)
-    else:
+    Args:
+        collection_path (str): The path to the collection ChromaDB.
+        type (str): The type of profiles ("temp" or "perm").
+    """
+    if not delete_versions(collection_path, type):
         logging.info("No collections found.")
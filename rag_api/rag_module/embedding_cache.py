@@ -0,0 +1,314 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows), a single process must write to the cache
+    fcntl = None
+
+base_path = os.path.dirname(__file__)
+CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR", os.path.join(base_path, "..", "data", "embedding_cache")
+)
+CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 512))
+
+
+def text_key(text: str) -> str:
+    """
+    Returns the cache key of a text: the SHA-256 of the text with normalized whitespaces.
+
+    Args:
+        text (str): The text to hash.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class _ModelStore:
+    """
+    Embeddings of one model: a float32 matrix appended to a raw file, read through a
+    memory map, and a JSON index mapping each key to its row and last access.
+
+    The files are shared by all the worker processes. Every change is made under an
+    exclusive lock on a lock file, from the index as it is on disk, and the index is
+    written before the lock is released: the index always describes the vectors file.
+    """
+
+    def __init__(self, directory, model):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.vectors_path = os.path.join(directory, f"{safe_name}.f32")
+        self.index_path = os.path.join(directory, f"{safe_name}.index.json")
+        self.lock_path = os.path.join(directory, f"{safe_name}.lock")
+        self.dim = None
+        self.rows = {}  # key -> [row, last access]
+        self.n_rows = 0  # Rows in the vectors file, replaced keys included
+        self.clock = 0
+        self.accessed = {}  # Keys read since the last write, least recent first
+        self._signature = None
+        self._matrix = None
+
+        with self._locked():
+            self._load()
+
+    @property
+    def size_bytes(self):
+        return self.n_rows * (self.dim or 0) * 4
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _index_signature(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _reset(self):
+        self.dim, self.rows, self.n_rows, self.clock = None, {}, 0, 0
+        for path in (self.vectors_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._signature = None
+
+    def _load(self):
+        # Called with the lock held. The index is read again only if another process
+        # rewrote it, and the file is mapped at once, so that the rows read without the
+        # lock match the index even if the file is compacted afterwards.
+        signature = self._index_signature()
+        if signature is not None and signature == self._signature:
+            return
+        self._matrix = None
+        if signature is None or not os.path.exists(self.vectors_path):
+            self._reset()
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+            self.n_rows = index["n_rows"]
+            self.clock = index["clock"]
+            # Drop the vectors of a process that died before writing the index
+            if os.path.getsize(self.vectors_path) < self.size_bytes:
+                raise ValueError("vectors file is truncated")
+            os.truncate(self.vectors_path, self.size_bytes)
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Embedding cache index {self.index_path} reset: {e}")
+            self._reset()
+            return
+        self._signature = signature
+        self._map()
+
+    def _map(self):
+        self._matrix = (
+            np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.n_rows, self.dim),
+            )
+            if self.n_rows
+            else None
+        )
+
+    def refresh(self):
+        """Picks up the rows written by the other processes."""
+        if self._index_signature() != self._signature:
+            with self._locked():
+                self._load()
+
+    def get(self, key):
+        entry = self.rows.get(key)
+        if entry is None:
+            return None
+        self.accessed.pop(key, None)
+        self.accessed[key] = None
+        return self._matrix[entry[0]].tolist()
+
+    def put(self, keys, vectors, max_bytes):
+        """Appends vectors, then keeps the most recently used rows filling at most 80%
+        of max_bytes if the file grew over it. Returns the number of evicted rows."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._locked():
+            self._load()
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Expected {self.dim} dimensions, got {matrix.shape[1]}"
+                )
+
+            # The rows are numbered from the size of the file, not from a count kept by
+            # this process
+            row = (
+                os.path.getsize(self.vectors_path) // (self.dim * 4)
+                if os.path.exists(self.vectors_path)
+                else 0
+            )
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+            for key in keys:
+                self.clock += 1
+                self.rows[key] = [row, self.clock]
+                row += 1
+            self.n_rows = row
+
+            evicted = self._evict(max_bytes)
+            self._write_index()
+            return evicted
+
+    def _evict(self, max_bytes):
+        if self.size_bytes <= max_bytes:
+            return 0
+        self._touch()
+        keep = int(0.8 * max_bytes) // (self.dim * 4)
+        kept = sorted(self.rows.items(), key=lambda item: item[1][1], reverse=True)
+        kept = kept[:keep]
+        vectors = np.memmap(
+            self.vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.n_rows, self.dim),
+        )
+        matrix = np.asarray(vectors[[entry[0] for _, entry in kept]])
+        del vectors
+
+        temp_path = self.vectors_path + ".tmp"
+        matrix.tofile(temp_path)
+        os.replace(temp_path, self.vectors_path)
+
+        evicted = len(self.rows) - len(kept)
+        self.rows = {key: [row, entry[1]] for row, (key, entry) in enumerate(kept)}
+        self.n_rows = len(kept)
+        return evicted
+
+    def _touch(self):
+        # The reads of this process, in order, become the most recent accesses
+        for key in self.accessed:
+            entry = self.rows.get(key)
+            if entry is not None:
+                self.clock += 1
+                entry[1] = self.clock
+        self.accessed = {}
+
+    def _write_index(self):
+        self._touch()
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "n_rows": self.n_rows,
+                    "clock": self.clock,
+                    "rows": self.rows,
+                },
+                f,
+            )
+        os.replace(temp_path, self.index_path)
+        self._signature = self._index_signature()
+        self._map()
+
+    def flush(self):
+        if not self.accessed:
+            return
+        with self._locked():
+            self._load()
+            self._write_index()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings keyed by (model name, SHA-256 of the normalized text).
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._stores = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _store(self, model):
+        if model not in self._stores:
+            self._stores[model] = _ModelStore(self.directory, model)
+        return self._stores[model]
+
+    def get_many(self, texts: list, model: str) -> list:
+        """
+        Looks up the embeddings of several texts.
+
+        Args:
+            texts (list): The texts to look up.
+            model (str): The embedding model.
+
+        Returns:
+            list: The embedding of each text, or None when it is not cached.
+        """
+        with self._lock:
+            store = self._store(model)
+            store.refresh()
+            return [store.get(text_key(text)) for text in texts]
+
+    def put_many(self, texts: list, embeddings: list, model: str) -> None:
+        """
+        Stores the embeddings of several texts, evicting the least recently used ones
+        when the cache grows over its maximum size.
+
+        Args:
+            texts (list): The embedded texts.
+            embeddings (list): The embedding of each text.
+            model (str): The embedding model.
+        """
+        if not texts:
+            return
+        with self._lock:
+            store = self._store(model)
+            evicted = store.put(
+                [text_key(text) for text in texts], embeddings, self.max_bytes
+            )
+            if evicted:
+                logging.info(f"{evicted} embeddings evicted from the {model} cache.")
+
+    def flush(self) -> None:
+        """
+        Writes the last accesses to the indexes on disk, the stored embeddings are
+        written by put_many.
+        """
+        with self._lock:
+            for store in self._stores.values():
+                store.flush()
+
+
+_default_cache = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Returns the process-wide embedding cache.
+
+    Returns:
+        EmbeddingCache: The cache stored in EMBEDDING_CACHE_DIR.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
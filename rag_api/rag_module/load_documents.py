@@ -1,38 +1,49 @@
-import requests
-import pandas as pd
+import json
 
 from docker_check import is_running_in_docker
+from http_pool import bdd_api_session
 
 venv = is_running_in_docker()
 
 
-def load_profile(type: str) -> list:
+def iter_profiles(type: str, fields: tuple = ("combined",)):
     """
-    Loads profiles from database api.
+    Streams profiles from the database api, one JSON line per profile, so that the
+    profiles are never all held in memory as JSON.
 
     Args:
-        None
+        type (str): The type of profiles ("temp" or "perm").
+        fields (tuple): The columns to fetch.
 
-    Returns:
-        List: A list where each line is a line of the document(s).
+    Yields:
+        dict: The profiles, with the requested columns.
     """
+    response = bdd_api_session.get(
+        f"http://{venv['db_api_host']}:{venv['db_api_port']}/profiles/stream",
+        params={"type": type, "fields": ",".join(fields)},
+        stream=True,
+    )
     try:
-        # Load the profiles from the database
-        response = requests.get(
-            f"http://{venv['db_api_host']}:{venv['db_api_port']}/profiles",
-            json={"type": type},
-        )
         response.raise_for_status()
+        for line in response.iter_lines(chunk_size=65536):
+            if line:
+                yield json.loads(line)
+    finally:
+        response.close()
 
-        # Convert the response to a Dataframe
-        profiles = response.json().get("profiles")
-        documents = pd.DataFrame(profiles)
 
-        if documents.empty:
-            return []
-        else:
-            documents = documents["combined"].tolist()
+def load_profile(type: str) -> list:
+    """
+    Loads profiles from database api.
 
-        return documents
+    Args:
+        type (str): The type of profiles ("temp" or "perm").
+
+    Returns:
+        List: A list where each line is a line of the document(s).
+    """
+    try:
+        # Only the combined column is fetched, the other ones are never used
+        return [profile["combined"] for profile in iter_profiles(type)]
     except Exception as e:
         raise ValueError(f"Error loading profiles: {e}")
@@ -0,0 +1,146 @@
+import os
+import time
+import array
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+# Optional SQLite file shared by all the uvicorn workers of the host
+QUERY_CACHE_DB = os.getenv("QUERY_CACHE_DB")
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of question embeddings, keyed by (structured query, model), whose
+    entries expire after a TTL. An optional SQLite store lets several processes share it.
+    """
+
+    def __init__(
+        self,
+        max_size=QUERY_CACHE_SIZE,
+        ttl=QUERY_CACHE_TTL,
+        shared_path=QUERY_CACHE_DB,
+        clock=time.time,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (vector, expiry)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "shared_hits": 0}
+        self._miss_seconds = 0.0
+        self._db = None
+
+        if shared_path:
+            self._db = sqlite3.connect(shared_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, expiry REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _key(query, model):
+        return hashlib.sha256(f"{model}\0{query}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector, expiry):
+        self._entries[key] = (vector, expiry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _shared_get(self, key, now):
+        try:
+            row = self._db.execute(
+                "SELECT vector, expiry FROM query_embeddings WHERE key = ? AND expiry > ?",
+                (key, now),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Shared query cache unavailable: {e}")
+            return None
+        if row is None:
+            return None
+        return array.array("f", row[0]).tolist(), row[1]
+
+    def get(self, query: str, model: str):
+        """
+        Looks up the embedding of a query.
+
+        Args:
+            query (str): The structured query.
+            model (str): The embedding model.
+
+        Returns:
+            list: The embedding, or None when it is not cached or expired.
+        """
+        key = self._key(query, model)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._shared_get(key, now)
+                if entry is not None:
+                    self._stats["shared_hits"] += 1
+                    self._remember(key, *entry)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, query: str, model: str, vector: list, duration: float = 0.0) -> None:
+        """
+        Stores the embedding of a query after a miss.
+
+        Args:
+            query (str): The structured query.
+            model (str): The embedding model.
+            vector (list): The embedding.
+            duration (float): The time spent computing the embedding, in seconds.
+        """
+        key = self._key(query, model)
+        expiry = self.clock() + self.ttl
+        with self._lock:
+            self._miss_seconds += duration
+            self._remember(key, list(vector), expiry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                        (key, array.array("f", vector).tobytes(), expiry),
+                    )
+                    self._db.execute(
+                        "DELETE FROM query_embeddings WHERE expiry <= ?",
+                        (self.clock(),),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logging.warning(f"Shared query cache unavailable: {e}")
+
+    def stats(self) -> dict:
+        """
+        Returns the hit rate of the cache and the embedding time it saved.
+
+        Returns:
+            dict: The hits, misses, hit rate and saved seconds.
+        """
+        with self._lock:
+            hits, misses = self._stats["hits"], self._stats["misses"]
+            average_miss = self._miss_seconds / misses if misses else 0.0
+            return {
+                **self._stats,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                "saved_seconds": round(hits * average_miss, 3),
+            }
+
+
+query_cache = QueryEmbeddingCache()
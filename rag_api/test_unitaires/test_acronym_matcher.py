@@ -0,0 +1,84 @@
+# Command: python -m unittest test_unitaires.test_acronym_matcher
+import os
+import re
+import json
+import tempfile
+import unittest
+
+from llm_module.acronym_matcher import AcronymMatcher
+
+
+class TestAcronymMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "acronyms.txt")
+        self.acronyms = {
+            "CDI": "Contrat à Durée Indéterminée",
+            "IA": "Intelligence Artificielle",
+            "R&D": "Recherche et Développement",
+            "CEO": "Chief Executive Officer (Directeur Général)",
+            "SI": "Système d'Information",
+        }
+        self.write(self.acronyms)
+        self.matcher = AcronymMatcher(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, acronyms):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(acronyms, f)
+
+    def naive(self, text):
+        # Previous implementation: three regular expressions per acronym
+        detected = {}
+        for acronym, definition in self.acronyms.items():
+            patterns = [
+                rf"\b{re.escape(acronym)}\b",
+                rf"{re.escape(acronym)}\s*\({re.escape(definition)}\)",
+                rf"\b{re.escape(definition)}\b",
+            ]
+            for pattern in patterns:
+                if re.findall(pattern, text, re.IGNORECASE):
+                    detected[acronym] = definition
+                    break
+        return detected
+
+    def test_same_result_as_regexes(self):
+        texts = [
+            "",
+            "Un poste en cdi pour un expert en ia",
+            "Missions en intelligence artificielle et en R&D",
+            "Ancien CEO (Chief Executive Officer (Directeur Général))",
+            "Chief Executive Officer (Directeur Général) d'une startup",
+            "Chief Executive Officer (Directeur Général)x",
+            "SIA, CDIs, IAs",
+            "R&Dx et xR&D",
+            "IA(Intelligence Artificielle)",
+            "Responsable SI, système d'information",
+        ]
+        for text in texts:
+            self.assertEqual(self.matcher.detect(text), self.naive(text), text)
+
+    def test_file_order(self):
+        detected = self.matcher.detect("Système d'Information, IA et CDI")
+
+        self.assertEqual(list(detected), ["CDI", "IA", "SI"])
+
+    def test_reload_on_change(self):
+        self.assertEqual(self.matcher.detect("Expert ERP"), {})
+        version = self.matcher.version
+
+        self.acronyms["ERP"] = "Enterprise Resource Planning"
+        self.write(self.acronyms)
+
+        self.assertEqual(
+            self.matcher.detect("Expert ERP"), {"ERP": "Enterprise Resource Planning"}
+        )
+        self.assertIn("ERP", self.matcher.acronyms)
+        self.assertEqual(self.matcher.version, version + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# Command: python -m unittest test_unitaires.test_chat_stream
+import json
+import logging
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+import rag_api
+from auth import get_current_user
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestChatStream(unittest.TestCase):
+
+    def setUp(self):
+        rag_api.app.dependency_overrides[get_current_user] = lambda: "test_user"
+        self.client = TestClient(rag_api.app)
+        patch("rag_api.retrieve_documents", return_value=[["doc"]]).start()
+        self.mock_metrics = patch("rag_api.log_chat_metrics").start()
+        self.payload = {
+            "service_type": "ollama",
+            "question": "Qui connaît Python ?",
+            "history": [
+                {"role": "system", "content": "context"},
+                {"role": "user", "content": "Qui connaît Python ?"},
+            ],
+            "chat_id": "test_chat_id",
+            "model": "llama3.1:8b",
+        }
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        patch.stopall()
+        rag_api.app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+    @patch("rag_api.generate_ollama_response_stream")
+    def test_tokens_then_timings(self, mock_stream):
+        mock_stream.return_value = iter(["| Nom |", " Python |\n", "Fin"])
+
+        response = self.client.post("/chat/stream", json=self.payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers["content-type"].startswith("text/event-stream")
+        )
+        events = parse_events(response.text)
+        self.assertEqual(
+            [data["text"] for event, data in events if event == "token"],
+            ["| Nom |", " Python |\n", "Fin"],
+        )
+        event, timings = events[-1]
+        self.assertEqual(event, "done")
+        self.assertLessEqual(timings["time_to_first_token"], timings["duration"])
+        metrics = self.mock_metrics.call_args.args[1]
+        self.assertIn("time_to_first_token", metrics)
+
+    @patch("rag_api.generate_ollama_response_stream")
+    def test_error_event(self, mock_stream):
+        def failing():
+            yield "Début"
+            raise RuntimeError("connection lost")
+
+        mock_stream.return_value = failing()
+
+        events = parse_events(self.client.post("/chat/stream", json=self.payload).text)
+
+        self.assertEqual(events[-1], ("error", {"detail": "connection lost"}))
+        self.mock_metrics.assert_not_called()
+
+    def test_incorrect_service_type(self):
+        self.payload["service_type"] = "unknown"
+
+        response = self.client.post("/chat/stream", json=self.payload)
+
+        self.assertEqual(response.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
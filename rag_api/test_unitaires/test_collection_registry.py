@@ -0,0 +1,178 @@
+# Command: python -m unittest test_unitaires.test_collection_registry
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import chromadb
+from chromadb.config import Settings
+
+import rag_module.collection_registry as registry
+
+
+class TestCollectionRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.patcher_PersistentClient = patch("chromadb.PersistentClient")
+        self.mock_PersistentClient = self.patcher_PersistentClient.start()
+
+        self.mock_client = MagicMock()
+        self.mock_PersistentClient.return_value = self.mock_client
+        self.mock_client.get_collection.side_effect = lambda name: MagicMock(name=name)
+
+        # Start every test with an empty registry
+        registry._collections.clear()
+        registry._stats.update(hits=0, misses=0, invalidations=0)
+
+    def tearDown(self):
+        patch.stopall()
+        registry._collections.clear()
+
+    def test_collection_opened_once(self):
+        first = registry.get_collection("dummy_path", "perm")
+        second = registry.get_collection("dummy_path", "perm")
+
+        self.assertIs(first, second)
+        self.mock_PersistentClient.assert_called_once()
+        self.mock_client.get_collection.assert_called_once_with(name="docs")
+        self.assertEqual(
+            registry.cache_stats(), {"hits": 1, "misses": 1, "invalidations": 0}
+        )
+
+    def test_collections_keyed_by_type(self):
+        registry.get_collection("dummy_path", "perm")
+        registry.get_collection("dummy_path", "temp")
+
+        self.assertEqual(self.mock_client.get_collection.call_count, 2)
+        self.assertEqual(registry.cache_stats()["misses"], 2)
+
+    def test_invalidate_reopens_collection(self):
+        first = registry.get_collection("dummy_path", "perm")
+        registry.invalidate_collection("dummy_path", "perm")
+        second = registry.get_collection("dummy_path", "perm")
+
+        self.assertIsNot(first, second)
+        self.assertEqual(
+            registry.cache_stats(), {"hits": 0, "misses": 2, "invalidations": 1}
+        )
+
+    def test_warm_up_missing_collection(self):
+        self.mock_client.get_collection.side_effect = ValueError("Not found")
+
+        # A missing collection must not prevent the API from starting
+        registry.warm_up("dummy_path", "perm")
+        self.assertEqual(registry.cache_stats()["misses"], 1)
+
+
+class TestCollectionVersions(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.path = tempfile.mkdtemp()
+        self.client = chromadb.PersistentClient(
+            path=self.path, settings=Settings(allow_reset=True)
+        )
+        self.client.create_collection(name="docs").add(
+            ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]], documents=["A", "B"]
+        )
+        registry._collections.clear()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        registry._collections.clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def names(self):
+        return sorted(c.name for c in self.client.list_collections())
+
+    def test_version_copied_from_active(self):
+        name = registry.create_version(self.path, "perm")
+
+        self.assertEqual(name, "docs_v1")
+        version = self.client.get_collection(name=name)
+        self.assertEqual(sorted(version.get()["ids"]), ["a", "b"])
+        # The version is not served before the switch
+        self.assertEqual(registry.active_collection(self.path, "perm"), "docs")
+
+    def test_switch_serves_new_version(self):
+        before = registry.get_collection(self.path, "perm")
+        name = registry.create_version(self.path, "perm")
+        self.client.get_collection(name=name).delete(ids=["b"])
+
+        registry.switch_version(self.path, "perm", name)
+
+        after = registry.get_collection(self.path, "perm")
+        self.assertEqual(before.name, "docs")
+        self.assertEqual(after.name, "docs_v1")
+        self.assertEqual(after.count(), 1)
+
+    def test_alias_switched_by_another_process(self):
+        registry.get_collection(self.path, "perm")
+        name = registry.create_version(self.path, "perm")
+
+        # Another worker switches the alias, the cached collection of this one is stale
+        with patch.object(registry, "invalidate_collection"):
+            registry.switch_version(self.path, "perm", name)
+
+        self.assertEqual(registry.get_collection(self.path, "perm").name, name)
+
+    def test_garbage_collection_keeps_previous_version(self):
+        for _ in range(3):
+            registry.switch_version(
+                self.path, "perm", registry.create_version(self.path, "perm")
+            )
+        pending = registry.create_version(self.path, "perm")
+
+        # The active version, the one before it, and the version being built are kept
+        self.assertEqual(self.names(), ["docs_v2", "docs_v3", pending])
+        self.assertEqual(pending, "docs_v4")
+
+    def test_discard_version(self):
+        name = registry.create_version(self.path, "perm")
+        registry.discard_version(self.path, "perm", name)
+        registry.discard_version(self.path, "perm", "docs")
+
+        # The active collection is never discarded
+        self.assertEqual(self.names(), ["docs"])
+
+    def test_delete_versions(self):
+        registry.switch_version(
+            self.path, "perm", registry.create_version(self.path, "perm")
+        )
+        registry.get_collection(self.path, "perm")
+
+        deleted = registry.delete_versions(self.path, "perm")
+
+        self.assertEqual(sorted(deleted), ["docs", "docs_v1"])
+        self.assertEqual(self.names(), [])
+        self.assertEqual(registry.active_collection(self.path, "perm"), "docs")
+        self.assertEqual(registry._collections, {})
+
+    def test_import_version(self):
+        temp_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_path, ignore_errors=True)
+        chromadb.PersistentClient(
+            path=temp_path, settings=Settings(allow_reset=True)
+        ).create_collection(name="temp").add(
+            ids=["c"],
+            embeddings=[[0.5, 0.5]],
+            documents=["C"],
+            metadatas=[{"content_hash": "h"}],
+        )
+
+        name = registry.import_version(self.path, "perm", temp_path, "temp")
+
+        # The records are copied with their embeddings, not the ones of the active version
+        records = self.client.get_collection(name=name).get(
+            include=["embeddings", "documents", "metadatas"]
+        )
+        self.assertEqual(name, "docs_v1")
+        self.assertEqual(records["ids"], ["c"])
+        self.assertEqual(list(records["embeddings"][0]), [0.5, 0.5])
+        self.assertEqual(records["metadatas"], [{"content_hash": "h"}])
+        self.assertEqual(registry.active_collection(self.path, "perm"), "docs")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+# Command: python -m unittest test_unitaires.test_concurrency
+import time
+import asyncio
+import logging
+import threading
+import unittest
+from unittest.mock import patch, AsyncMock
+
+import concurrency
+from rag_module import batch_embedding
+from llm_module.generate_response import agenerate_ollama_response
+
+
+class TestStageLimits(unittest.TestCase):
+
+    def test_run_in_stage_respects_limit(self):
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def blocking():
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.05)
+            with lock:
+                running["now"] -= 1
+            return threading.current_thread().name
+
+        async def main():
+            return await asyncio.gather(
+                *(concurrency.run_in_stage("chroma", blocking) for _ in range(6))
+            )
+
+        with patch.dict(concurrency.STAGE_LIMITS, {"chroma": 2}):
+            names = asyncio.run(main())
+
+        self.assertEqual(running["max"], 2)
+        self.assertTrue(all(name.startswith("blocking") for name in names))
+
+    def test_clients_reused_within_a_loop(self):
+        async def main():
+            return concurrency.ollama_client(), concurrency.ollama_client()
+
+        first, second = asyncio.run(main())
+
+        self.assertIs(first, second)
+
+    def test_close_clients(self):
+        async def main():
+            client = concurrency.ollama_client()
+            transport = concurrency._state()["clients"]["ollama_transport"]
+            with patch.object(transport, "aclose", wraps=transport.aclose) as aclose:
+                await concurrency.close_clients()
+            aclose.assert_awaited_once()
+            return client, concurrency.ollama_client()
+
+        closed, reopened = asyncio.run(main())
+
+        self.assertIsNot(closed, reopened)
+
+
+class TestAsyncEmbedding(unittest.TestCase):
+
+    def setUp(self):
+        batch_embedding._single_input_models.clear()
+
+    def test_multi_input(self):
+        client = AsyncMock()
+        client.embed.return_value = {"embeddings": [[1.0, 0.0], [0.0, 1.0]]}
+
+        embeddings = asyncio.run(
+            batch_embedding.aembed_texts(["a", "b"], "model", client)
+        )
+
+        self.assertEqual(embeddings, [[1.0, 0.0], [0.0, 1.0]])
+        client.embeddings.assert_not_called()
+
+    def test_single_input_fallback(self):
+        client = AsyncMock()
+        client.embed.side_effect = batch_embedding.ollama.ResponseError(
+            "not found", 404
+        )
+        client.embeddings.side_effect = lambda model, prompt: {
+            "embedding": [3.0, 4.0] if prompt == "a" else [0.0, 2.0]
+        }
+
+        embeddings = asyncio.run(
+            batch_embedding.aembed_texts(["a", "b"], "model", client)
+        )
+
+        self.assertEqual(embeddings, [[0.6, 0.8], [0.0, 1.0]])
+        self.assertIn("model", batch_embedding._single_input_models)
+
+
+class TestAsyncOllamaResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.client = AsyncMock()
+        self.client.list.return_value = {"models": [{"name": "llama3.1:8b"}]}
+        self.client.generate.return_value = {"response": "Test response"}
+        patch(
+            "llm_module.generate_response.ollama_client", return_value=self.client
+        ).start()
+        patch("llm_module.generate_response.log_response").start()
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        patch.stopall()
+        logging.disable(logging.NOTSET)
+
+    def test_success(self):
+        history = [
+            {"role": "system", "content": "test_text1"},
+            {"role": "user", "content": "test_text2"},
+        ]
+
+        response = asyncio.run(agenerate_ollama_response([["test_data"]], history))
+
+        self.assertEqual(response, "Test response")
+
+    def test_invalid_model(self):
+        history = [
+            {"role": "system", "content": "test_text1"},
+            {"role": "user", "content": "test_text2"},
+        ]
+
+        response = asyncio.run(
+            agenerate_ollama_response(["test_data"], history, "invalid_model")
+        )
+
+        self.assertTrue(response.startswith("The model invalid_model is not available"))
+        self.client.generate.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# Command: python -m unittest test_unitaires.test_date_extraction
+import unittest
+
+from llm_module.date_extraction import extract_dates, parse_date, sort_dates
+
+
+class TestDateExtraction(unittest.TestCase):
+
+    def test_formats_normalized_to_iso(self):
+        cases = {
+            "2024-03-15": "2024-03-15",
+            "2024/03/15": "2024-03-15",
+            "15/03/2024": "2024-03-15",
+            "15-03-2024": "2024-03-15",
+            "15.03.2024": "2024-03-15",
+            "15 mars 2024": "2024-03-15",
+            "15-Mars-2024": "2024-03-15",
+            "March 15th, 2024": "2024-03-15",
+            "mars 2024": "2024-03-01",
+            "2024 août": "2024-08-01",
+            "15/03/24": "2024-03-15",
+            "240315": "2024-03-15",
+        }
+        for text, iso in cases.items():
+            self.assertEqual(parse_date(text).isoformat(), iso, text)
+
+    def test_not_calendar_dates(self):
+        for text in ("31/02/2024", "en 2024", "2024 au 15"):
+            self.assertIsNone(parse_date(text), text)
+
+    def test_single_scan_keeps_overlapping_dates(self):
+        dates = extract_dates("Missions en janvier 2023 et 2022-05-01")
+
+        self.assertIn(("janvier 2023", "2023-01-01"), dates)
+        self.assertIn(("2022-05-01", "2022-05-01"), dates)
+
+    def test_duplicates_removed_in_order(self):
+        dates = extract_dates("Du 12/03/2024 au 15 mars 2025, puis le 12/03/2024")
+
+        self.assertEqual(
+            [date_str for date_str, _ in dates],
+            ["12/03/2024", "2024 au 15", "15 mars 2025", "mars 2025"],
+        )
+
+    def test_sort_chronologically_then_unparsed(self):
+        self.assertEqual(
+            sort_dates(
+                ["15 mars 2025", "en 2024", "12/03/2024", "mai 2020", "12/03/2024"]
+            ),
+            ["mai 2020", "12/03/2024", "15 mars 2025", "en 2024"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
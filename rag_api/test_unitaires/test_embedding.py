@@ -1,9 +1,13 @@
 # Command: python -m unittest test_unitaires.test_embedding
 import unittest
+import tempfile
 from unittest.mock import patch, MagicMock
+import ollama
 from chromadb.config import Settings
 
 from rag_module.embedding import embed_documents
+import rag_module.batch_embedding as batch_embedding
+from rag_module.embedding_cache import EmbeddingCache, text_key
 
 
 class TestEmbedDocuments(unittest.TestCase):
@@ -13,11 +17,17 @@ class TestEmbedDocuments(unittest.TestCase):
         self.patcher_load_profile = patch("rag_module.embedding.load_profile")
         self.patcher_PersistentClient = patch("chromadb.PersistentClient")
         self.patcher_ollama_embeddings = patch("ollama.embeddings")
+        self.patcher_ollama_embed = patch("ollama.embed")
 
         # Start the patches
         self.mock_load_profile = self.patcher_load_profile.start()
         self.mock_PersistentClient = self.patcher_PersistentClient.start()
         self.mock_ollama_embeddings = self.patcher_ollama_embeddings.start()
+        self.mock_ollama_embed = self.patcher_ollama_embed.start()
+
+        # By default the server doesn't support multi-input embedding
+        self.mock_ollama_embed.side_effect = ollama.ResponseError("not found", 404)
+        batch_embedding._single_input_models.clear()
 
         # Configure the mock PersistentClient
         self.mock_client = MagicMock()
@@ -25,9 +35,18 @@ class TestEmbedDocuments(unittest.TestCase):
         self.mock_PersistentClient.return_value = self.mock_client
         self.mock_client.get_or_create_collection.return_value = self.mock_collection
 
+        # Use an empty embedding cache for each test
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = EmbeddingCache(self.cache_dir.name)
+        patch(
+            "rag_module.embedding.get_embedding_cache", return_value=self.cache
+        ).start()
+
     def tearDown(self):
         # Stop all patches
         patch.stopall()
+        batch_embedding._single_input_models.clear()
+        self.cache_dir.cleanup()
 
     def test_embed_documents_success(self):
         # Test-specific setup
@@ -45,6 +64,110 @@ class TestEmbedDocuments(unittest.TestCase):
         self.mock_load_profile.assert_called_once_with("temp")
         self.assertEqual(self.mock_collection.add.call_count, 2)
 
+    def test_embed_documents_multi_input(self):
+        # Test-specific setup
+        self.mock_load_profile.return_value = ["Document 1", "Document 2", "Document 3"]
+        vectors = {
+            "Document 1": [0.1, 0.2],
+            "Document 2": [0.3, 0.4],
+            "Document 3": [0.5, 0.6],
+        }
+        self.mock_ollama_embed.side_effect = lambda model, input: {
+            "embeddings": [vectors[d] for d in input]
+        }
+
+        # Call the function with batch_size=2
+        embed_documents("dummy_path", "temp", batch_size=2)
+
+        # One request per batch, single-input endpoint never used
+        self.assertEqual(self.mock_ollama_embed.call_count, 2)
+        self.mock_ollama_embeddings.assert_not_called()
+        self.mock_collection.add.assert_any_call(
+            ids=["0", "1"],
+            embeddings=[[0.1, 0.2], [0.3, 0.4]],
+            documents=["Document 1", "Document 2"],
+        )
+
+    def test_embed_documents_fallback_keeps_order(self):
+        # Test-specific setup
+        self.mock_load_profile.return_value = ["Document 1", "Document 2", "Document 3"]
+        vectors = {
+            "Document 1": [1.0, 0.0],
+            "Document 2": [0.0, 1.0],
+            "Document 3": [0.0, -1.0],
+        }
+        self.mock_ollama_embeddings.side_effect = lambda model, prompt: {
+            "embedding": vectors[prompt]
+        }
+
+        embed_documents("dummy_path", "temp", batch_size=3)
+
+        self.mock_collection.add.assert_called_once_with(
+            ids=["0", "1", "2"],
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [0.0, -1.0]],
+            documents=["Document 1", "Document 2", "Document 3"],
+        )
+        # The unsupported endpoint is only tried once
+        self.mock_ollama_embed.assert_called_once()
+
+    def test_embed_documents_cached_documents_not_embedded(self):
+        # Test-specific setup
+        self.mock_ollama_embed.side_effect = lambda model, input: {
+            "embeddings": [[0.1, 0.2] for _ in input]
+        }
+        self.mock_load_profile.return_value = ["Document 1", "Document 2"]
+        embed_documents("dummy_path", "temp")
+
+        # Only the new document is sent to the model on the second run
+        self.mock_load_profile.return_value = ["Document 1", "Document 3"]
+        embed_documents("dummy_path", "temp")
+
+        self.assertEqual(self.mock_ollama_embed.call_count, 2)
+        self.assertEqual(
+            self.mock_ollama_embed.call_args.kwargs["input"], ["Document 3"]
+        )
+
+    def test_embed_documents_incremental(self):
+        # Test-specific setup
+        self.mock_ollama_embed.side_effect = lambda model, input: {
+            "embeddings": [[0.1, 0.2] for _ in input]
+        }
+        unchanged = "Nom: Jean Dupont, Code: 12, Profil: Expert"
+        changed = "Nom: Marie Curie, Code: 34, Profil: Junior"
+        new = "Nom: Paul Martin, Code: 56, Profil: Confirmé"
+        self.mock_load_profile.return_value = [unchanged, changed, new]
+        self.mock_collection.get.return_value = {
+            "ids": ["12-Jean Dupont", "34-Marie Curie", "78-Anne Durand"],
+            "metadatas": [
+                {"content_hash": text_key(unchanged)},
+                {
+                    "content_hash": text_key(
+                        "Nom: Marie Curie, Code: 34, Profil: Faible"
+                    )
+                },
+                {"content_hash": "old"},
+            ],
+        }
+
+        embed_documents("dummy_path", "perm", incremental=True)
+
+        # Only the changed and new profiles are embedded and upserted
+        self.mock_ollama_embed.assert_called_once()
+        self.assertEqual(
+            self.mock_ollama_embed.call_args.kwargs["input"], [changed, new]
+        )
+        self.mock_collection.upsert.assert_called_once_with(
+            ids=["34-Marie Curie", "56-Paul Martin"],
+            embeddings=[[0.1, 0.2], [0.1, 0.2]],
+            documents=[changed, new],
+            metadatas=[
+                {"content_hash": text_key(changed)},
+                {"content_hash": text_key(new)},
+            ],
+        )
+        self.mock_collection.delete.assert_called_once_with(ids=["78-Anne Durand"])
+        self.mock_collection.add.assert_not_called()
+
     def test_embed_documents_load_profile_error(self):
         # Test-specific setup
         self.mock_load_profile.side_effect = ValueError("Error loading documents")
@@ -0,0 +1,129 @@
+# Command: python -m unittest test_unitaires.test_embedding_cache
+import os
+import unittest
+import tempfile
+import multiprocessing
+import numpy as np
+
+from rag_module.embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.model = "nomic-embed-text:v1.5"
+        self.vectors_file = "nomic-embed-text_v1.5.f32"
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_get_missing(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        self.assertEqual(cache.get_many(["Document 1"], self.model), [None])
+
+    def test_put_and_get(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        cache.put_many(
+            ["Document 1", "Document 2"], [[0.5, 1.0], [2.0, 4.0]], self.model
+        )
+
+        result = cache.get_many(["Document 2", "Document 3", "Document 1"], self.model)
+        self.assertEqual(result, [[2.0, 4.0], None, [0.5, 1.0]])
+
+    def test_whitespaces_normalized(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        cache.put_many(["Nom: Jean  Dupont\n"], [[0.5, 1.0]], self.model)
+
+        self.assertEqual(cache.get_many(["Nom: Jean Dupont"], self.model), [[0.5, 1.0]])
+
+    def test_keyed_by_model(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        cache.put_many(["Document 1"], [[0.5, 1.0]], self.model)
+
+        self.assertEqual(cache.get_many(["Document 1"], "all-minilm:33m"), [None])
+
+    def test_persisted_after_flush(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        cache.put_many(["Document 1"], [[0.5, 1.0]], self.model)
+        cache.put_many(["Document 1"], [[0.25, 0.75]], self.model)
+        cache.flush()
+
+        reloaded = EmbeddingCache(self.cache_dir.name)
+        self.assertEqual(reloaded.get_many(["Document 1"], self.model), [[0.25, 0.75]])
+
+    def test_unindexed_vectors_dropped(self):
+        cache = EmbeddingCache(self.cache_dir.name)
+        cache.put_many(["Document 1"], [[0.5, 1.0]], self.model)
+        # A process died after appending a vector, before writing its index entry
+        with open(os.path.join(self.cache_dir.name, self.vectors_file), "ab") as f:
+            f.write(np.asarray([2.0, 4.0], dtype=np.float32).tobytes())
+
+        reloaded = EmbeddingCache(self.cache_dir.name)
+        reloaded.put_many(["Document 3"], [[8.0, 16.0]], self.model)
+        result = reloaded.get_many(["Document 1", "Document 3"], self.model)
+        self.assertEqual(result, [[0.5, 1.0], [8.0, 16.0]])
+
+    def test_shared_by_processes(self):
+        # Two worker processes, both loaded before either one writes
+        worker_a = EmbeddingCache(self.cache_dir.name)
+        worker_b = EmbeddingCache(self.cache_dir.name)
+        worker_a.get_many(["alpha"], self.model)
+        worker_b.get_many(["beta"], self.model)
+
+        worker_a.put_many(["alpha"], [[0.0, 1.0]], self.model)
+        worker_b.put_many(["beta"], [[1.0, 0.0]], self.model)
+        worker_a.flush()
+        worker_b.flush()
+
+        reader = EmbeddingCache(self.cache_dir.name)
+        self.assertEqual(
+            reader.get_many(["alpha", "beta"], self.model), [[0.0, 1.0], [1.0, 0.0]]
+        )
+        # Each worker also sees the vector stored by the other one
+        self.assertEqual(worker_a.get_many(["beta"], self.model), [[1.0, 0.0]])
+
+    def test_concurrent_processes(self):
+        def put(worker):
+            cache = EmbeddingCache(self.cache_dir.name)
+            for i in range(20):
+                cache.put_many(
+                    [f"{worker} {i}"], [[float(worker), float(i)]], self.model
+                )
+
+        processes = [multiprocessing.Process(target=put, args=(w,)) for w in (1, 2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        cache = EmbeddingCache(self.cache_dir.name)
+        texts = [f"{w} {i}" for w in (1, 2) for i in range(20)]
+        expected = [[float(w), float(i)] for w in (1, 2) for i in range(20)]
+        self.assertEqual(cache.get_many(texts, self.model), expected)
+
+    def test_least_recently_used_evicted(self):
+        # Room for 4 vectors of 2 float32
+        cache = EmbeddingCache(self.cache_dir.name, max_bytes=32)
+        cache.put_many(
+            ["Document 1", "Document 2", "Document 3", "Document 4"],
+            [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0], [4.0, 4.0]],
+            self.model,
+        )
+        cache.get_many(["Document 1"], self.model)
+        cache.put_many(["Document 5"], [[5.0, 5.0]], self.model)
+
+        result = cache.get_many(
+            ["Document 1", "Document 2", "Document 3", "Document 4", "Document 5"],
+            self.model,
+        )
+        # 80% of the maximum size is kept: the 3 most recently used vectors
+        self.assertEqual(result, [[1.0, 1.0], None, None, [4.0, 4.0], [5.0, 5.0]])
+        self.assertLessEqual(
+            os.path.getsize(os.path.join(self.cache_dir.name, self.vectors_file)),
+            32,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# Command: python -m unittest test_unitaires.test_fuzzy_index
+import unittest
+from fuzzywuzzy import fuzz
+
+from llm_module.fuzzy_index import FuzzyIndex, fuzzy_ratio
+
+
+class TestFuzzyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = [
+            "SQL",
+            "SQL Server",
+            "Python",
+            "Java",
+            "Javascript",
+            "Analyse des données",
+            "Gestion de projets",
+            "Agile",
+            "SCRUM",
+            "Python",
+            "",
+        ]
+        self.tokens = [
+            "sql",
+            "SQL",
+            "Pyhton",
+            "python",
+            "Jav",
+            "javascript",
+            "données",
+            "agiles",
+            "Scrum",
+            "en",
+            "a",
+            "Ω",
+            "gestion de projet",
+        ]
+
+    def brute_force(self, token, threshold):
+        return [
+            (i, fuzz.ratio(entry.lower(), token.lower()))
+            for i, entry in enumerate(self.vocabulary)
+            if fuzz.ratio(entry.lower(), token.lower()) > threshold
+        ]
+
+    def test_same_ratio_as_fuzzywuzzy(self):
+        for token in self.tokens:
+            for entry in self.vocabulary:
+                self.assertEqual(
+                    fuzzy_ratio(entry.lower(), token.lower()),
+                    fuzz.ratio(entry.lower(), token.lower()),
+                )
+
+    def test_same_matches_as_fuzzywuzzy(self):
+        for threshold in (70, 80):
+            index = FuzzyIndex(self.vocabulary, threshold)
+            for token in self.tokens:
+                self.assertEqual(
+                    index.lookup(token), self.brute_force(token, threshold), token
+                )
+
+    def test_duplicate_entries_returned(self):
+        index = FuzzyIndex(self.vocabulary, 70)
+        self.assertEqual(index.lookup("python"), [(2, 100), (9, 100)])
+
+    def test_empty_token(self):
+        index = FuzzyIndex(self.vocabulary, 70)
+        self.assertEqual(index.lookup(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
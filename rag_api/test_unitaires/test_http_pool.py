@@ -0,0 +1,122 @@
+# Command: python -m unittest test_unitaires.test_http_pool
+import json
+import time
+import logging
+import threading
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from prometheus_client import REGISTRY
+
+import http_pool
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive requires HTTP/1.1
+    protocol_version = "HTTP/1.1"
+    failures = []
+
+    def reply(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.5)
+        if self.failures:
+            self.reply(self.failures.pop(), {"error": "unavailable"})
+        else:
+            self.reply(200, {"path": self.path})
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = json.loads(self.rfile.read(length))
+        if self.failures:
+            self.reply(self.failures.pop(), {"error": "unavailable"})
+        else:
+            self.reply(200, body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # The timeout test closes the connection before the response
+        pass
+
+
+def sample(name):
+    return REGISTRY.get_sample_value(name, {"host": "127.0.0.1"}) or 0
+
+
+class TestHttpPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(("127.0.0.1", 0), Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.failures = []
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_connection_reused(self):
+        session = http_pool.create_session()
+        requests_before = sample("rag_http_requests_total")
+        connections_before = sample("rag_http_connections_total")
+
+        for i in range(5):
+            response = session.post(f"{self.url}/profile", json={"id": i})
+            self.assertEqual(response.json(), {"id": i})
+
+        self.assertEqual(sample("rag_http_requests_total") - requests_before, 5)
+        self.assertEqual(sample("rag_http_connections_total") - connections_before, 1)
+
+    def test_idempotent_request_retried(self):
+        Handler.failures = [503, 503]
+        with patch.object(http_pool, "HTTP_BACKOFF", 0):
+            session = http_pool.create_session(retries=3)
+        response = session.get(f"{self.url}/profiles")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Handler.failures, [])
+
+    def test_post_not_retried_on_error_status(self):
+        Handler.failures = [503]
+        session = http_pool.create_session(retries=3)
+
+        response = session.post(f"{self.url}/profile", json={})
+
+        self.assertEqual(response.status_code, 503)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            response.raise_for_status()
+
+    def test_default_timeout(self):
+        session = http_pool.create_session(read_timeout=0.1, retries=0)
+
+        with self.assertRaises(requests.exceptions.RequestException):
+            session.get(f"{self.url}/slow")
+
+        # A timeout given to the call replaces the default one
+        response = session.get(f"{self.url}/slow", timeout=5)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# Command: python -m unittest test_unitaires.test_insert_profiles
+import io
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import requests
+
+import rag_cd
+from data.pre_processing import insert_profiles, profile_lines
+from data.table_store import (
+    write_table,
+    table_path,
+    COAFF_SCHEMA,
+    PSARM_SCHEMA,
+    CERTS_SCHEMA,
+)
+from test_unitaires.test_pre_processing import rich_fixtures
+
+
+class TestInsertProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.profiles = pd.DataFrame(
+            {
+                "Membres": [f"Nom: Membre {i}, Code: {i}" for i in range(5)],
+                "Missions": [["Mission A", "Mission B"]] * 5,
+                "Compétences": [["Competent in Python"]] * 5,
+                "Certifications": [[]] * 5,
+                "Combined": [f"Profil {i}" for i in range(5)],
+                "Nom": [f"Membre {i}" for i in range(5)],
+            }
+        )
+
+    def test_profile_lines_chunked(self):
+        chunks = list(profile_lines(self.profiles, "temp", chunk_size=2))
+
+        self.assertEqual(len(chunks), 3)
+        lines = b"".join(chunks).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {
+                "membre": "Nom: Membre 0, Code: 0",
+                "mission": ["Mission A", "Mission B"],
+                "competence": ["Competent in Python"],
+                "certification": [],
+                "combined": "Profil 0",
+                "type": "temp",
+            },
+        )
+
+    @patch("http_pool.bdd_api_session.post")
+    @patch("data.pre_processing.pre_processing")
+    def test_single_bulk_request(self, mock_pre_processing, mock_post):
+        mock_pre_processing.return_value = self.profiles
+        mock_post.return_value = MagicMock(
+            json=MagicMock(return_value={"message": "Profils ajoutés avec succès"})
+        )
+
+        result = insert_profiles("localhost", "5050", "c", "p", "ce", "co", "perm")
+
+        self.assertEqual(result, "Profils ajoutés avec succès")
+        mock_post.assert_called_once()
+        args, kwargs = mock_post.call_args
+        self.assertEqual(args[0], "http://localhost:5050/profiles/bulk")
+        self.assertEqual(kwargs["params"], {"type": "perm"})
+        self.assertEqual(len(b"".join(kwargs["data"]).splitlines()), 5)
+
+    @patch("http_pool.bdd_api_session.post")
+    @patch("data.pre_processing.pre_processing")
+    def test_http_error(self, mock_pre_processing, mock_post):
+        mock_pre_processing.return_value = self.profiles
+        mock_post.return_value.raise_for_status.side_effect = (
+            requests.exceptions.HTTPError("400 Client Error")
+        )
+
+        with self.assertRaises(Exception) as context:
+            insert_profiles("localhost", "5050", "c", "p", "ce", "co", "perm")
+
+        self.assertEqual(
+            str(context.exception), "HTTP error occurred: 400 Client Error"
+        )
+
+
+class TestInsertProfilesFromFixtures(unittest.TestCase):
+    # The fixtures tables are read for real, a misplaced path fails on the columns
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        for name, df, schema in zip(
+            ("coaff", "psarm", "certs"),
+            rich_fixtures(2),
+            (COAFF_SCHEMA, PSARM_SCHEMA, CERTS_SCHEMA),
+        ):
+            write_table(df, self.table(f"fixtures_{name}"), schema)
+        self.post = patch("http_pool.bdd_api_session.post").start()
+        self.post.return_value.json.return_value = {
+            "message": "Profils ajoutés avec succès"
+        }
+        self.put = patch("http_pool.bdd_api_session.put").start()
+
+    def tearDown(self):
+        patch.stopall()
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def table(self, name):
+        return table_path(self.directory, name)
+
+    def bulk_request(self):
+        calls = [
+            call
+            for call in self.post.call_args_list
+            if call.args[0].endswith("/profiles/bulk")
+        ]
+        self.assertEqual(len(calls), 1)
+        lines = b"".join(calls[0].kwargs["data"]).decode("utf-8").splitlines()
+        return calls[0].kwargs["params"], [json.loads(line) for line in lines]
+
+    def test_insert_profiles(self):
+        insert_profiles(
+            "localhost",
+            "5050",
+            self.table("fixtures_coaff"),
+            self.table("fixtures_psarm"),
+            self.table("fixtures_certs"),
+            self.table("combined_result"),
+            "temp",
+        )
+
+        params, profiles = self.bulk_request()
+        self.assertEqual(params, {"type": "temp"})
+        self.assertEqual(len(profiles), 2)
+        self.assertTrue(profiles[0]["membre"].startswith("Nom: Membre 0"))
+        self.assertEqual(len(profiles[0]["mission"]), 8)
+
+    @patch("rag_cd.switch_version")
+    @patch("rag_cd.run_validation", return_value=(None, 0.0))
+    @patch("rag_cd.embed_documents")
+    @patch("rag_cd.create_version", return_value="docs_v1")
+    @patch("rag_cd.create_fixtures")
+    @patch("rag_cd.get_skills")
+    @patch("rag_cd.download_files")
+    def test_process_file(self, *mocks):
+        patch.dict(
+            rag_cd.paths,
+            {
+                name: self.directory
+                for name in ("sources", "fixtures", "combined", "temp_files")
+            },
+        ).start()
+        file = MagicMock(filename="upload.xlsx", file=io.BytesIO(b""))
+
+        rag_cd.process_file(file, "perm")
+
+        # The permanent profiles are loaded into the shadow table, then swapped in
+        params, profiles = self.bulk_request()
+        self.assertEqual(params, {"type": "shadow"})
+        self.assertEqual(
+            [profile["membre"].split(",")[0] for profile in profiles],
+            ["Nom: Membre 0", "Nom: Membre 1"],
+        )
+        self.put.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+# Command: python -m unittest test_unitaires.test_job_queue
+import os
+import time
+import shutil
+import logging
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from job_queue import JobQueue
+import rag_api
+from auth import get_current_user
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.db")
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_stages_and_result(self):
+        def handler(payload, progress):
+            with progress.stage("load"):
+                pass
+            with progress.stage("embed"):
+                pass
+            return {"count": payload["count"]}
+
+        queue = JobQueue(self.path, handler)
+        job_id = queue.enqueue({"count": 3})
+        self.assertEqual(queue.get(job_id)["status"], "queued")
+
+        self.assertTrue(queue.run_next())
+
+        job = queue.get(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], {"count": 3})
+        self.assertEqual([s["name"] for s in job["stages"]], ["load", "embed"])
+        self.assertTrue(all(s["status"] == "done" for s in job["stages"]))
+        self.assertTrue(all(s["duration"] >= 0 for s in job["stages"]))
+        self.assertFalse(queue.run_next())
+
+    def test_failed_stage(self):
+        def handler(payload, progress):
+            with progress.stage("load"):
+                raise ValueError("Invalid file")
+
+        upload = os.path.join(self.directory, "upload")
+        open(upload, "wb").close()
+        queue = JobQueue(self.path, handler)
+        job_id = queue.enqueue({"file": upload})
+
+        queue.run_next()
+
+        job = queue.get(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Invalid file")
+        self.assertEqual(job["stages"][0]["status"], "failed")
+        # The upload is deleted once the job is finished
+        self.assertFalse(os.path.exists(upload))
+
+    def test_interrupted_job_requeued(self):
+        runs = []
+        queue = JobQueue(self.path, lambda payload, progress: runs.append(payload))
+        job_id = queue.enqueue({"name": "file.xlsx"})
+
+        # A process claims the job and dies without finishing it
+        self.assertIsNotNone(queue._claim())
+        self.assertFalse(queue.run_next())
+
+        with sqlite3.connect(self.path) as db:
+            db.execute("UPDATE jobs SET heartbeat = heartbeat - 120")
+
+        restarted = JobQueue(self.path, lambda payload, progress: runs.append(payload))
+        self.assertTrue(restarted.run_next())
+
+        job = restarted.get(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["attempts"], 2)
+        self.assertEqual(runs, [{"name": "file.xlsx"}])
+
+    def test_forked_worker_does_not_renew_orphaned_lease(self):
+        runs = []
+        queue = JobQueue(
+            self.path,
+            lambda payload, progress: runs.append(payload),
+            lease=0.3,
+            poll_interval=0.05,
+        )
+        job_id = queue.enqueue({"name": "file.xlsx"})
+
+        # The queue is built before the fork: a worker claims the job under the
+        # inherited owner and crashes, a surviving worker starts the same queue
+        inherited = queue.owner
+        self.assertIsNotNone(queue._claim())
+        queue.start()
+        try:
+            self.assertNotEqual(queue.owner, inherited)
+            deadline = time.monotonic() + 5
+            while queue.get(job_id)["status"] != "done":
+                self.assertLess(time.monotonic(), deadline, "lease never expired")
+                time.sleep(0.05)
+        finally:
+            queue.stop()
+
+        self.assertEqual(queue.get(job_id)["attempts"], 2)
+        self.assertEqual(runs, [{"name": "file.xlsx"}])
+
+    def test_interrupted_too_many_times(self):
+        queue = JobQueue(self.path, lambda payload, progress: None, max_attempts=1)
+        job_id = queue.enqueue({})
+        queue._claim()
+
+        with sqlite3.connect(self.path) as db:
+            db.execute("UPDATE jobs SET heartbeat = heartbeat - 120")
+
+        self.assertFalse(queue.run_next())
+        self.assertEqual(queue.get(job_id)["status"], "failed")
+
+    def test_workers(self):
+        done = threading.Event()
+        queue = JobQueue(
+            self.path, lambda payload, progress: done.set(), poll_interval=0.05
+        )
+        queue.start()
+        try:
+            job_id = queue.enqueue({})
+            self.assertTrue(done.wait(5))
+        finally:
+            queue.stop()
+
+        deadline = time.time() + 5
+        while queue.get(job_id)["status"] != "done" and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(queue.get(job_id)["status"], "done")
+
+
+class TestFileEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        rag_api.app.dependency_overrides[get_current_user] = lambda: "test_user"
+        self.client = TestClient(rag_api.app)
+        self.queue = JobQueue(
+            os.path.join(self.directory, "jobs.db"), rag_api.ingest_file
+        )
+        patch.object(rag_api, "job_queue", self.queue).start()
+        patch.dict(rag_api.paths, {"uploads": self.directory}).start()
+
+    def tearDown(self):
+        patch.stopall()
+        rag_api.app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @patch("rag_api.PROMOTE_TEMP", False)
+    @patch("rag_api.delete_temp_files")
+    @patch("rag_api.process_file")
+    def test_upload_then_poll(self, mock_process_file, mock_delete_temp_files):
+        def process_file(file, process_type, progress):
+            if process_type == "temp":
+                self.assertEqual(file.file.read(), b"content")
+            with progress.stage(f"{process_type}/validation"):
+                pass
+            return None, 2.5
+
+        mock_process_file.side_effect = process_file
+
+        response = self.client.post(
+            "/file", files={"file": ("test_file.txt", b"content")}
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        mock_process_file.assert_not_called()
+
+        self.queue.run_next()
+        job = self.client.get(f"/file/{job_id}").json()
+
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["filename"], "test_file.txt")
+        self.assertEqual(
+            [s["name"] for s in job["stages"]], ["temp/validation", "perm/validation"]
+        )
+        self.assertEqual(
+            job["result"], {"false_rate_temp": 2.5, "false_rate_perm": 2.5}
+        )
+
+    @patch("rag_api.delete_temp_files")
+    @patch("rag_api.promote_temp")
+    @patch("rag_api.process_file")
+    def test_validated_temp_promoted(
+        self, mock_process_file, mock_promote_temp, mock_delete_temp_files
+    ):
+        mock_process_file.return_value = (None, 2.5)
+
+        def promote_temp(progress):
+            with progress.stage("perm/promote_collection"):
+                pass
+
+        mock_promote_temp.side_effect = promote_temp
+
+        response = self.client.post(
+            "/file", files={"file": ("test_file.txt", b"content")}
+        )
+        self.queue.run_next()
+        job = self.client.get(f"/file/{response.json()['job_id']}").json()
+
+        # The file is processed once, as temporary profiles
+        mock_process_file.assert_called_once()
+        self.assertEqual(mock_process_file.call_args[0][1], "temp")
+        self.assertEqual(job["stages"][0]["name"], "perm/promote_collection")
+        self.assertEqual(
+            job["result"], {"false_rate_temp": 2.5, "false_rate_perm": 2.5}
+        )
+
+    @patch("rag_api.delete_temp_files")
+    @patch("rag_api.promote_temp")
+    @patch("rag_api.process_file")
+    def test_rejected_temp_not_promoted(
+        self, mock_process_file, mock_promote_temp, mock_delete_temp_files
+    ):
+        mock_process_file.return_value = (None, 50.0)
+
+        response = self.client.post(
+            "/file", files={"file": ("test_file.txt", b"content")}
+        )
+        self.queue.run_next()
+        job = self.client.get(f"/file/{response.json()['job_id']}").json()
+
+        mock_promote_temp.assert_not_called()
+        self.assertEqual(
+            job["result"], {"false_rate_temp": 50.0, "false_rate_perm": None}
+        )
+
+    def test_unknown_job(self):
+        response = self.client.get("/file/unknown")
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 # Command: python -m unittest test_unitaires.test_load_documents
 import unittest
 from unittest.mock import patch, MagicMock
+import json
 import requests
 
 from rag_module.load_documents import load_profile as load_profile
@@ -12,29 +13,36 @@ venv = is_running_in_docker()
 class TestLoadProfile(unittest.TestCase):
 
     def setUp(self):
-        self.url = f"http://{venv['db_api_host']}:{venv['db_api_port']}/get_profiles"
+        self.url = f"http://{venv['db_api_host']}:{venv['db_api_port']}/profiles/stream"
 
-    def mock_response(self, status_code=200, json_data=None, raise_for_status=None):
+    def mock_response(self, status_code=200, profiles=None, raise_for_status=None):
         mock_resp = MagicMock()
         mock_resp.status_code = status_code
-        mock_resp.json.return_value = json_data or {}
+        mock_resp.iter_lines.return_value = iter(
+            json.dumps(profile).encode() for profile in profiles or []
+        )
         if raise_for_status:
             mock_resp.raise_for_status.side_effect = raise_for_status
         return mock_resp
 
-    @patch("requests.get")
+    @patch("http_pool.bdd_api_session.get")
     def test_load_profile_success(self, mock_get):
         mock_get.return_value = self.mock_response(
-            json_data={
-                "profiles": [{"combined": "Profile 1"}, {"combined": "Profile 2"}],
-            }
+            profiles=[{"combined": "Profile 1"}, {"combined": "Profile 2"}]
         )
 
         result = load_profile("temp")
         expected_result = ["Profile 1", "Profile 2"]
         self.assertEqual(result, expected_result)
 
-    @patch("requests.get")
+        # Only the combined column is requested, as a stream
+        args, kwargs = mock_get.call_args
+        self.assertEqual(args[0], self.url)
+        self.assertEqual(kwargs["params"], {"type": "temp", "fields": "combined"})
+        self.assertTrue(kwargs["stream"])
+        mock_get.return_value.close.assert_called_once()
+
+    @patch("http_pool.bdd_api_session.get")
     def test_load_profile_api_failure(self, mock_get):
         mock_get.side_effect = requests.exceptions.HTTPError("API Error")
 
@@ -43,9 +51,24 @@ class TestLoadProfile(unittest.TestCase):
 
         self.assertEqual(str(context.exception), "Error loading profiles: API Error")
 
-    @patch("requests.get")
+    @patch("http_pool.bdd_api_session.get")
+    def test_load_profile_http_error(self, mock_get):
+        mock_get.return_value = self.mock_response(
+            status_code=400,
+            raise_for_status=requests.exceptions.HTTPError("400 Client Error"),
+        )
+
+        with self.assertRaises(ValueError) as context:
+            load_profile("temp")
+
+        self.assertEqual(
+            str(context.exception), "Error loading profiles: 400 Client Error"
+        )
+        mock_get.return_value.close.assert_called_once()
+
+    @patch("http_pool.bdd_api_session.get")
     def test_load_profile_no_profiles(self, mock_get):
-        mock_get.return_value = self.mock_response(json_data={"profiles": []})
+        mock_get.return_value = self.mock_response(profiles=[])
 
         result = load_profile("temp")
         self.assertEqual(result, [])
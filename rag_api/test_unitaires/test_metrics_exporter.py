@@ -0,0 +1,117 @@
+# Command: python -m unittest test_unitaires.test_metrics_exporter
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from log_module.metrics_exporter import MetricsExporter, SQLiteSink
+
+
+class BlockedSink:
+    """
+    Sink waiting for an event before exporting, like an unreachable tracking server.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def export(self, runs):
+        self.started.set()
+        self.release.wait(10)
+        self.sink.export(runs)
+
+
+class TestMetricsExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sink = SQLiteSink(os.path.join(self.directory.name, "metrics.db"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_runs_exported_in_order(self):
+        exporter = MetricsExporter(self.sink, batch_size=3)
+        for i in range(7):
+            exporter.log_run(
+                "Chat", {"chat_id": f"c{i}"}, {"response_time": i}, {"a.csv": "x\n1\n"}
+            )
+        self.assertTrue(exporter.flush(timeout=5))
+        exporter.close()
+
+        runs = self.sink.runs()
+        self.assertEqual(
+            [run["params"]["chat_id"] for run in runs], [f"c{i}" for i in range(7)]
+        )
+        self.assertEqual(runs[0]["metrics"], {"response_time": 0})
+        self.assertEqual(runs[0]["artifacts"], {"a.csv": "x\n1\n"})
+        self.assertEqual(exporter.stats()["exported"], 7)
+        self.assertEqual(exporter.stats()["pending"], 0)
+
+    def test_log_run_does_not_wait_for_the_sink(self):
+        sink = BlockedSink(self.sink)
+        exporter = MetricsExporter(sink, batch_size=1)
+        exporter.log_run("Chat", {}, {"response_time": 0})
+        sink.started.wait(5)
+
+        start = time.perf_counter()
+        for i in range(100):
+            exporter.log_run("Chat", {}, {"response_time": i})
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+        sink.release.set()
+        self.assertTrue(exporter.flush(timeout=5))
+        exporter.close()
+        self.assertEqual(len(self.sink.runs()), 101)
+
+    def test_oldest_runs_dropped_when_full(self):
+        sink = BlockedSink(self.sink)
+        exporter = MetricsExporter(sink, max_queue=3, batch_size=1)
+        exporter.log_run("Chat", {"chat_id": "first"}, {})
+        sink.started.wait(5)
+        for i in range(5):
+            exporter.log_run("Chat", {"chat_id": f"c{i}"}, {})
+
+        sink.release.set()
+        self.assertTrue(exporter.flush(timeout=5))
+        exporter.close()
+
+        runs = [run["params"]["chat_id"] for run in self.sink.runs()]
+        self.assertEqual(runs, ["first", "c2", "c3", "c4"])
+        self.assertEqual(exporter.stats()["dropped"], 2)
+
+    def test_failed_export_retried(self):
+        exporter = MetricsExporter(self.sink, retry_delay=0.01)
+        export = self.sink.export
+        failures = [ConnectionError("Tracking server down")]
+
+        def flaky_export(runs):
+            if failures:
+                raise failures.pop()
+            export(runs)
+
+        with patch.object(self.sink, "export", side_effect=flaky_export):
+            exporter.log_run("File", {"file_name": "a.xlsx"}, {"False rate": 2.5})
+            self.assertTrue(exporter.flush(timeout=5))
+            exporter.close()
+
+        self.assertEqual(self.sink.runs()[0]["metrics"], {"False rate": 2.5})
+        self.assertEqual(exporter.stats()["failed_exports"], 1)
+        self.assertEqual(exporter.stats()["exported"], 1)
+
+    def test_close_exports_remaining_runs(self):
+        exporter = MetricsExporter(self.sink)
+        exporter.log_run("Chat", {}, {"response_time": 1})
+        exporter.close(timeout=5)
+        exporter.log_run("Chat", {}, {"response_time": 2})
+
+        self.assertEqual(len(self.sink.runs()), 1)
+        self.assertEqual(exporter.stats()["dropped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,15 @@ import unittest
 from unittest.mock import patch, Mock
 import requests
 
-from llm_module.generate_response import generate_minai_response
+from llm_module.generate_response import (
+    generate_minai_response,
+    generate_minai_response_stream,
+)
 
 
 class TestGenerateMinaiResponse(unittest.TestCase):
 
-    @patch("requests.post")
+    @patch("http_pool.minai_session.post")
     def test_valid_response(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -48,7 +51,7 @@ class TestGenerateMinaiResponse(unittest.TestCase):
 
         self.assertEqual(response, "No model provided")
 
-    @patch("requests.post")
+    @patch("http_pool.minai_session.post")
     def test_http_error(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 400
@@ -66,7 +69,7 @@ class TestGenerateMinaiResponse(unittest.TestCase):
 
         self.assertEqual(response, "I'm sorry, I can't answer you : Bad Request")
 
-    @patch("requests.post")
+    @patch("http_pool.minai_session.post")
     def test_generic_exception(self, mock_post):
         # Simules une exception générique
         mock_post.side_effect = Exception("An error occurred")
@@ -80,6 +83,35 @@ class TestGenerateMinaiResponse(unittest.TestCase):
 
         self.assertTrue(response.startswith("I'm sorry, I can't answer you :"))
 
+    @patch("http_pool.minai_session.post")
+    def test_stream_response(self, mock_post):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        # "é" is split between two chunks
+        encoded = "Réponse de l'API".encode("utf-8")
+        mock_response.iter_content.return_value = iter([encoded[:2], encoded[2:]])
+        mock_post.return_value = mock_response
+
+        data = ["data_example"]
+        chat_id = "test_chat_id"
+        history = [{"role": "user", "content": "Hello"}]
+        model = "test_model"
+
+        pieces = list(generate_minai_response_stream(data, chat_id, history, model))
+
+        self.assertEqual("".join(pieces), "Réponse de l'API")
+        self.assertTrue(mock_post.call_args.kwargs["stream"])
+        mock_response.close.assert_called_once()
+
+    def test_stream_empty_history(self):
+        pieces = list(
+            generate_minai_response_stream(
+                ["data_example"], "test_chat_id", [], "test_model"
+            )
+        )
+
+        self.assertEqual(pieces, ["History is empty"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,7 +3,10 @@ import unittest
 from unittest.mock import patch, MagicMock
 import logging
 
-from llm_module.generate_response import generate_ollama_response
+from llm_module.generate_response import (
+    generate_ollama_response,
+    generate_ollama_response_stream,
+)
 
 
 # The goal of this test is to verify that the generate_ollama_response function works as expected.
@@ -77,3 +80,28 @@ class TestGenerateOllamaResponse(unittest.TestCase):
             response,
             "The model invalid_model is not available. Please choose a valid model from this list: ['nomic-embed-text:latest', 'all-minilm:33m', 'llama3.1:8b']",
         )
+
+    def test_generate_ollama_response_stream(self):
+        self.mock_ollama.generate.return_value = iter(
+            [{"response": "Test "}, {"response": ""}, {"response": "response"}]
+        )
+        history = [
+            {"role": "system", "content": "test_text1"},
+            {"role": "user", "content": "test_text2"},
+        ]
+        pieces = list(generate_ollama_response_stream([["test_data"]], history))
+
+        self.assertEqual(pieces, ["Test ", "response"])
+        self.assertTrue(self.mock_ollama.generate.call_args.kwargs["stream"])
+
+    def test_generate_ollama_response_stream_no_question(self):
+        history = [
+            {"role": "system", "content": "test_text1"},
+            {"role": "user", "content": ""},
+        ]
+        pieces = list(generate_ollama_response_stream(["test_data"], history))
+
+        self.assertEqual(
+            pieces,
+            ["I don't have a question to respond to. Please provide a valid question."],
+        )
@@ -0,0 +1,190 @@
+# Command: python -m unittest test_unitaires.test_pre_processing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+
+from data.pre_processing import pre_processing, profiles_by_member
+
+
+def rich_fixtures(members):
+    # 8 missions, 7 competencies and 3 certifications per member
+    names = [f"Membre {i}" for i in range(members)]
+    coaff = pd.DataFrame(
+        [
+            {
+                "Localisation": "Paris",
+                "COEFF_F212": 105,
+                "PROFIL": "Expert",
+                "Nom": name,
+                "Missions_en_cours": f"Client {j}",
+                "Competences": "Azure",
+                "Date_Demarrage": "2024-01-01",
+                "Date_de_fin": "2024-06-30",
+                "Tx_occup": 0.5,
+                "Stream_BT": "DSIA",
+            }
+            for name in names
+            for j in range(8)
+        ]
+    )
+    psarm = pd.DataFrame(
+        [
+            {
+                "Code": 1234,
+                "Nom": name,
+                "Description": f"Skill {j}",
+                "Proficiency Description": "2-Bon",
+                "Supervisor Name": "Jean Dupont",
+            }
+            for name in names
+            for j in range(7)
+        ]
+    )
+    certs = pd.DataFrame(
+        [
+            {
+                "Nom": name,
+                "Code_cert": f"C{j}",
+                "Certification": f"Cert {j}",
+                "Obtention": "2023-01-01",
+                "Expiration": "2026-01-01",
+            }
+            for name in names
+            for j in range(3)
+        ]
+    )
+    return coaff, psarm, certs
+
+
+class TestPreProcessing(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        member = {
+            "Localisation": "Paris",
+            "COEFF_F212": 105,
+            "PROFIL": "Expert",
+            "Competences": "Azure",
+            "Stream_BT": "DSIA",
+        }
+        coaff = pd.DataFrame(
+            [
+                {**member, "Nom": "Alice Martin", "Missions_en_cours": "L'Oréal"},
+                {**member, "Nom": "Alice Martin", "Missions_en_cours": "DISPO ICE"},
+                {**member, "Nom": "Alice Martin", "Missions_en_cours": "DISPO ICE"},
+                {**member, "Nom": "Alice Martin", "Missions_en_cours": None},
+                {**member, "Nom": "Bruno Petit", "Missions_en_cours": "congés"},
+                {**member, "Nom": "Chloé Roux", "Missions_en_cours": "Engie"},
+            ]
+        ).assign(Date_Demarrage="2024-01-01", Date_de_fin="2024-06-30", Tx_occup=0.29)
+        psarm = pd.DataFrame(
+            [
+                ("Alice Martin", "Python", "4-Expert"),
+                ("Alice Martin", "développements web", "2-Bon"),
+                ("Alice Martin", "SQL", "0-Non évalué"),
+                ("Bruno Petit", "Scrum", "1-Faible"),
+                ("Bruno Petit", "Java", "0-Non évalué"),
+                ("Chloé Roux", "Talend", "3-Très bon"),
+            ],
+            columns=["Nom", "Description", "Proficiency Description"],
+        ).assign(Code=1234, **{"Supervisor Name": "Jean Dupont"})
+        # Chloé Roux has no certification, she is left out like in the join
+        certs = pd.DataFrame(
+            [
+                ("Alice Martin", "AZ-900", "Azure Fundamentals"),
+                ("Bruno Petit", "PSM I", "Scrum Master"),
+                ("Bruno Petit", "PSM I", "Scrum Master"),
+            ],
+            columns=["Nom", "Code_cert", "Certification"],
+        ).assign(Obtention="2023-01-01", Expiration="2026-01-01")
+
+        self.paths = []
+        for name, df in (("coaff", coaff), ("psarm", psarm), ("certs", certs)):
+            path = os.path.join(self.directory, f"fixtures_{name}.csv")
+            df.to_csv(path, index=False)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_engine(self, engine):
+        return pre_processing(
+            *self.paths, os.path.join(self.directory, f"{engine}.csv"), engine=engine
+        )
+
+    def test_same_profiles_as_loop(self):
+        vectorized = self.run_engine("vectorized")
+        loop = self.run_engine("loop")
+
+        pd.testing.assert_frame_equal(vectorized, loop)
+        with open(os.path.join(self.directory, "vectorized.csv"), "rb") as f:
+            vectorized_csv = f.read()
+        with open(os.path.join(self.directory, "loop.csv"), "rb") as f:
+            self.assertEqual(vectorized_csv, f.read())
+
+    def test_profiles(self):
+        profiles = self.run_engine("vectorized").set_index("Nom")
+
+        self.assertEqual(list(profiles.index), ["Alice Martin", "Bruno Petit"])
+        self.assertEqual(
+            profiles.loc["Bruno Petit", "Missions"],
+            ["On leave at 28% from 2024-01-01 to 2024-06-30"],
+        )
+        # The unknown level of Java, sorted first, repeats the previous sentence, and
+        # the certification is listed once
+        self.assertEqual(
+            profiles.loc["Bruno Petit", "Compétences"],
+            [
+                "On leave at 28% from 2024-01-01 to 2024-06-30",
+                "Competent in Scrum at a low level",
+            ],
+        )
+        self.assertEqual(
+            profiles.loc["Bruno Petit", "Certifications"],
+            ["Certified Scrum Master (PSM I) since 2023-01-01 and until 2026-01-01"],
+        )
+        # Alice's developer competency makes a second profile, kept as the last one
+        self.assertEqual(profiles.loc["Alice Martin", "Métier"], "")
+        self.assertEqual(
+            profiles.loc["Alice Martin", "Compétences"],
+            ["Competent in développements web at a good level"],
+        )
+        self.assertEqual(
+            profiles.loc["Alice Martin", "Missions"],
+            [
+                "Available at 28% from 2024-01-01 to 2024-06-30",
+                "Mission Azure at 28% occupation at L'Oréal from 2024-01-01 to 2024-06-30",
+            ],
+        )
+        self.assertNotIn('"', profiles.loc["Alice Martin", "Combined"])
+
+
+class TestProfilesJoin(unittest.TestCase):
+
+    def joined_rows(self, members):
+        sizes = []
+        merge = pd.DataFrame.merge
+
+        def counting_merge(self, *args, **kwargs):
+            result = merge(self, *args, **kwargs)
+            sizes.append(len(result))
+            return result
+
+        with patch.object(pd.DataFrame, "merge", counting_merge):
+            profiles = profiles_by_member(*rich_fixtures(members))
+
+        self.assertEqual(len(profiles), members)
+        self.assertEqual(len(profiles.iloc[0]["Missions"]), 8)
+        return max(sizes)
+
+    def test_join_rows_linear_in_members(self):
+        # Joining the rows would make 8 x 7 x 3 = 168 rows per member
+        self.assertEqual(self.joined_rows(50), 50)
+        self.assertEqual(self.joined_rows(100), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+# Command: python -m unittest test_unitaires.test_prometheus_metrics
+import asyncio
+import logging
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import rag_api
+from log_module import prometheus_metrics
+from rag_module.embedding import retrieve_documents
+from llm_module.generate_response import agenerate_ollama_response
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestPrometheusMetrics(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_track_stage_counts_errors(self):
+        labels = {"stage": "test_stage", "model": "test-model"}
+        count = sample("rag_stage_duration_seconds_count", **labels)
+        errors = sample("rag_stage_errors_total", **labels)
+
+        with prometheus_metrics.track_stage("test_stage", "test-model"):
+            pass
+        with self.assertRaises(ValueError):
+            with prometheus_metrics.track_stage("test_stage", "test-model"):
+                raise ValueError("failed")
+
+        self.assertEqual(
+            sample("rag_stage_duration_seconds_count", **labels), count + 2
+        )
+        self.assertEqual(sample("rag_stage_errors_total", **labels), errors + 1)
+
+    def test_model_labels_capped(self):
+        with patch.object(prometheus_metrics, "_models", set()), patch.object(
+            prometheus_metrics, "METRICS_MAX_MODELS", 2
+        ):
+            labels = [prometheus_metrics.model_label(m) for m in ("a", "b", "c", "a")]
+            self.assertEqual(labels, ["a", "b", "other", "a"])
+            self.assertEqual(prometheus_metrics.model_label(None), "none")
+
+    @patch("rag_module.embedding.query_collection", return_value=[["doc"]])
+    @patch("rag_module.embedding.embed_texts", return_value=[[1.0, 0.0]])
+    @patch(
+        "rag_module.embedding.structure_query_with_timings",
+        return_value=("python", {}),
+    )
+    def test_retrieval_stages_recorded(self, mock_structure, mock_embed, mock_query):
+        model = "test-embedding"
+        before = {
+            stage: sample("rag_stage_duration_seconds_count", stage=stage, model=m)
+            for stage, m in (
+                ("structure_query", "none"),
+                ("query_embedding", model),
+                ("chroma_query", "none"),
+            )
+        }
+        misses = sample(
+            "rag_cache_lookups_total", cache="query_embedding", result="miss"
+        )
+        hits = sample("rag_cache_lookups_total", cache="query_embedding", result="hit")
+
+        with patch(
+            "rag_module.embedding.query_cache.get", side_effect=[None, [1.0, 0.0]]
+        ):
+            retrieve_documents("path", "perm", "Qui connaît Python ?", model)
+            retrieve_documents("path", "perm", "Qui connaît Python ?", model)
+
+        self.assertEqual(
+            sample(
+                "rag_stage_duration_seconds_count",
+                stage="structure_query",
+                model="none",
+            ),
+            before["structure_query"] + 2,
+        )
+        self.assertEqual(
+            sample(
+                "rag_stage_duration_seconds_count", stage="query_embedding", model=model
+            ),
+            before["query_embedding"] + 1,
+        )
+        self.assertEqual(
+            sample(
+                "rag_stage_duration_seconds_count", stage="chroma_query", model="none"
+            ),
+            before["chroma_query"] + 2,
+        )
+        self.assertEqual(
+            sample("rag_cache_lookups_total", cache="query_embedding", result="miss"),
+            misses + 1,
+        )
+        self.assertEqual(
+            sample("rag_cache_lookups_total", cache="query_embedding", result="hit"),
+            hits + 1,
+        )
+
+    @patch(
+        "llm_module.generate_response.ollama_client",
+        side_effect=ConnectionError("Ollama unreachable"),
+    )
+    def test_generation_errors_counted(self, mock_client):
+        labels = {"stage": "generation", "model": "test-generation"}
+        errors = sample("rag_stage_errors_total", **labels)
+        history = [{"role": "user", "content": "Qui connaît Python ?"}]
+
+        # The error is returned as the response, it is counted before being caught
+        response = asyncio.run(
+            agenerate_ollama_response([["doc"]], history, "test-generation")
+        )
+
+        self.assertEqual(response, "Ollama unreachable")
+        self.assertEqual(sample("rag_stage_errors_total", **labels), errors + 1)
+
+    def test_metrics_endpoint(self):
+        with prometheus_metrics.track_stage("generation", "llama3.1:8b"):
+            pass
+
+        response = TestClient(rag_api.app).get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn(
+            'rag_stage_duration_seconds_bucket{le="0.001",model="llama3.1:8b",stage="generation"}',
+            response.text,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# Command: python -m unittest test_unitaires.test_promote_temp
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+
+import chromadb
+from chromadb.config import Settings
+
+import rag_cd
+import rag_module.collection_registry as registry
+from data.table_store import read_table, write_table, table_path
+
+
+class TestPromoteTemp(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        self.paths = {
+            name: os.path.join(self.directory, name)
+            for name in (
+                "sources",
+                "fixtures",
+                "combined",
+                "collection",
+                "temp_files",
+                "temp_fixtures",
+                "temp_combined",
+                "temp_collection",
+            )
+        }
+        for path in self.paths.values():
+            os.makedirs(path)
+        patch.dict(rag_cd.paths, self.paths).start()
+        self.session = MagicMock()
+        patch.object(rag_cd, "bdd_api_session", self.session).start()
+        registry._collections.clear()
+
+        for name in ("fixtures_psarm", "fixtures_coaff", "fixtures_certs"):
+            write_table(
+                pd.DataFrame({"Nom": [name]}),
+                table_path(self.paths["temp_fixtures"], name),
+            )
+        write_table(
+            pd.DataFrame({"Nom": ["Alice Martin"], "Combined": ["Nom: Alice Martin"]}),
+            table_path(self.paths["temp_combined"], "combined_result"),
+        )
+        for name in ("descriptions_uniques.txt", "profils_uniques.txt"):
+            with open(os.path.join(self.paths["temp_files"], name), "w") as f:
+                f.write('"Expert"')
+
+        chromadb.PersistentClient(
+            path=self.paths["temp_collection"], settings=Settings(allow_reset=True)
+        ).create_collection(name="temp").add(
+            ids=["a"], embeddings=[[1.0, 0.0]], documents=["Nom: Alice Martin"]
+        )
+
+    def tearDown(self):
+        patch.stopall()
+        logging.disable(logging.NOTSET)
+        registry._collections.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_temp_artifacts_become_permanent(self):
+        rag_cd.promote_temp()
+
+        self.assertEqual(os.listdir(self.paths["temp_fixtures"]), [])
+        self.assertEqual(
+            read_table(table_path(self.paths["fixtures"], "fixtures_coaff"))[
+                "Nom"
+            ].tolist(),
+            ["fixtures_coaff"],
+        )
+        self.assertEqual(
+            read_table(table_path(self.paths["combined"], "combined_result"), ["Nom"])[
+                "Nom"
+            ].tolist(),
+            ["Alice Martin"],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.paths["sources"], "profils_uniques.txt"))
+        )
+
+        # The profiles are copied by the database, then swapped in
+        self.assertEqual(
+            self.session.post.call_args.kwargs["params"], {"source": "temp"}
+        )
+        self.assertTrue(
+            self.session.post.call_args.args[0].endswith("/profiles/shadow")
+        )
+        self.session.put.assert_called_once()
+
+        # The embeddings are served by a new version of the permanent collection
+        collection = registry.get_collection(self.paths["collection"], "perm")
+        self.assertEqual(collection.name, "docs_v1")
+        self.assertEqual(collection.get()["ids"], ["a"])
+
+    def test_failed_database_copy(self):
+        perm_table = table_path(self.paths["fixtures"], "fixtures_coaff")
+        write_table(pd.DataFrame({"Nom": ["previous"]}), perm_table)
+        perm_file = os.path.join(self.paths["sources"], "profils_uniques.txt")
+        with open(perm_file, "w") as f:
+            f.write('"Junior"')
+        self.session.post.return_value.raise_for_status.side_effect = Exception(
+            "HTTP error"
+        )
+
+        with self.assertRaises(Exception):
+            rag_cd.promote_temp()
+
+        # The permanent collection is left untouched
+        self.session.put.assert_not_called()
+        self.assertEqual(
+            registry.active_collection(self.paths["collection"], "perm"), "docs"
+        )
+        # The permanent files too, the temporary ones can be promoted again
+        self.assertEqual(read_table(perm_table)["Nom"].tolist(), ["previous"])
+        with open(perm_file) as f:
+            self.assertEqual(f.read(), '"Junior"')
+        self.assertFalse(
+            os.path.exists(table_path(self.paths["combined"], "combined_result"))
+        )
+        self.assertEqual(len(os.listdir(self.paths["temp_fixtures"])), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# Command: python -m unittest test_unitaires.test_query_analysis
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import llm_module.model_precision_improvements as mpi
+from llm_module.acronym_matcher import AcronymMatcher
+
+
+class TestQueryAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        mpi._analyze_query.cache_clear()
+
+    def test_shared_doc_same_skills(self):
+        text = "Je cherche un expert Python et SQL"
+        doc = mpi.get_nlp()(text)
+
+        self.assertEqual(
+            mpi.detect_skills_and_levels(text, doc), mpi.detect_skills_and_levels(text)
+        )
+
+    def test_timings_per_stage(self):
+        structured, timings = mpi.structure_query_with_timings(
+            "Liste les membres compétents en Python"
+        )
+
+        self.assertIn("Python", structured)
+        for stage in ("ner", "dates", "skills", "acronyms"):
+            self.assertGreaterEqual(timings[stage], 0)
+        self.assertFalse(timings["cached"])
+
+    def test_memoized_normalized_query(self):
+        first = mpi.structure_query_with_timings("Qui connaît Python ?")
+        second = mpi.structure_query_with_timings("  Qui connaît   Python ? ")
+
+        self.assertEqual(first[0], second[0])
+        self.assertTrue(second[1]["cached"])
+        self.assertEqual(mpi._analyze_query.cache_info().misses, 1)
+
+    def test_memo_follows_acronyms_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "acronyms.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"SI": "Système d'Information"}, f)
+            with patch.object(mpi, "acronym_matcher", AcronymMatcher(path)):
+                query = "Qui connaît Python et l'ERP ?"
+                self.assertNotIn("ERP", mpi.structure_query(query))
+
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump({"ERP": "Enterprise Resource Planning"}, f)
+                structured, timings = mpi.structure_query_with_timings(query)
+
+        self.assertIn("ERP", structured)
+        self.assertFalse(timings["cached"])
+
+    def test_structure_query_unchanged_without_entities(self):
+        self.assertEqual(mpi.structure_query("Bonjour"), "Bonjour")
+
+    def test_model_loaded_once_on_first_use(self):
+        loaded = mpi._nlp
+        with patch.object(mpi, "_nlp", None), patch(
+            "llm_module.model_precision_improvements.spacy.load"
+        ) as mock_load:
+            self.assertIs(mpi.get_nlp(), mock_load.return_value)
+            mpi.get_nlp()
+
+        mock_load.assert_called_once_with(mpi.SPACY_MODEL, exclude=mpi.SPACY_EXCLUDE)
+        self.assertIn("parser", mpi.SPACY_EXCLUDE)
+        # The pipeline loaded before the test, if any, is restored
+        self.assertIs(mpi._nlp, loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
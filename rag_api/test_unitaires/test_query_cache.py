@@ -0,0 +1,85 @@
+# Command: python -m unittest test_unitaires.test_query_cache
+import os
+import unittest
+import tempfile
+
+from rag_module.query_cache import QueryEmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.model = "nomic-embed-text:v1.5"
+
+    def test_miss_then_hit(self):
+        cache = QueryEmbeddingCache(
+            max_size=10, ttl=60, shared_path=None, clock=self.clock
+        )
+
+        self.assertIsNone(cache.get("Web", self.model))
+        cache.put("Web", self.model, [0.5, 1.0], duration=0.2)
+        self.assertEqual(cache.get("Web", self.model), [0.5, 1.0])
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["saved_seconds"], 0.2)
+
+    def test_keyed_by_model(self):
+        cache = QueryEmbeddingCache(
+            max_size=10, ttl=60, shared_path=None, clock=self.clock
+        )
+        cache.put("Web", self.model, [0.5, 1.0])
+
+        self.assertIsNone(cache.get("Web", "all-minilm:33m"))
+
+    def test_expired_entry(self):
+        cache = QueryEmbeddingCache(
+            max_size=10, ttl=60, shared_path=None, clock=self.clock
+        )
+        cache.put("Web", self.model, [0.5, 1.0])
+
+        self.clock.now += 61
+        self.assertIsNone(cache.get("Web", self.model))
+
+    def test_least_recently_used_evicted(self):
+        cache = QueryEmbeddingCache(
+            max_size=2, ttl=60, shared_path=None, clock=self.clock
+        )
+        cache.put("Web", self.model, [1.0])
+        cache.put("Scrum", self.model, [2.0])
+        cache.get("Web", self.model)
+        cache.put("Azure", self.model, [3.0])
+
+        self.assertEqual(cache.get("Web", self.model), [1.0])
+        self.assertIsNone(cache.get("Scrum", self.model))
+        self.assertEqual(cache.get("Azure", self.model), [3.0])
+
+    def test_shared_between_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "query_cache.db")
+            worker_1 = QueryEmbeddingCache(10, 60, shared_path=path, clock=self.clock)
+            worker_2 = QueryEmbeddingCache(10, 60, shared_path=path, clock=self.clock)
+
+            worker_1.put("Web", self.model, [0.5, 1.0])
+            self.assertEqual(worker_2.get("Web", self.model), [0.5, 1.0])
+            self.assertEqual(worker_2.stats()["shared_hits"], 1)
+
+            # Expired entries are not shared either
+            self.clock.now += 61
+            worker_3 = QueryEmbeddingCache(10, 60, shared_path=path, clock=self.clock)
+            self.assertIsNone(worker_3.get("Web", self.model))
+
+
+if __name__ == "__main__":
+    unittest.main()
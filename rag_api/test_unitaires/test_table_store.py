@@ -0,0 +1,128 @@
+# Command: python -m unittest test_unitaires.test_table_store
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+
+import data.table_store as table_store
+from data.table_store import (
+    read_table,
+    write_table,
+    remove_table,
+    table_path,
+    COAFF_SCHEMA,
+    PSARM_SCHEMA,
+    CERTS_SCHEMA,
+)
+from data.pre_processing import pre_processing
+from perf_validation import import_data
+from test_unitaires.test_pre_processing import rich_fixtures
+
+
+class TestTableStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.coaff = pd.DataFrame(
+            {
+                "Localisation": ["Paris", "Tours"],
+                "COEFF_F212": [105, 150],
+                "PROFIL": ["Expert", "Junior"],
+                "Nom": ["Alice Martin", "NA"],
+                "Missions_en_cours": ["Engie", "congés"],
+                "Competences": ["Azure", "SAS"],
+                "Date_Demarrage": [datetime.date(2024, 1, 1), "2024-02-01"],
+                "Date_de_fin": [datetime.date(2024, 6, 30), None],
+                "Tx_occup": [0.5, 1],
+                "Stream_BT": ["DSIA", "ODI"],
+                "Extra": [1, "mixed"],
+            }
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_typed_round_trip(self):
+        for table_format in ("arrow", "parquet"):
+            path = table_path(self.directory, "fixtures_coaff", table_format)
+            write_table(self.coaff, path, COAFF_SCHEMA)
+
+            df = read_table(path)
+
+            self.assertEqual(list(df.columns), list(self.coaff.columns))
+            self.assertEqual(
+                df["Date_Demarrage"].tolist(),
+                [datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)],
+            )
+            self.assertIsNone(df["Date_de_fin"][1])
+            self.assertEqual(df["Tx_occup"].dtype, "float64")
+            self.assertEqual(df["COEFF_F212"].dtype, "int64")
+            # A name read from a CSV file would be parsed as a missing value
+            self.assertEqual(df["Nom"][1], "NA")
+            self.assertEqual(df["Extra"].tolist(), ["1", "mixed"])
+
+    def test_read_columns(self):
+        path = table_path(self.directory, "fixtures_coaff")
+        write_table(self.coaff, path, COAFF_SCHEMA)
+
+        df = read_table(path, ["Tx_occup", "Nom"])
+
+        self.assertEqual(list(df.columns), ["Tx_occup", "Nom"])
+        self.assertEqual(df["Nom"].tolist(), ["Alice Martin", "NA"])
+
+    def test_csv_export(self):
+        path = table_path(self.directory, "fixtures_coaff", "arrow")
+        with patch.object(table_store, "TABLE_CSV_EXPORT", True):
+            write_table(self.coaff, path, COAFF_SCHEMA)
+        csv_path = os.path.join(self.directory, "fixtures_coaff.csv")
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(
+            read_table(csv_path, ["Date_Demarrage"])["Date_Demarrage"].tolist(),
+            ["2024-01-01", "2024-02-01"],
+        )
+
+        remove_table(path)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_pipeline_same_profiles_as_csv(self):
+        paths = {}
+        schemas = (COAFF_SCHEMA, PSARM_SCHEMA, CERTS_SCHEMA)
+        for name, df, schema in zip(
+            ("coaff", "psarm", "certs"), rich_fixtures(20), schemas
+        ):
+            for table_format in ("csv", "arrow"):
+                path = table_path(self.directory, f"fixtures_{name}", table_format)
+                write_table(df, path, schema)
+                paths[name, table_format] = path
+
+        profiles = {}
+        for table_format in ("csv", "arrow"):
+            combined_path = table_path(self.directory, "combined", table_format)
+            profiles[table_format] = pre_processing(
+                paths["coaff", table_format],
+                paths["psarm", table_format],
+                paths["certs", table_format],
+                combined_path,
+            )
+            pd.testing.assert_frame_equal(
+                import_data(combined_path),
+                profiles[table_format][["Nom", "Combined"]].reset_index(drop=True),
+            )
+
+        pd.testing.assert_frame_equal(profiles["arrow"], profiles["csv"])
+        self.assertEqual(
+            read_table(table_path(self.directory, "combined"))["Missions"][0].tolist(),
+            profiles["csv"]["Missions"][0],
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            read_table(os.path.join(self.directory, "fixtures_coaff.xlsx"))
+
+
+if __name__ == "__main__":
+    unittest.main()
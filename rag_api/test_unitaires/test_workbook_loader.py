@@ -0,0 +1,108 @@
+# Command: python -m unittest test_unitaires.test_workbook_loader
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+
+import data.workbook_loader as workbook_loader
+from data.workbook_loader import read_workbook, clear_workbook_cache, cache_stats
+from data.get_skills import get_skills
+
+
+class TestWorkbookLoader(unittest.TestCase):
+
+    def setUp(self):
+        clear_workbook_cache()
+        self.directory = tempfile.mkdtemp()
+        self.psarm = os.path.join(self.directory, "psarm.xlsx")
+        pd.DataFrame(
+            {"Nom": ["Alice Martin", "Bruno Petit"], "Description": ["Python", "SQL"]}
+        ).to_excel(self.psarm, index=False)
+        # Like Coaff_V1.xlsx, two rows of information above the column names
+        self.coaff = os.path.join(self.directory, "coaff.xlsx")
+        pd.DataFrame(
+            [
+                ["Extraction", None],
+                [None, None],
+                ["Membres", "PROFIL"],
+                ["Alice Martin", "Expert"],
+                ["Bruno Petit", "Junior"],
+            ],
+            columns=["COAFF", "Unnamed"],
+        ).to_excel(self.coaff, index=False)
+        self.parses = 0
+        read_excel = pd.read_excel
+
+        def counting_read_excel(*args, **kwargs):
+            self.parses += 1
+            return read_excel(*args, **kwargs)
+
+        patch.object(pd, "read_excel", counting_read_excel).start()
+
+    def tearDown(self):
+        patch.stopall()
+        clear_workbook_cache()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_parsed_once(self):
+        hits = cache_stats()["hits"]
+        first = read_workbook(self.psarm)
+        first.loc[0, "Nom"] = "Modified"
+        second = read_workbook(self.psarm)
+
+        self.assertEqual(self.parses, 1)
+        self.assertEqual(cache_stats()["hits"], hits + 1)
+        self.assertEqual(second["Nom"].tolist(), ["Alice Martin", "Bruno Petit"])
+
+    def test_header_row(self):
+        df = read_workbook(self.coaff, header_row=2)
+
+        self.assertEqual(list(df.columns), ["Membres", "PROFIL"])
+        self.assertEqual(df["PROFIL"].tolist(), ["Expert", "Junior"])
+        # The same workbook read without the header row is another sheet
+        self.assertEqual(len(read_workbook(self.coaff)), 5)
+        self.assertEqual(self.parses, 2)
+
+    def test_moved_workbook(self):
+        read_workbook(self.psarm)
+        moved = os.path.join(self.directory, "moved.xlsx")
+        os.replace(self.psarm, moved)
+
+        read_workbook(moved)
+
+        self.assertEqual(self.parses, 1)
+
+    def test_changed_workbook(self):
+        read_workbook(self.psarm)
+        pd.DataFrame({"Nom": ["Chloé Roux"], "Description": ["Java"]}).to_excel(
+            self.psarm, index=False
+        )
+
+        self.assertEqual(read_workbook(self.psarm)["Nom"].tolist(), ["Chloé Roux"])
+        self.assertEqual(self.parses, 2)
+
+    def test_cache_size(self):
+        with patch.object(workbook_loader, "WORKBOOK_CACHE_SIZE", 1):
+            read_workbook(self.psarm)
+            read_workbook(self.coaff, header_row=2)
+            read_workbook(self.psarm)
+
+        self.assertEqual(self.parses, 3)
+
+    def test_get_skills_shares_the_sheets(self):
+        desc = os.path.join(self.directory, "descriptions_uniques.txt")
+        profiles = os.path.join(self.directory, "profils_uniques.txt")
+
+        get_skills(self.psarm, self.coaff, desc, profiles)
+        read_workbook(self.psarm)
+        read_workbook(self.coaff, header_row=2)
+
+        self.assertEqual(self.parses, 2)
+        with open(profiles, encoding="utf-8") as f:
+            self.assertEqual(f.read(), '"Expert", "Junior"')
+
+
+if __name__ == "__main__":
+    unittest.main()